@@ -1,3 +1,6 @@
+import random
+from functools import lru_cache
+
 import numpy as np
 
 
@@ -17,6 +20,10 @@ class Board:
       diagonally connected to another one of the player's tiles
     - piece_list: A PieceList object (probably shared with the game engine) to
       help understand the moves
+
+    Internally state, _legal and connected are bitboards: one int per player,
+    where bit y * board_w + x stands for the tile (x, y). The arrays above are
+    read-only views built from them on demand.
     """
 
     def __init__(self, board_w, board_h, num_players, piece_list, starting_point=(0, 0)):
@@ -25,14 +32,30 @@ class Board:
         self.num_players = num_players
         self.scores = [0] * self.num_players
 
-        self.state = np.full((board_h, board_w), -1, np.int8)
+        full, not_first_col, not_last_col = board_masks(board_w, board_h)
+        self._tiles = [0] * num_players
+        self._legal_bits = [full] * num_players
+        self._connected_bits = [0] * num_players
+        self._hash = 0
+        self._views = {}
 
-        self._legal = np.full((num_players, board_h, board_w), True, np.bool_)
-
-        self.connected = np.full((num_players, board_h, board_w), False, np.bool_)
-        self.connected[0, starting_point[0], starting_point[1]] = True
         self.piece_list = piece_list
         self.pieces = np.full((num_players, piece_list.get_num_pieces()), True, np.bool_)
+        self._orientations = [[(ori,) + orientation_info(ori, board_w) for ori in piece]
+                              for piece in piece_list]
+        self._piece_indices = [piece_list.pieces.index(piece) for piece in piece_list]
+        self._orientation_info = {info[0]: info[1:] for orientations in self._orientations
+                                  for info in orientations}
+        self.add_starting_point(0, starting_point)
+
+    def add_starting_point(self, player, starting_point):
+        """
+        Let <player> start from <starting_point>, given as (y, x) like in the
+        constructor.
+        """
+        (y, x) = starting_point
+        self._connected_bits[player] |= 1 << (y * self.board_w + x)
+        self._views.clear()
 
     def add_move(self, player, move):
         """
@@ -49,34 +72,29 @@ class Board:
         piece = move.piece
         self.pieces[player, move.piece_index] = False  # mark piece as used
 
-        # Update internal state for each tile
+        placed = self._move_mask(move)
+        full, not_first_col, not_last_col = board_masks(self.board_w, self.board_h)
+        w = self.board_w
+        self._tiles[player] |= placed
+
+        # Nobody can play on these squares
+        self._legal_bits = [legal & ~placed for legal in self._legal_bits]
+
+        # This player can't play next to these squares
+        self._legal_bits[player] &= ~(((placed << 1) & not_first_col) |
+                                      ((placed >> 1) & not_last_col) |
+                                      (placed << w) | (placed >> w))
+
+        # The diagonals are now attached
+        self._connected_bits[player] |= full & (((placed << (w + 1)) & not_first_col) |
+                                                ((placed << (w - 1)) & not_last_col) |
+                                                ((placed >> (w - 1)) & not_first_col) |
+                                                ((placed >> (w + 1)) & not_last_col))
+
+        keys = zobrist_keys(w * self.board_h, self.num_players)[player]
         for (xi, yi) in move.orientation:
-            (x, y) = (xi + move.x, yi + move.y)
-            self.state[y, x] = player
-
-            # Nobody can play on this square
-            for p in range(self.num_players):
-                self._legal[p][y][x] = False
-
-            # This player can't play next to this square
-            if x > 0:
-                self._legal[player, y, x - 1] = False
-            if x < self.board_w - 1:
-                self._legal[player, y, x + 1] = False
-            if y > 0:
-                self._legal[player, y - 1, x] = False
-            if y < self.board_h - 1:
-                self._legal[player, y + 1, x] = False
-
-            # The diagonals are now attached
-            if x > 0 and y > 0:
-                self.connected[player, y - 1, x - 1] = True
-            if x > 0 and y < self.board_h - 1:
-                self.connected[player, y + 1, x - 1] = True
-            if x < self.board_w - 1 and y < self.board_h - 1:
-                self.connected[player, y + 1, x + 1] = True
-            if x < self.board_w - 1 and y > 0:
-                self.connected[player, y - 1, x + 1] = True
+            self._hash ^= keys[(yi + move.y) * w + xi + move.x]
+        self._views.clear()
 
         self.scores[player] += piece.get_num_tiles()
         return piece.get_num_tiles()
@@ -94,17 +112,40 @@ class Board:
         """
         Returns a list of legal moves for given player for this board state 
         """
-        # Generate all legal moves
+        # Every legal move covers a free corner the player is attached to, so
+        # only placements that put one of the piece's tiles on such a corner
+        # are tried
+        corners = self._connected_bits[player] & self._legal_bits[player]
+        if not corners:
+            return []
+        anchors = []
+        while corners:
+            bit = corners & -corners
+            anchors.append(divmod(bit.bit_length() - 1, self.board_w))
+            corners ^= bit
+
+        legal = self._legal_bits[player]
+        w = self.board_w
+        # x and y stay below board_w - 1 and board_h - 1
+        max_x = self.board_w - 2
+        max_y = self.board_h - 2
         move_list = []
-        for piece in self.piece_list:
-            for x in range(self.board_w - 1):
-                for y in range(self.board_h - 1):
-                    for ori in piece:
-                        new_move = Move(piece,
-                                        self.piece_list.pieces.index(piece),
-                                        ori, x, y)
-                        if self.check_move_valid(player, new_move):
-                            move_list.append(new_move)
+        for piece, piece_index, orientations in zip(self.piece_list, self._piece_indices,
+                                                    self._orientations):
+            if not self.pieces[player, piece_index]:
+                continue
+            placements = set()
+            for ori_index, (ori, mask, ori_w, ori_h) in enumerate(orientations):
+                for (ay, ax) in anchors:
+                    for (xi, yi) in ori:
+                        (x, y) = (ax - xi, ay - yi)
+                        if 0 <= x <= max_x and 0 <= y <= max_y and x + ori_w <= w \
+                                and y + ori_h <= self.board_h:
+                            placed = mask << (y * w + x)
+                            if placed & legal == placed:
+                                placements.add((x, y, ori_index))
+            for (x, y, ori_index) in sorted(placements):
+                move_list.append(Move(piece, piece_index, orientations[ori_index][0], x, y))
         return move_list
 
     def check_move_valid(self, player, move):
@@ -124,18 +165,28 @@ class Board:
             # piece has already been used
             return False
 
-        attached_corner = False
-
-        for (x, y) in move.orientation:
-            # If any tile is illegal, this move isn't valid
-            if not self.check_tile_legal(player, x + move.x, y + move.y):
-                return False
+        placed = self._move_mask(move)
+        if placed is None or placed & self._legal_bits[player] != placed:
+            # some tile is out of bounds or illegal
+            return False
 
-            if self.check_tile_attached(player, x + move.x, y + move.y):
-                attached_corner = True
+        # If at least one tile is attached, this move is valid
+        return placed & self._connected_bits[player] != 0
 
-            # If at least one tile is attached, this move is valid
-        return attached_corner
+    def _move_mask(self, move):
+        """
+        Returns the bitboard of the tiles <move> covers, or None if any of
+        them is out of bounds.
+        """
+        info = self._orientation_info.get(move.orientation)
+        if info is None:
+            info = self._orientation_info[move.orientation] = \
+                orientation_info(move.orientation, self.board_w)
+        (mask, ori_w, ori_h) = info
+        if move.x < 0 or move.y < 0 or move.x + ori_w > self.board_w \
+                or move.y + ori_h > self.board_h:
+            return None
+        return mask << (move.y * self.board_w + move.x)
 
     def check_tile_legal(self, player, x, y):
         """
@@ -153,8 +204,8 @@ class Board:
         if x < 0 or x >= self.board_w or y < 0 or y >= self.board_h:
             return False
 
-        # Otherwise, it's in the lookup table
-        return self._legal[player, y, x]
+        # Otherwise, it's in the bitboard
+        return bool(self._legal_bits[player] >> (y * self.board_w + x) & 1)
 
     def check_tile_attached(self, player, x, y):
         """Check if (<x>, <y>) is diagonally attached to <player>'s moves.
@@ -168,20 +219,57 @@ class Board:
         if x < 0 or x >= self.board_w or y < 0 or y >= self.board_h:
             return False
 
-        # Otherwise, it's in the lookup table
-        return self.connected[player, y, x]
+        # Otherwise, it's in the bitboard
+        return bool(self._connected_bits[player] >> (y * self.board_w + x) & 1)
+
+    def _bits_to_array(self, bits):
+        size = self.board_w * self.board_h
+        raw = np.frombuffer(bits.to_bytes((size + 7) // 8, 'little'), np.uint8)
+        return np.unpackbits(raw, count=size, bitorder='little') \
+            .view(np.bool_).reshape(self.board_h, self.board_w)
+
+    def _view(self, name, build):
+        array = self._views.get(name)
+        if array is None:
+            array = self._views[name] = build()
+            array.flags.writeable = False
+        return array
+
+    @property
+    def state(self):
+        def build():
+            state = np.full((self.board_h, self.board_w), -1, np.int8)
+            for player, tiles in enumerate(self._tiles):
+                state[self._bits_to_array(tiles)] = player
+            return state
+        return self._view('state', build)
+
+    @property
+    def _legal(self):
+        return self._view('_legal', lambda: np.array(
+            [self._bits_to_array(bits) for bits in self._legal_bits]))
+
+    @property
+    def connected(self):
+        return self._view('connected', lambda: np.array(
+            [self._bits_to_array(bits) for bits in self._connected_bits]))
 
     def get_position(self, x, y):
-        return self.state[y, x]
+        bit = 1 << (y * self.board_w + x)
+        for player, tiles in enumerate(self._tiles):
+            if tiles & bit:
+                return player
+        return -1
 
     def score(self, player):
         return self.scores[player]
 
     def __eq__(self, other):
-        return np.array_equal(self.state, other.state) and np.array_equal(self.pieces, other.pieces)
+        return self._hash == other._hash and self._tiles == other._tiles \
+               and np.array_equal(self.pieces, other.pieces)
 
     def __hash__(self):
-        return hash(str(self.state))
+        return self._hash
 
     def __str__(self):
         out_str = []
@@ -195,15 +283,51 @@ class Board:
         return ''.join(out_str)
 
     def __copy__(self):
-        cpy_board = Board(self.board_w, self.board_h, self.num_players, self.piece_list)
-        cpy_board.state = np.copy(self.state)
-        cpy_board._legal = np.copy(self._legal)
-        cpy_board.connected = np.copy(self.connected)
+        cpy_board = Board.__new__(Board)
+        cpy_board.__dict__.update(self.__dict__)
+        cpy_board._tiles = self._tiles[:]
+        cpy_board._legal_bits = self._legal_bits[:]
+        cpy_board._connected_bits = self._connected_bits[:]
+        cpy_board._views = {}
         cpy_board.pieces = np.copy(self.pieces)
         cpy_board.scores = self.scores[:]
         return cpy_board
 
 
+@lru_cache(maxsize=None)
+def board_masks(board_w, board_h):
+    """
+    Returns the bitboards of the whole board, of all but its first column and
+    of all but its last column.
+    """
+    full = (1 << (board_w * board_h)) - 1
+    first_col = sum(1 << (y * board_w) for y in range(board_h))
+    last_col = first_col << (board_w - 1)
+    return full, full & ~first_col, full & ~last_col
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(num_tiles, num_players):
+    """
+    Returns a random 64 bit key for every player and tile, fixed per board
+    size, so a board hashes to the xor of the keys of its occupied tiles.
+    """
+    rng = random.Random(0)
+    return [[rng.getrandbits(64) for _ in range(num_tiles)] for _ in range(num_players)]
+
+
+def orientation_info(orientation, board_w):
+    """
+    Returns the bitboard of <orientation> placed at (0, 0) on a board of
+    width <board_w>, and the width and height of the orientation.
+    """
+    mask = 0
+    for (x, y) in orientation:
+        mask |= 1 << (y * board_w + x)
+    return (mask, max(x for (x, _) in orientation) + 1,
+            max(y for (_, y) in orientation) + 1)
+
+
 class Move:
     """
     A Move describes how one of the players is going to spend their move.
@@ -30,11 +30,11 @@ class GameEngine(object):
 
         # Set up initial corners for each player
         if self.num_players > 1:
-            self.board.connected[1, 0, self.board_w - 1] = True
+            self.board.add_starting_point(1, (0, self.board_w - 1))
             if self.num_players > 2:
-                self.board.connected[2, self.board_h - 1, 0] = True
+                self.board.add_starting_point(2, (self.board_h - 1, 0))
                 if self.num_players > 3:
-                    self.board.connected[3, self.board_h - 1, self.board_h - 1] = True
+                    self.board.add_starting_point(3, (self.board_h - 1, self.board_h - 1))
 
     def play_turn(self):
         """
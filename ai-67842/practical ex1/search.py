@@ -2,6 +2,8 @@
 In search.py, you will implement generic search algorithms
 """
 
+import time
+
 import util
 
 class Node:
@@ -20,6 +22,30 @@ class Node:
         return path[::-1]
 
 
+class SearchStatistics:
+    """
+    Counters a search fills in as it runs: the nodes it expanded and generated,
+    the largest size of its fringe, and the time it spent in get_successors,
+    in the heuristic and in total. Pass one to any of the searches below as
+    stats=... and print it afterwards; a statistics object may be shared by
+    several searches to add up their counters.
+    """
+
+    def __init__(self):
+        self.expanded = 0
+        self.generated = 0
+        self.max_fringe = 0
+        self.successor_time = 0.0
+        self.heuristic_time = 0.0
+        self.total_time = 0.0
+
+    def __str__(self):
+        return ("expanded %d, generated %d, max fringe %d, "
+                "successors %.3fs, heuristic %.3fs, total %.3fs"
+                % (self.expanded, self.generated, self.max_fringe,
+                   self.successor_time, self.heuristic_time, self.total_time))
+
+
 class SearchProblem:
     """
     This class outlines the structure of a search problem, but doesn't implement
@@ -64,31 +90,106 @@ class SearchProblem:
         util.raiseNotDefined()
 
 
-def reconstruct_path(current, path_mapping):
-    path = []
-    while current in path_mapping and path_mapping[current] != None:
-        previous, action = path_mapping[current]
-        path.append(action)
-        current = previous
-    return path[::-1]
-
-
-def generic_graph_search(fringe, problem):
-    start_node = Node(problem.get_start_state())
-    closed = set()
-    fringe.push(start_node)
-    while not fringe.isEmpty():
-        current = fringe.pop()
-        if problem.is_goal_state(current.state):
-            return current.reconstruct_path()
-        if current.state not in closed:
-            closed.add(current.state)
-            for successor, action, stepCost in problem.get_successors(current.state):
-                fringe.push(Node(successor, current, action, current.g_cost + stepCost))
+def expand(problem, state, stats):
+    """
+    Returns the successors of state, counting and timing the expansion in stats
+    """
+    start = time.perf_counter()
+    successors = problem.get_successors(state)
+    stats.successor_time += time.perf_counter() - start
+    stats.expanded += 1
+    stats.generated += len(successors)
+    return successors
+
+
+def memoized_heuristic(heuristic, problem, stats):
+    """
+    Returns heuristic(state, problem) as a function of the state alone, which
+    computes the heuristic once per state and times it in stats
+    """
+    cache = {}
+
+    def h(state):
+        try:
+            return cache[state]
+        except KeyError:
+            start = time.perf_counter()
+            value = cache[state] = heuristic(state, problem)
+            stats.heuristic_time += time.perf_counter() - start
+            return value
+
+    return h
+
+
+def generic_graph_search(fringe, problem, stats=None):
+    """
+    Graph search with the given fringe, which decides the order of expansion.
+    The fringe may hold several nodes of the same state; only the first one
+    popped is expanded.
+    """
+    stats = SearchStatistics() if stats is None else stats
+    start_time = time.perf_counter()
+    try:
+        start_node = Node(problem.get_start_state())
+        closed = set()
+        fringe.push(start_node)
+        size = 1
+        while not fringe.isEmpty():
+            current = fringe.pop()
+            size -= 1
+            if problem.is_goal_state(current.state):
+                return current.reconstruct_path()
+            if current.state not in closed:
+                closed.add(current.state)
+                for successor, action, stepCost in expand(problem, current.state, stats):
+                    fringe.push(Node(successor, current, action, current.g_cost + stepCost))
+                    size += 1
+                stats.max_fringe = max(stats.max_fringe, size)
+    finally:
+        stats.total_time += time.perf_counter() - start_time
     raise Exception("no solution exists in this problem")
 
 
-def depth_first_search(problem):
+def best_first_graph_search(problem, priority, stats=None, goal_test=None):
+    """
+    Expands the fringe node of the lowest priority(g_cost, state) first.
+
+    The fringe holds one node per state: reaching a queued state by a cheaper
+    path replaces its node and lowers its priority in place. Ties go to the
+    node of the higher g_cost, the one closer to a goal. Returns the list
+    of actions to the first goal popped, as decided by goal_test (the
+    problem's is_goal_state by default), or None if there is none.
+    """
+    stats = SearchStatistics() if stats is None else stats
+    goal_test = problem.is_goal_state if goal_test is None else goal_test
+    start_time = time.perf_counter()
+    try:
+        start_node = Node(problem.get_start_state())
+        fringe = util.IndexedPriorityQueue()
+        fringe.push(start_node.state, (priority(0, start_node.state), 0))
+        nodes = {start_node.state: start_node}  # the best node of every state in the fringe
+        closed = set()
+        while not fringe.isEmpty():
+            state = fringe.pop()
+            current = nodes.pop(state)
+            if goal_test(state):
+                return current.reconstruct_path()
+            closed.add(state)
+            for successor, action, stepCost in expand(problem, state, stats):
+                if successor in closed:
+                    continue
+                g_cost = current.g_cost + stepCost
+                node = nodes.get(successor)
+                if node is None or g_cost < node.g_cost:
+                    nodes[successor] = Node(successor, current, action, g_cost)
+                    fringe.push(successor, (priority(g_cost, successor), -g_cost))
+            stats.max_fringe = max(stats.max_fringe, len(fringe))
+        return None
+    finally:
+        stats.total_time += time.perf_counter() - start_time
+
+
+def depth_first_search(problem, stats=None):
     """
     Search the deepest nodes in the search tree first.
 
@@ -103,105 +204,22 @@ def depth_first_search(problem):
     print("Start's successors:", problem.getSuccessors(problem.getStartState()))
     """
     "*** YOUR CODE HERE ***"
-    return generic_graph_search(util.Stack(), problem)
-
-
-    fringe = util.Stack()
-    closed = set()
-    start_state = problem.get_start_state()
-    fringe.push(start_state)
-    path_mapping = {start_state: None}
-    while not fringe.isEmpty():
-        current = fringe.pop()
-        if problem.is_goal_state(current.state):
-            return reconstruct_path(current, path_mapping)
-        if current.state not in closed:
-            closed |= {current.state}
-            for successor, action, stepCost in problem.get_successors(current.state):
-                if successor not in path_mapping:
-                    fringe.push(successor)
-                    path_mapping[successor] = (current, action)
-
-    raise Exception("no solution exists in this problem")
+    return generic_graph_search(util.Stack(), problem, stats)
 
 
-def breadth_first_search(problem):
+def breadth_first_search(problem, stats=None):
     """
     Search the shallowest nodes in the search tree first.
     """
     "*** YOUR CODE HERE ***"
-    return generic_graph_search(util.Queue(), problem)
-
-
-    fringe = util.Queue()
-    closed = set()
-    start_state = problem.get_start_state()
-    fringe.push(start_state)
-    path_mapping = {start_state: None}
-    while not fringe.isEmpty():
-        current = fringe.pop()
-        if problem.is_goal_state(current):
-            return reconstruct_path(current, path_mapping)
-        if current not in closed:
-            closed |= {current}
-            for successor, action, stepCost in problem.get_successors(current):
-                if successor not in path_mapping:
-                    fringe.push(successor)
-                    path_mapping[successor] = (current, action)
-
-    raise Exception("no solution exists in this problem")
+    return generic_graph_search(util.Queue(), problem, stats)
 
 
-def uniform_cost_search(problem):
+def uniform_cost_search(problem, stats=None):
     """
     Search the node of least total cost first.
     """
-    return generic_graph_search(util.PriorityQueueWithFunction(lambda node: node.g_cost), problem)
-
-
-    start_state = problem.get_start_state()
-    g_function = {start_state: 0}
-    fringe = util.PriorityQueue()
-    closed = set()
-    fringe.push(start_state, 0)
-    path_mapping = {start_state: None}
-    while not fringe.isEmpty():
-        current = fringe.pop()
-        # print(g_function[current])
-        if problem.is_goal_state(current):
-            return reconstruct_path(current, path_mapping)
-        if current not in closed:
-            closed |= {current}
-            for successor, action, stepCost in problem.get_successors(current):
-                dist = g_function[current] + stepCost
-                if successor not in path_mapping or dist < g_function[successor]:
-                    g_function[successor] = dist
-                    fringe.push(successor, dist)
-                    path_mapping[successor] = (current, action)
-
-    raise Exception("no solution exists in this problem")
-
-    start_state = problem.get_start_state()
-    vertex = Vertex(start_state, 0)
-    fringe = util.PriorityQueueWithFunction(lambda x: x.f_cost)
-    closed = set()
-    fringe.push(vertex)
-    path_mapping = {}
-    while not fringe.isEmpty():
-        current = fringe.pop()
-        print(current.f_cost)
-        state = current.state
-        if problem.is_goal_state(state):
-            return reconstruct_path(state, path_mapping)
-        if state not in closed:
-            closed |= {state}
-            for successor, action, stepCost in problem.get_successors(state):
-                if successor not in closed:
-                    g_cost = current.g_cost + stepCost
-                    fringe.push(Vertex(successor, g_cost))
-                    path_mapping[successor] = (state, action)
-
-    raise Exception("no solution exists in this problem")
+    return solved(best_first_graph_search(problem, lambda g_cost, state: g_cost, stats))
 
 
 def null_heuristic(state, problem=None):
@@ -212,161 +230,103 @@ def null_heuristic(state, problem=None):
     return 0
 
 
-
-def a_star_search(problem, heuristic=null_heuristic):
+def a_star_search(problem, heuristic=null_heuristic, stats=None):
     """
     Search the node that has the lowest combined cost and heuristic first.
     """
-    return generic_graph_search(util.PriorityQueueWithFunction(lambda node: node.g_cost + heuristic(node.state, problem)), problem)
-
-
-    start_node = Node(problem.get_start_state())
-    f_function = lambda node: node.g_cost + heuristic(node.state, problem)
-    fringe = util.PriorityQueueWithFunction(f_function)
-    closed = set()
-    fringe.push(start_node)
-    while not fringe.isEmpty():
-        current = fringe.pop()
-        print(f_function(current))
-        if problem.is_goal_state(current.state):
-            return current.reconstruct_path()
-        if current.state not in closed:
-            closed.add(current.state)
-            for successor, action, stepCost in problem.get_successors(current.state):
-                fringe.push(Node(successor, current, action, current.g_cost + stepCost))
-    raise Exception("no solution exists in this problem")
+    return weighted_a_star_search(problem, heuristic, 1, stats)
 
-    #try
-    import time
-    t = time.time()
-    start_state = problem.get_start_state()
-    g_function = {start_state: 0}
-    f_function = lambda x: g_function[x] +  heuristic(x, problem)
-    fringe = util.PriorityQueueWithFunction(f_function)
-    closed = set()
-    fringe.push(start_state)
-    path_mapping = {start_state: None}
-    while not fringe.isEmpty():
-        current = fringe.pop()
-        print(f_function(current))
-        if problem.is_goal_state(current):
-            a = reconstruct_path(current, path_mapping)
-            print(time.time() - t)
-            return a
-        if current not in closed:
-            closed |= {current}
-            for successor, action, stepCost in problem.get_successors(current):
-                dist = g_function[current] + stepCost
-                if successor not in path_mapping or dist < g_function[successor]:
-                    g_function[successor] = dist
-                    fringe.push(successor)
-                    path_mapping[successor] = (current, action)
 
-    raise Exception("no solution exists in this problem")
+def weighted_a_star_search(problem, heuristic=null_heuristic, weight=2, stats=None):
+    """
+    Search the node that has the lowest cost plus weight times the heuristic
+    first. A weight above 1 trades optimality (the plan costs at most weight
+    times the optimum for an admissible heuristic) for fewer expansions.
+    """
+    stats = SearchStatistics() if stats is None else stats
+    h = memoized_heuristic(heuristic, problem, stats)
+    return solved(best_first_graph_search(
+        problem, lambda g_cost, state: g_cost + weight * h(state), stats))
 
 
+def iterative_deepening_a_star_search(problem, heuristic=null_heuristic, stats=None):
+    """
+    Depth first searches bounded by the cost plus the heuristic, raising the
+    bound to the lowest value that exceeded it until a goal is found. Uses
+    memory linear in the depth of the plan, at the price of expanding the top
+    of the tree again in every iteration.
+    """
+    stats = SearchStatistics() if stats is None else stats
+    h = memoized_heuristic(heuristic, problem, stats)
     start_state = problem.get_start_state()
-    h_cost = heuristic(start_state, problem)
-    vertex = Vertex(start_state, 0, h_cost)
-    fringe = util.PriorityQueueWithFunction(lambda x: x.f_cost)
-    closed = set()
-    fringe.push(vertex)
-    path_mapping = {}
-    while not fringe.isEmpty():
-        current = fringe.pop()
-        print(current.f_cost)
-        state = current.state
-        if problem.is_goal_state(state):
-            return reconstruct_path(state, path_mapping)
-        if state not in closed:
-            closed |= {state}
-            for successor, action, stepCost in problem.get_successors(state):
-                if successor not in closed:
-                    g_cost = current.g_cost + stepCost
-                    h_cost = heuristic(successor, problem)
-                    fringe.push(Vertex(successor, g_cost, h_cost))
-                    path_mapping[successor] = (state, action)
+    on_path = {start_state}
+    actions = []
 
+    def bounded_search(state, g_cost, bound):
+        f_cost = g_cost + h(state)
+        if f_cost > bound:
+            return f_cost
+        if problem.is_goal_state(state):
+            return None
+        next_bound = float('inf')
+        for successor, action, stepCost in expand(problem, state, stats):
+            if successor in on_path:
+                continue
+            on_path.add(successor)
+            actions.append(action)
+            stats.max_fringe = max(stats.max_fringe, len(actions))
+            result = bounded_search(successor, g_cost + stepCost, bound)
+            if result is None:
+                return None
+            on_path.remove(successor)
+            actions.pop()
+            next_bound = min(next_bound, result)
+        return next_bound
+
+    start_time = time.perf_counter()
+    try:
+        bound = h(start_state)
+        while bound != float('inf'):
+            bound = bounded_search(start_state, 0, bound)
+            if bound is None:
+                return actions
+    finally:
+        stats.total_time += time.perf_counter() - start_time
     raise Exception("no solution exists in this problem")
-    #end try
 
-    start_state = problem.get_start_state()
-    g_function = {start_state: 0}
-    h_function = {start_state: heuristic(start_state, problem)}
-    f_function = lambda x: g_function[x] + h_function[x]
-    fringe = util.PriorityQueueWithFunction(f_function)
-    closed = set()
-    fringe.push(start_state)
-    path_mapping = {}
-    while not fringe.isEmpty():
-        current = fringe.pop()
-        # print(f_function(current))
-        if problem.is_goal_state(current):
-            a= reconstruct_path(current, path_mapping)
-            print(time.time()-t)
-            return a
-        if current not in closed:
-            closed |= {current}
-            for successor, action, stepCost in problem.get_successors(current):
-                if successor not in closed:
-                    g_function[successor] = g_function[current] + stepCost
-                    h_function[successor] = heuristic(successor, problem)
-                    fringe.push(successor)
-                    path_mapping[successor] = (current, action)
-
-    raise Exception("no solution exists in this problem")
 
-def greedy_best_search(problem, heuristic=null_heuristic):
+def greedy_best_search(problem, heuristic=null_heuristic, stats=None):
     """
-    Search the node that has the lowest combined cost and heuristic first.
+    Search the node that has the lowest heuristic first.
     """
-    #try
-    return generic_graph_search(util.PriorityQueueWithFunction(lambda node: heuristic(node.state, problem)), problem)
+    stats = SearchStatistics() if stats is None else stats
+    h = memoized_heuristic(heuristic, problem, stats)
+    return solved(best_first_graph_search(problem, lambda g_cost, state: h(state), stats))
 
 
-    start_state = problem.get_start_state()
-    h_helper = lambda x: heuristic(x, problem)
-    fringe = util.PriorityQueueWithFunction(h_helper)
-    closed = set()
-    fringe.push(start_state)
-    path_mapping = {start_state: None}
-    while not fringe.isEmpty():
-        current = fringe.pop()
-        if problem.is_goal_state(current):
-            return reconstruct_path(current, path_mapping)
-        if current not in closed:
-            closed |= {current}
-            for successor, action, stepCost in problem.get_successors(current):
-                if successor not in path_mapping:
-                    fringe.push(successor)
-                    path_mapping[successor] = (current, action)
-
-    raise Exception("no solution exists in this problem")
-
-def a_star_search_banned(problem, invalid_set, heuristic=null_heuristic):
+def a_star_search_banned(problem, invalid_set, heuristic=null_heuristic, stats=None):
     """
-    Search the node that has the lowest combined cost and heuristic first.
+    Search the node that has the lowest combined cost and heuristic first,
+    ignoring the goal states in invalid_set. Returns None if there is no other
+    goal.
     """
+    stats = SearchStatistics() if stats is None else stats
+    h = memoized_heuristic(heuristic, problem, stats)
+    return best_first_graph_search(
+        problem, lambda g_cost, state: g_cost + h(state), stats,
+        lambda state: problem.is_goal_state(state) and state not in invalid_set)
+
+
+def solved(actions):
+    if actions is None:
+        raise Exception("no solution exists in this problem")
+    return actions
 
-    start_node = Node(problem.get_start_state())
-    f_function = lambda node: node.g_cost + heuristic(node.state, problem)
-    fringe = util.PriorityQueueWithFunction(f_function)
-    closed = set()
-    fringe.push(start_node)
-    while not fringe.isEmpty():
-        current = fringe.pop()
-        if problem.is_goal_state(current.state) and current.state not in invalid_set:
-            return current.reconstruct_path()
-        if current.state not in closed:
-            closed.add(current.state)
-            for successor, action, stepCost in problem.get_successors(
-                    current.state):
-                fringe.push(Node(successor, current, action,
-                                 current.g_cost + stepCost))
-    return None
 
 # Abbreviations
 bfs = breadth_first_search
 dfs = depth_first_search
 astar = a_star_search
 ucs = uniform_cost_search
+wastar = weighted_a_star_search
+idastar = iterative_deepening_a_star_search
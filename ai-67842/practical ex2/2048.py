@@ -3,6 +3,7 @@ import numpy
 import os
 import util
 from game import Game, RandomOpponentAgent
+from bitboard_game_state import BitboardGameState
 from game_state import GameState
 from graphics_display import GabrieleCirulli2048GraphicsDisplay
 from keyboard_agent import KeyboardAgent
@@ -12,8 +13,9 @@ NUM_OF_INITIAL_TILES = 2
 
 class GameRunner(object):
     def __init__(self, display=None, agent=None, num_of_initial_tiles=NUM_OF_INITIAL_TILES,
-                 sleep_between_actions=False):
+                 sleep_between_actions=False, state_class=GameState):
         super(GameRunner, self).__init__()
+        self.state_class = state_class
         self.sleep_between_actions = sleep_between_actions
         self.num_of_initial_tiles = num_of_initial_tiles
         self.human_agent = agent is None
@@ -30,7 +32,7 @@ class GameRunner(object):
     def new_game(self, initial_state=None, *args, **kw):
         self.quit_game()
         if initial_state is None:
-            initial_state = GameState()
+            initial_state = self.state_class()
         opponent_agent = RandomOpponentAgent()
         game = Game(self._agent, opponent_agent, self.display, sleep_between_actions=self.sleep_between_actions)
         for i in range(self.num_of_initial_tiles):
@@ -68,6 +70,8 @@ def main():
     parser.add_argument('--initial_board', help='Initial board for new games.', default=None, type=str)
     parser.add_argument('--evaluation_function', help='The evaluation function for ai agent.',
                         default='score_evaluation_function', type=str)
+    parser.add_argument('--bitboard', help='Run the game on the packed 64 bit board backend.',
+                        action='store_true')
     args = parser.parse_args()
     numpy.random.seed(args.random_seed)
     if args.display != displays[0]:
@@ -78,14 +82,15 @@ def main():
         agent = create_agent(args)
     else:
         agent = None
+    state_class = BitboardGameState if args.bitboard else GameState
     initial_state = None
     if args.initial_board is not None:
         with open(os.path.join('layouts', args.initial_board), 'r') as f:
             lines = f.readlines()
             initial_board = numpy.array([list(map(lambda x: int(x), line.split(','))) for line in lines])
-            initial_state = GameState(board=initial_board)
+            initial_state = state_class(board=initial_board)
     game_runner = GameRunner(display=display, agent=agent, num_of_initial_tiles=args.num_of_initial_tiles,
-                             sleep_between_actions=args.sleep_between_actions)
+                             sleep_between_actions=args.sleep_between_actions, state_class=state_class)
     for i in range(args.num_of_games):
         score = game_runner.new_game(initial_state=initial_state)
     if display is not None:
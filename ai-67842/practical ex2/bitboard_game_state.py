@@ -0,0 +1,287 @@
+import numpy as np
+
+from game import Action, OpponentAction
+
+# The board is a 64 bit integer of 16 nibbles: the tile in (row, column) is
+# stored in bits 16 * row + 4 * column as the log2 of its value (0 for an
+# empty tile), so a row is a 16 bit integer and every move is a table lookup
+# per row. Tiles can go up to 2 ** 15 = 32768; two of those never fuse.
+ROW_MASK = 0xFFFF
+MAX_EXPONENT = 15
+
+# Weights of the table based evaluation terms, per row and per column.
+LOST_PENALTY = 200000.0
+MONOTONICITY_POWER = 4.0
+MONOTONICITY_WEIGHT = 47.0
+SUM_POWER = 3.5
+SUM_WEIGHT = 11.0
+MERGES_WEIGHT = 700.0
+EMPTY_WEIGHT = 270.0
+
+
+def _move_row_right(cells):
+    """
+    Moves one row (a list of exponents) to the right in place, the same way
+    GameState fuses and then moves tiles, and returns the score gained.
+    """
+    score = 0
+    for col in range(len(cells) - 1, -1, -1):
+        if cells[col] == 0:
+            continue
+        for prev_col in range(col - 1, -1, -1):
+            if cells[prev_col] == 0:
+                continue
+            if cells[col] == cells[prev_col] and cells[col] < MAX_EXPONENT:
+                cells[col] += 1
+                cells[prev_col] = 0
+                score += 1 << cells[col]
+            break
+    tiles = [cell for cell in cells if cell != 0]
+    cells[:] = [0] * (len(cells) - len(tiles)) + tiles
+    return score
+
+
+def _row_heuristic(cells):
+    empty = cells.count(0)
+    merges = 0
+    previous, counter = 0, 0
+    for cell in cells:
+        if cell == 0:
+            continue
+        if cell == previous:
+            counter += 1
+        elif counter > 0:
+            merges += 1 + counter
+            counter = 0
+        previous = cell
+    if counter > 0:
+        merges += 1 + counter
+    monotonicity_left = monotonicity_right = 0
+    for col in range(1, len(cells)):
+        left = cells[col - 1] ** MONOTONICITY_POWER
+        right = cells[col] ** MONOTONICITY_POWER
+        if cells[col - 1] > cells[col]:
+            monotonicity_left += left - right
+        else:
+            monotonicity_right += right - left
+    tiles_sum = sum(cell ** SUM_POWER for cell in cells)
+    return (EMPTY_WEIGHT * empty + MERGES_WEIGHT * merges
+            - MONOTONICITY_WEIGHT * min(monotonicity_left, monotonicity_right)
+            - SUM_WEIGHT * tiles_sum)
+
+
+def _pack_row(cells):
+    return cells[0] | cells[1] << 4 | cells[2] << 8 | cells[3] << 12
+
+
+def _build_tables():
+    """
+    Fills the row tables. Building them takes about a second, so it is done
+    when the first BitboardGameState is created rather than on import.
+    """
+    global ROW_RIGHT, ROW_RIGHT_SCORE, ROW_LEFT, ROW_LEFT_SCORE, ROW_HEURISTIC
+    right, right_score, left, left_score, heuristic = [], [], [], [], []
+    for row in range(1 << 16):
+        cells = [(row >> shift) & 0xF for shift in (0, 4, 8, 12)]
+        heuristic.append(_row_heuristic(cells))
+        moved = cells[:]
+        right_score.append(_move_row_right(moved))
+        right.append(_pack_row(moved))
+        moved = cells[::-1]
+        left_score.append(_move_row_right(moved))
+        left.append(_pack_row(moved[::-1]))
+    ROW_RIGHT, ROW_RIGHT_SCORE, ROW_LEFT, ROW_LEFT_SCORE = right, right_score, left, left_score
+    _ACTION_TABLES.update({Action.RIGHT: (False, ROW_RIGHT, ROW_RIGHT_SCORE),
+                           Action.LEFT: (False, ROW_LEFT, ROW_LEFT_SCORE),
+                           Action.DOWN: (True, ROW_RIGHT, ROW_RIGHT_SCORE),
+                           Action.UP: (True, ROW_LEFT, ROW_LEFT_SCORE)})
+    ROW_HEURISTIC = heuristic
+
+
+# row -> the row after moving it, and the score gained by that move, and the
+# heuristic of the row (see _build_tables)
+ROW_RIGHT = ROW_RIGHT_SCORE = ROW_LEFT = ROW_LEFT_SCORE = ROW_HEURISTIC = None
+_ACTION_TABLES = {}
+
+
+def transpose(board):
+    """
+    Returns the packed board with its rows and columns swapped.
+    """
+    a1 = board & 0xF0F00F0FF0F00F0F
+    a2 = board & 0x0000F0F00000F0F0
+    a3 = board & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def pack_board(board):
+    """
+    Packs a 4x4 array of tile values into a 64 bit integer.
+    """
+    packed = 0
+    for row in range(4):
+        for col in range(4):
+            value = int(board[row][col])
+            if value:
+                packed |= (value.bit_length() - 1) << (16 * row + 4 * col)
+    return packed
+
+
+def _move(board, table, score_table):
+    moved = score = 0
+    for shift in (0, 16, 32, 48):
+        row = (board >> shift) & ROW_MASK
+        moved |= table[row] << shift
+        score += score_table[row]
+    return moved, score
+
+
+class BitboardGameState(object):
+    """
+    A 4x4 GameState packed into a 64 bit integer, with the same interface as
+    game_state.GameState. Moves are lookups in precomputed per-row tables, so
+    generating a successor costs a few integer operations instead of copying
+    and updating an array.
+    """
+
+    def __init__(self, rows=4, columns=4, board=None, score=0, done=False, packed=None):
+        super(BitboardGameState, self).__init__()
+        if rows != 4 or columns != 4:
+            raise Exception("a bitboard only holds a 4x4 board.")
+        if ROW_HEURISTIC is None:
+            _build_tables()
+        self._done = done
+        self._score = score
+        if packed is None:
+            packed = 0 if board is None else pack_board(board)
+        self._packed = packed
+        self._board = None
+
+    @classmethod
+    def from_game_state(cls, game_state):
+        return cls(board=game_state.board, score=game_state.score, done=game_state.done)
+
+    @property
+    def done(self):
+        return self._done
+
+    @property
+    def score(self):
+        return self._score
+
+    @property
+    def packed(self):
+        return self._packed
+
+    @property
+    def max_tile(self):
+        board = self._packed
+        exponent = 0
+        while board:
+            exponent = max(exponent, board & 0xF)
+            board >>= 4
+        return 1 << exponent if exponent else 0
+
+    @property
+    def board(self):
+        """
+        The board as a 4x4 array of tile values, built on first use. Changing
+        it does not change the state.
+        """
+        if self._board is None:
+            exponents = np.array([(self._packed >> (4 * i)) & 0xF for i in range(16)],
+                                 dtype=np.int32).reshape(4, 4)
+            self._board = np.where(exponents != 0, 1 << exponents, 0).astype(np.int32)
+        return self._board
+
+    def get_legal_actions(self, agent_index):
+        if agent_index == 0:
+            return self.get_agent_legal_actions()
+        elif agent_index == 1:
+            return self.get_opponent_legal_actions()
+        else:
+            raise Exception("illegal agent index.")
+
+    def get_opponent_legal_actions(self):
+        return [OpponentAction(row=row, column=column, value=value)
+                for row, column in self._empty_positions() for value in [2, 4]]
+
+    def get_agent_legal_actions(self):
+        board = self._packed
+        transposed = transpose(board)
+        legal_actions = []
+        for action in (Action.RIGHT, Action.LEFT, Action.UP, Action.DOWN):
+            is_transposed, table, _ = _ACTION_TABLES[action]
+            rows = transposed if is_transposed else board
+            for shift in (0, 16, 32, 48):
+                row = (rows >> shift) & ROW_MASK
+                if table[row] != row:
+                    legal_actions.append(action)
+                    break
+        return legal_actions
+
+    def _empty_positions(self):
+        board = self._packed
+        return [(i // 4, i % 4) for i in range(16) if not (board >> (4 * i)) & 0xF]
+
+    def get_empty_tiles(self):
+        positions = self._empty_positions()
+        return (np.array([row for row, _ in positions], dtype=np.int64),
+                np.array([column for _, column in positions], dtype=np.int64))
+
+    def apply_opponent_action(self, action):
+        shift = 16 * int(action.row) + 4 * int(action.column)
+        if (self._packed >> shift) & 0xF:
+            raise Exception("illegal opponent action (%s,%s) isn't empty." % (action.row, action.column))
+        if action.value <= 0:
+            raise Exception("The action value must be positive integer.")
+        self._packed |= (int(action.value).bit_length() - 1) << shift
+        self._board = None
+        if not self.get_agent_legal_actions():
+            self._done = True
+
+    def apply_action(self, action):
+        is_transposed, table, score_table = _ACTION_TABLES[action]
+        board = transpose(self._packed) if is_transposed else self._packed
+        moved, score = _move(board, table, score_table)
+        if moved == board:
+            raise Exception("illegal action.")
+        self._packed = transpose(moved) if is_transposed else moved
+        self._score += score
+        self._board = None
+
+    def generate_successor(self, agent_index=0, action=Action.STOP):
+        successor = BitboardGameState(score=self._score, done=self._done, packed=self._packed)
+        if agent_index == 0:
+            successor.apply_action(action)
+        elif agent_index == 1:
+            successor.apply_opponent_action(action)
+        else:
+            raise Exception("illegal agent index.")
+        return successor
+
+    def evaluate(self):
+        """
+        The sum of the per-row heuristic table over all rows and columns:
+        rewards empty tiles and possible merges, and penalizes non monotonic
+        rows and columns and large tiles that are not merged. A state with no
+        legal action gets a large penalty.
+        """
+        if self._done:
+            return -LOST_PENALTY
+        board = self._packed
+        transposed = transpose(board)
+        return (ROW_HEURISTIC[board & ROW_MASK] + ROW_HEURISTIC[(board >> 16) & ROW_MASK] +
+                ROW_HEURISTIC[(board >> 32) & ROW_MASK] + ROW_HEURISTIC[board >> 48] +
+                ROW_HEURISTIC[transposed & ROW_MASK] + ROW_HEURISTIC[(transposed >> 16) & ROW_MASK] +
+                ROW_HEURISTIC[(transposed >> 32) & ROW_MASK] + ROW_HEURISTIC[transposed >> 48])
+
+    def __eq__(self, other):
+        return self._packed == other.packed and self._score == other.score
+
+    def __hash__(self):
+        return hash((self._packed, self._score))
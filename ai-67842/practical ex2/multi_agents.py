@@ -1,6 +1,7 @@
 import numpy as np
 import abc
 import util
+from bitboard_game_state import BitboardGameState
 from game import Agent, Action
 
 
@@ -359,5 +360,18 @@ def better_evaluation_function(current_game_state):
            1.8 * max_tile - 0.05 * penalty4 - 0.15 * mono_snake
 
 
+def bitboard_evaluation_function(current_game_state):
+    """
+    Evaluates the state with the per-row heuristic tables of the bitboard
+    backend (empty tiles, merges, monotonicity and tile sums of every row and
+    column), eight table lookups per state. Fastest when the game runs on
+    BitboardGameState; other states are packed first.
+    """
+    if not isinstance(current_game_state, BitboardGameState):
+        current_game_state = BitboardGameState.from_game_state(current_game_state)
+    return current_game_state.evaluate()
+
+
 # Abbreviation
 better = better_evaluation_function
+bitboard = bitboard_evaluation_function
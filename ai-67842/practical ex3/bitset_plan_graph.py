@@ -0,0 +1,225 @@
+"""
+A compact plan graph: propositions and actions get dense integer ids, every
+set of them is a bitset (an int whose bit i stands for id i), and every mutex
+relation is one bitset row per id, so the tests of a plan graph level are
+bitwise ANDs instead of comparisons of Pair objects.
+"""
+
+
+def to_bits(ids):
+    """
+    Returns the bitset of the given ids
+    """
+    bits = 0
+    for i in ids:
+        bits |= 1 << i
+    return bits
+
+
+def iter_bits(bits):
+    """
+    Yields the ids in the given bitset in increasing order
+    """
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class PlanGraphIndex(object):
+    """
+    The ids of the propositions and actions (noOps included) of a problem,
+    and the per-id bitsets the plan graph levels are built from
+    """
+
+    def __init__(self, actions, propositions):
+        """
+        Constructor
+        """
+        self.actions = list(actions)
+        self.propositions = list(propositions)
+        self.prop_ids = {prop.get_name(): i for i, prop in enumerate(self.propositions)}
+        self.action_ids = {action: i for i, action in enumerate(self.actions)}
+
+        self.pre = [self.prop_bits(action.get_pre()) for action in self.actions]
+        self.add = [self.prop_bits(action.get_add()) for action in self.actions]
+        self.delete = [self.prop_bits(action.get_delete()) for action in self.actions]
+        # prop -> the actions that need / add / delete it
+        self.needers = [0] * len(self.propositions)
+        self.adders = [0] * len(self.propositions)
+        self.deleters = [0] * len(self.propositions)
+        for a in range(len(self.actions)):
+            for p in iter_bits(self.pre[a]):
+                self.needers[p] |= 1 << a
+            for p in iter_bits(self.add[a]):
+                self.adders[p] |= 1 << a
+            for p in iter_bits(self.delete[a]):
+                self.deleters[p] |= 1 << a
+        self.noops = to_bits(a for a, action in enumerate(self.actions) if action.is_noop())
+
+        # action -> the actions it is not independent of (see independent_pair in
+        # graph_plan.py): inconsistent effects or interference
+        self.interference = []
+        for a in range(len(self.actions)):
+            row = 0
+            for p in iter_bits(self.delete[a]):
+                row |= self.adders[p] | self.needers[p]
+            for p in iter_bits(self.add[a] | self.pre[a]):
+                row |= self.deleters[p]
+            self.interference.append(row & ~(1 << a))
+
+    def prop_bits(self, propositions):
+        """
+        Returns the bitset of the given propositions (matched by name)
+        """
+        return to_bits(self.prop_ids[prop.get_name()] for prop in propositions)
+
+    def prop_list(self, bits):
+        return [self.propositions[p] for p in iter_bits(bits)]
+
+    def action_list(self, bits):
+        return [self.actions[a] for a in iter_bits(bits)]
+
+    def is_independent(self, a1, a2):
+        """
+        Returns true if the actions of ids a1 and a2 are independent
+        """
+        return not self.interference[a1] >> a2 & 1
+
+
+class BitsetPlanGraphLevel(object):
+    """
+    A level of the plan graph: the action layer and then the proposition layer,
+    as bitsets of ids with a mutex row per id.
+    """
+
+    def __init__(self, index, propositions=0):
+        """
+        Constructor
+        """
+        self.index = index
+        self.propositions = propositions
+        self.proposition_mutex = [0] * len(index.propositions)
+        self.actions = 0
+        self.action_mutex = [0] * len(index.actions)
+        self.producers = [0] * len(index.propositions)  # prop -> the actions of this level adding it
+
+    def is_mutex(self, p1, p2):
+        """
+        Returns true if the propositions of ids p1 and p2 are mutex at this level
+        """
+        return bool(self.proposition_mutex[p1] >> p2 & 1)
+
+    def has_mutex(self, props):
+        """
+        Returns true if any two propositions in the bitset props are mutex at this level
+        """
+        return any(self.proposition_mutex[p] & props for p in iter_bits(props))
+
+    def providers(self, p):
+        """
+        Returns the bitset of the actions of this level that add the proposition of id p
+        """
+        return self.producers[p]
+
+    def expand(self, previous_level):
+        """
+        Builds the action layer from the proposition layer of previous_level, and then
+        the proposition layer from the action layer, with the mutexes of both
+        """
+        self.update_action_layer(previous_level)
+        self.update_mutex_actions(previous_level)
+        self.update_proposition_layer()
+        self.update_mutex_proposition()
+
+    def expand_without_mutex(self, previous_level):
+        self.update_action_layer(previous_level)
+        self.update_proposition_layer()
+
+    def update_action_layer(self, previous_level):
+        """
+        Adds every action whose preconditions are in the previous proposition layer
+        and are not pairwise mutex there
+        """
+        props, mutex, pre = previous_level.propositions, previous_level.proposition_mutex, self.index.pre
+        actions = 0
+        for a in range(len(pre)):
+            if pre[a] & ~props == 0 and not any(mutex[p] & pre[a] for p in iter_bits(pre[a])):
+                actions |= 1 << a
+        self.actions = actions
+
+    def update_mutex_actions(self, previous_level):
+        """
+        Two actions are mutex if they are not independent or have competing needs,
+        i.e. a precondition of one is mutex with a precondition of the other
+        """
+        index, mutex = self.index, previous_level.proposition_mutex
+        for a in iter_bits(self.actions):
+            needs_mutex = 0
+            for p in iter_bits(index.pre[a]):
+                needs_mutex |= mutex[p]
+            competing = 0
+            for q in iter_bits(needs_mutex):
+                competing |= index.needers[q]
+            self.action_mutex[a] = (index.interference[a] | competing) & self.actions & ~(1 << a)
+
+    def update_proposition_layer(self):
+        add, adders = self.index.add, self.index.adders
+        props = 0
+        for a in iter_bits(self.actions):
+            props |= add[a]
+        self.propositions = props
+        self.producers = [self.actions & adders[p] for p in range(len(adders))]
+
+    def update_mutex_proposition(self):
+        """
+        Two propositions are mutex if every action adding one is mutex with every
+        action adding the other
+        """
+        producers = {p: self.producers[p] for p in iter_bits(self.propositions)}
+        for p, producers_p in producers.items():
+            # the actions that are mutex with every producer of p
+            common = -1
+            for a in iter_bits(producers_p):
+                common &= self.action_mutex[a]
+            row = 0
+            for q, producers_q in producers.items():
+                if producers_q & ~common == 0:
+                    row |= 1 << q
+            self.proposition_mutex[p] = row
+
+    def same_layer(self, other):
+        """
+        Returns true if both levels have the same propositions and proposition mutexes
+        """
+        return self.propositions == other.propositions and \
+            self.proposition_mutex == other.proposition_mutex
+
+
+class NoGoodTable(object):
+    """
+    The goal sets (bitsets of proposition ids) that failed to be extracted from
+    one level. A goal set is a nogood if it contains one of them, so a recorded
+    set is kept under its lowest id, and a lookup only checks the sets kept
+    under the ids of the goal set.
+    """
+
+    def __init__(self):
+        self.no_goods = {}  # lowest id -> the nogoods whose lowest id it is
+        self.size = 0
+
+    def add(self, goals):
+        low = goals & -goals
+        self.no_goods.setdefault(low.bit_length() - 1, []).append(goals)
+        self.size += 1
+
+    def __contains__(self, goals):
+        no_goods = self.no_goods
+        for p in iter_bits(goals):
+            for no_good in no_goods.get(p, ()):
+                if no_good & ~goals == 0:
+                    return True
+        return False
+
+    def __len__(self):
+        return self.size
@@ -1,8 +1,28 @@
-from util import Pair
-from proposition_layer import PropositionLayer
-from plan_graph_level import PlanGraphLevel
+import time
+from itertools import chain
+
 from action import Action
-from pgparser import PgParser
+from bitset_plan_graph import PlanGraphIndex, BitsetPlanGraphLevel, NoGoodTable, iter_bits
+from pgparser import PgParser, pop_cache_dir
+
+
+class ExtractionCounters(object):
+    """
+    Counters of the backward extraction of GraphPlan, for profiling
+    """
+
+    def __init__(self):
+        self.nogood_hits = 0
+        self.backtracks = 0
+        self.level_time = {}  # level -> seconds spent extracting from it, deeper levels included
+
+    def add_time(self, level, seconds):
+        self.level_time[level] = self.level_time.get(level, 0.0) + seconds
+
+    def __str__(self):
+        times = ", ".join("%d: %.3fs" % (level, seconds) for level, seconds in sorted(self.level_time.items()))
+        return "nogood hits: %d, backtracks: %d, extraction time per level: {%s}" % \
+            (self.nogood_hits, self.backtracks, times)
 
 
 class GraphPlan(object):
@@ -10,14 +30,14 @@ class GraphPlan(object):
     A class for initializing and running the graphplan algorithm
     """
 
-    def __init__(self, _domain, _problem):
+    def __init__(self, _domain, _problem, cache_dir=None):
         """
-        Constructor
+        Constructor. With a cache_dir, the parsed domain is cached there (see PgParser)
         """
-        self.independent_actions = set()
         self.no_goods = []
+        self.counters = ExtractionCounters()
         self.graph = []
-        p = PgParser(_domain, _problem)
+        p = PgParser(_domain, _problem, cache_dir)
         self.actions, self.propositions = p.parse_actions_and_propositions()
         # list of all the actions and list of all the propositions
 
@@ -27,11 +47,9 @@ class GraphPlan(object):
         self.create_noops()
         # creates noOps that are used to propagate existing propositions from one layer to the next
 
-        self.independent()
-        # creates independent actions set and updates self.independent_actions
-        PlanGraphLevel.set_independent_actions(self.independent_actions)
-        PlanGraphLevel.set_actions(self.actions)
-        PlanGraphLevel.set_props(self.propositions)
+        self.index = PlanGraphIndex(self.actions, self.propositions)
+        # gives the propositions and actions integer ids, and holds which actions are independent
+        self.goal_bits = self.index.prop_bits(self.goal)
 
     def graph_plan(self):
         """
@@ -41,15 +59,12 @@ class GraphPlan(object):
         # initialization
         init_state = self.initial_state
         level = 0
+        self.counters = ExtractionCounters()
         self.no_goods = []  # make sure you update noGoods in your backward search!
-        self.no_goods.append([])
+        self.no_goods.append(NoGoodTable())
         # create first layer of the graph, note it only has a proposition layer which consists of the initial state.
-        prop_layer_init = PropositionLayer()
-        for prop in init_state:
-            prop_layer_init.add_proposition(prop)
-        pg_init = PlanGraphLevel()
-        pg_init.set_proposition_layer(prop_layer_init)
-        self.graph.append(pg_init)
+        pg_init = BitsetPlanGraphLevel(self.index, self.index.prop_bits(init_state))
+        self.graph = [pg_init]
         size_no_good = -1
 
         """
@@ -58,106 +73,110 @@ class GraphPlan(object):
         and we have not reached the fixed point, continue expanding the graph
         """
 
-        while self.goal_state_not_in_prop_layer(self.graph[level].get_proposition_layer().get_propositions()) or \
-                self.goal_state_has_mutex(self.graph[level].get_proposition_layer()):
+        while self.goal_state_not_in_prop_layer(self.graph[level].propositions) or \
+                self.goal_state_has_mutex(self.graph[level]):
             if self.is_fixed(level):
                 return None
                 # this means we stopped the while loop above because we reached a fixed point in the graph.
                 #  nothing more to do, we failed!
 
-            self.no_goods.append([])
+            self.no_goods.append(NoGoodTable())
             level = level + 1
-            pg_next = PlanGraphLevel()  # create new PlanGraph object
+            pg_next = BitsetPlanGraphLevel(self.index)  # create new PlanGraph object
             pg_next.expand(
                 self.graph[level - 1])  # calls the expand function, which you are implementing in the PlanGraph class
             self.graph.append(pg_next)  # appending the new level to the plan graph
 
             size_no_good = len(self.no_goods[level])  # remember size of nogood table
 
-        plan_solution = self.extract(self.graph, self.goal, level)
+        goals = self.goal_bits
+        plan_solution = self.extract(self.graph, goals, level)
         # try to extract a plan since all of the goal propositions are in current graph level, and are not mutex
 
         while plan_solution is None:  # while we didn't extract a plan successfully
             level = level + 1
-            self.no_goods.append([])
-            pg_next = PlanGraphLevel()  # create next level of the graph by expanding
+            self.no_goods.append(NoGoodTable())
+            pg_next = BitsetPlanGraphLevel(self.index)  # create next level of the graph by expanding
             pg_next.expand(self.graph[level - 1])  # create next level of the graph by expanding
             self.graph.append(pg_next)
-            plan_solution = self.extract(self.graph, self.goal, level)  # try to extract a plan again
+            plan_solution = self.extract(self.graph, goals, level)  # try to extract a plan again
             if plan_solution is None and self.is_fixed(level):  # if failed and reached fixed point
                 if len(self.no_goods[level - 1]) == len(self.no_goods[level]):
                     # if size of nogood didn't change, means there's nothing more to do. We failed.
                     return None
                 size_no_good = len(self.no_goods[level])  # we didn't fail yet! update size of no good
-        return plan_solution
+        return [self.index.actions[a] for a in plan_solution]
 
     def extract(self, graph, sub_goals, level):
         """
         The backsearch part of graphplan that tries
         to extract a plan when all goal propositions exist in a graph plan level.
+        sub_goals is a bitset of proposition ids, and the plan is a list of action ids.
         """
 
         if level == 0:
             return []
         if sub_goals in self.no_goods[level]:
+            self.counters.nogood_hits += 1
             return None
-        plan_solution = self.gp_search(graph, sub_goals, [], level)
+        start = time.perf_counter()
+        plan_solution = self.gp_search(graph, sub_goals, [], 0, level)
+        self.counters.add_time(level, time.perf_counter() - start)
         if plan_solution is not None:
             return plan_solution
-        self.no_goods[level].append([sub_goals])
+        self.no_goods[level].add(sub_goals)
         return None
 
-    def gp_search(self, graph, sub_goals, _plan, level):
-        if len(sub_goals) == 0:
-            new_goals = []
+    def gp_search(self, graph, sub_goals, _plan, plan_mutex, level):
+        """
+        Chooses actions of the given level that achieve sub_goals, one goal at a time.
+        plan_mutex is the bitset of the actions that are mutex with an action of _plan.
+        """
+        index = self.index
+        if not sub_goals:
+            new_goals = 0
             for action in _plan:
-                for prop in action.get_pre():
-                    if prop not in new_goals:
-                        new_goals.append(prop)
+                new_goals |= index.pre[action]
             new_plan = self.extract(graph, new_goals, level - 1)
             if new_plan is None:
                 return None
             else:
                 return new_plan + _plan
 
-        prop = sub_goals[0]
-        providers = []
-        for action1 in [act for act in graph[level].get_action_layer().get_actions() if prop in act.get_add()]:
-            no_mutex = True
-            for action2 in _plan:
-                if Pair(action1, action2) not in self.independent_actions:
-                    no_mutex = False
-                    break
-            if no_mutex:
-                providers.append(action1)
-        for action in providers:
-            new_sub_goals = [g for g in sub_goals if g not in action.get_add()]
-            plan_clone = list(_plan)
-            plan_clone.append(action)
-            new_plan = self.gp_search(graph, new_sub_goals, plan_clone, level)
+        # the goal with the fewest providers that are not mutex with the plan comes first,
+        # and a goal without any fails the partial plan right away
+        layer = graph[level]
+        providers, fewest = 0, -1
+        for prop in iter_bits(sub_goals):
+            candidates = layer.providers(prop) & ~plan_mutex
+            count = bin(candidates).count('1')
+            if count == 0:
+                self.counters.backtracks += 1
+                return None
+            if fewest < 0 or count < fewest:
+                providers, fewest = candidates, count
+
+        # noOps first, they keep the goal for an earlier level instead of adding an action
+        for action in chain(iter_bits(providers & index.noops), iter_bits(providers & ~index.noops)):
+            new_plan = self.gp_search(graph, sub_goals & ~index.add[action], _plan + [action],
+                                      plan_mutex | layer.action_mutex[action], level)
             if new_plan is not None:
                 return new_plan
+        self.counters.backtracks += 1
         return None
 
     def goal_state_not_in_prop_layer(self, propositions):
         """
-        Helper function that receives a  list of propositions (propositions) and returns true
-        if not all the goal propositions are in that list
+        Helper function that receives a bitset of propositions (propositions) and returns true
+        if not all the goal propositions are in that bitset
         """
-        for goal in self.goal:
-            if goal not in propositions:
-                return True
-        return False
+        return self.goal_bits & ~propositions != 0
 
-    def goal_state_has_mutex(self, prop_layer):
+    def goal_state_has_mutex(self, level):
         """
-        Helper function that checks whether all goal propositions are non mutex at the current graph level
+        Helper function that checks whether all goal propositions are non mutex at the given graph level
         """
-        for goal1 in self.goal:
-            for goal2 in self.goal:
-                if prop_layer.is_mutex(goal1, goal2):
-                    return True
-        return False
+        return level.has_mutex(self.goal_bits)
 
     def is_fixed(self, level):
         """
@@ -166,13 +185,7 @@ class GraphPlan(object):
         """
         if level == 0:
             return False
-
-        if len(self.graph[level].get_proposition_layer().get_propositions()) == \
-                len(self.graph[level - 1].get_proposition_layer().get_propositions()) and \
-                len(self.graph[level].get_proposition_layer().get_mutex_props()) == \
-                len(self.graph[level - 1].get_proposition_layer().get_mutex_props()):
-            return True
-        return False
+        return self.graph[level].same_layer(self.graph[level - 1])
 
     def create_noops(self):
         """
@@ -189,36 +202,16 @@ class GraphPlan(object):
             self.actions.append(act)
             prop.add_producer(act)
 
-    def independent(self):
-        """
-        Creates a set of independent actions
-        """
-        for i in range(len(self.actions)):
-            for j in range(i + 1, len(self.actions)):
-                act1 = self.actions[i]
-                act2 = self.actions[j]
-                if independent_pair(act1, act2):
-                    self.independent_actions.add(Pair(act1, act2))
-
     def is_independent(self, a1, a2):
-        return Pair(a1, a2) in self.independent_actions
-
-    @staticmethod
-    def no_mutex_action_in_plan(plan_, act, action_layer):
-        """
-        Helper action that you may want to use when extracting plans,
-        returns true if there are no mutex actions in the plan
-        """
-        for plan_act in plan_:
-            if action_layer.is_mutex(Pair(plan_act, act)):
-                return False
-        return True
+        index = self.index
+        return index.is_independent(index.action_ids[a1], index.action_ids[a2])
 
 
 def independent_pair(a1, a2):
     """
     Returns true if the actions are neither have inconsistent effects
     nor they interfere one with the other.
+    PlanGraphIndex.interference holds the same relation as bitset rows.
     You might want to use those functions:
     a1.get_pre() returns the pre list of a1
     a1.get_add() returns the add list of a1
@@ -243,10 +236,10 @@ def independent_pair(a1, a2):
 
 if __name__ == '__main__':
     import sys
-    import time
 
+    cache_dir = pop_cache_dir(sys.argv)
     if len(sys.argv) != 1 and len(sys.argv) != 3:
-        print("Usage: graph_plan.py domain_name problem_name")
+        print("Usage: graph_plan.py domain_name problem_name [--cache dir]")
         exit()
     domain = 'dwrDomain.txt'
     problem = 'dwrProblem.txt'
@@ -254,11 +247,14 @@ if __name__ == '__main__':
         domain = str(sys.argv[1])
         problem = str(sys.argv[2])
 
-    gp = GraphPlan(domain, problem)
-    start = time.clock()
+    # the backward search recurses once per chosen action and once per level
+    sys.setrecursionlimit(100000)
+    gp = GraphPlan(domain, problem, cache_dir)
+    start = time.perf_counter()
     plan = gp.graph_plan()
-    elapsed = time.clock() - start
+    elapsed = time.perf_counter() - start
     if plan is not None:
         print("Plan found with %d actions in %.2f seconds" % (len([act for act in plan if not act.is_noop()]), elapsed))
     else:
         print("Could not find a plan in %.2f seconds" % elapsed)
+    print(gp.counters)
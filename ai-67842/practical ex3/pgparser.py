@@ -1,3 +1,7 @@
+import hashlib
+import os
+import pickle
+
 from action import Action
 from proposition import Proposition
 
@@ -5,77 +9,104 @@ from proposition import Proposition
 class PgParser:
     """
     A utility class for parsing the domain and problem.
+    The domain file is read in one pass, and every proposition name is mapped to a
+    single Proposition object, which the actions and the problem share.
+    With a cache_dir, the parsed domain is also kept there in a compact binary form
+    (the proposition names and the ids of each action), under the hash of the domain
+    file, and later parses of the same file read that instead.
     """
 
-    def __init__(self, domain_file, problem_file):
+    def __init__(self, domain_file, problem_file, cache_dir=None):
         """
         Constructor
         """
         self.domain_file = domain_file
         self.problem_file = problem_file
+        self.cache_dir = cache_dir
+        self.prop_by_name = {}  # name -> the Proposition of that name in the domain
 
     def parse_actions_and_propositions(self):
-        propositions = []
-        f = open(self.domain_file, 'r')
-        _ = f.readline()
-        proposition_line = f.readline()
-        words = [word.rstrip() for word in proposition_line.split(" ") if len(word.rstrip()) > 0]
-        for i in range(0, len(words)):
-            propositions.append(Proposition(words[i]))
-        actions = []
-        f = open(self.domain_file, 'r')
-        line = f.readline()
-        while line != '':
-            words = [word.rstrip() for word in line.split(" ") if len(word.rstrip()) > 0]
-            if words[0] == 'Name:':
-                name = words[1]
-                line = f.readline()
-                precond = []
-                add = []
-                delete = []
-                words = [word.rstrip() for word in line.split(" ") if len(word.rstrip()) > 0]
-                for i in range(1, len(words)):
-                    precond.append(Proposition(words[i]))
-                line = f.readline()
-                words = [word.rstrip() for word in line.split(" ") if len(word.rstrip()) > 0]
-                for i in range(1, len(words)):
-                    add.append(Proposition(words[i]))
-                line = f.readline()
-                words = [word.rstrip() for word in line.split(" ") if len(word.rstrip()) > 0]
-                for i in range(1, len(words)):
-                    delete.append(Proposition(words[i]))
-                act = Action(name, precond, add, delete)
-                for prop in add:
-                    self.find_prop_by_name(prop, propositions).add_producer(act)
-                actions.append(act)
-            line = f.readline()
+        cache_file = None
+        if self.cache_dir is not None:
+            with open(self.domain_file, 'rb') as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+            cache_file = os.path.join(self.cache_dir, digest + '.pickle')
+            if os.path.exists(cache_file):
+                with open(cache_file, 'rb') as f:
+                    return self.build_domain(*pickle.load(f))
+
+        names, compact_actions = self.read_domain()
+        if cache_file is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(cache_file, 'wb') as f:
+                pickle.dump((names, compact_actions), f, pickle.HIGHEST_PROTOCOL)
+        return self.build_domain(names, compact_actions)
 
-        for a in actions:
-            new_pre = [p for p in propositions if p.name in [q.name for q in a.pre]]
-            new_add = [p for p in propositions if p.name in [q.name for q in a.add]]
-            new_delete = [p for p in propositions if p.name in [q.name for q in a.delete]]
-            a.pre = new_pre
-            a.add = new_add
-            a.delete = new_delete
+    def read_domain(self):
+        """
+        Streams the domain file and returns the proposition names and, for each action,
+        its name and the sorted ids (indices in the names) of its preconditions, add list
+        and delete list. Names that are not propositions of the domain are left out of
+        the preconditions and the delete list, as an unknown add is an error.
+        """
+        with open(self.domain_file, 'r') as f:
+            _ = f.readline()
+            names = f.readline().split()
+            ids = {name: i for i, name in enumerate(names)}
+            compact_actions = []
+            lines = (line.split() for line in f)
+            for words in lines:
+                if not words or words[0] != 'Name:':
+                    continue
+                name = words[1]
+                pre, add, delete = next(lines), next(lines), next(lines)
+                compact_actions.append((name,
+                                        tuple(sorted({ids[w] for w in pre[1:] if w in ids})),
+                                        tuple(sorted({ids[w] for w in add[1:]})),
+                                        tuple(sorted({ids[w] for w in delete[1:] if w in ids}))))
+        return names, compact_actions
 
+    def build_domain(self, names, compact_actions):
+        """
+        Creates the propositions and actions of a domain read by read_domain, with the
+        producers of every proposition
+        """
+        propositions = [Proposition(name) for name in names]
+        self.prop_by_name = {prop.name: prop for prop in propositions}
+        actions = []
+        for name, pre, add, delete in compact_actions:
+            act = Action(name, [propositions[i] for i in pre], [propositions[i] for i in add],
+                         [propositions[i] for i in delete])
+            for i in add:
+                propositions[i].add_producer(act)
+            actions.append(act)
         return [actions, propositions]
 
-    @staticmethod
-    def find_prop_by_name(name, propositions):
-        for prop in propositions:
-            if prop == name:
-                return prop
+    def find_prop_by_name(self, name):
+        """
+        Returns the Proposition of the domain with the given name
+        """
+        prop = self.prop_by_name.get(name)
+        if prop is None:
+            raise ValueError("%s: %s is not a proposition of the domain %s"
+                             % (self.problem_file, name, self.domain_file))
+        return prop
 
     def parse_problem(self):
-        init = []
-        goal = []
-        f = open(self.problem_file, 'r')
-        line = f.readline()
-        words = [word.rstrip() for word in line.split(" ") if len(word.rstrip()) > 0]
-        for i in range(2, len(words)):
-            init.append(Proposition(words[i]))
-        line = f.readline()
-        words = [word.rstrip() for word in line.split(" ") if len(word.rstrip()) > 0]
-        for i in range(2, len(words)):
-            goal.append(Proposition(words[i]))
+        with open(self.problem_file, 'r') as f:
+            init = [self.find_prop_by_name(word) for word in f.readline().split()[2:]]
+            goal = [self.find_prop_by_name(word) for word in f.readline().split()[2:]]
         return init, goal
+
+
+def pop_cache_dir(argv):
+    """
+    Removes a "--cache dir" option from the given command line arguments, and returns
+    the dir (the cache_dir of PgParser), or None if there is no such option
+    """
+    if '--cache' not in argv[:-1]:
+        return None
+    i = argv.index('--cache')
+    cache_dir = argv[i + 1]
+    del argv[i:i + 2]
+    return cache_dir
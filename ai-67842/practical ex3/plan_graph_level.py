@@ -172,8 +172,7 @@ def have_competing_needs(a1, a2, mutex_props):
     Hint: for propositions p  and q, the command  "Pair(p, q) in mutex_props"
           returns true if p and q are mutex in the previous level
     """
-    mutex = set(mutex_props)
-    return any(Pair(p, q) in mutex for p in a1.get_pre() for q in a2.get_pre())
+    return any(Pair(p, q) in mutex_props for p in a1.get_pre() for q in a2.get_pre())
 
 
 def mutex_propositions(prop1, prop2, mutex_actions_list):
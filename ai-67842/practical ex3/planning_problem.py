@@ -1,15 +1,14 @@
-from util import Pair
-import copy
-from proposition_layer import PropositionLayer
-from plan_graph_level import PlanGraphLevel
-from pgparser import PgParser
+from pgparser import PgParser, pop_cache_dir
 from action import Action
+from relaxed_plan_graph import RelaxedPlanGraph
 
 try:
     from search import SearchProblem
     from search import a_star_search
+    from search import SearchStatistics
 
 except:
+    SearchStatistics = None
     try:
         from CPF.search import SearchProblem
         from CPF.search import a_star_search
@@ -19,11 +18,14 @@ except:
 
 
 class PlanningProblem:
-    def __init__(self, domain_file, problem_file):
+    def __init__(self, domain_file, problem_file, helpful_actions=False, cache_dir=None):
         """
-        Constructor
+        Constructor. With helpful_actions, a state only has the successors of its helpful
+        actions (see relaxed_plan_graph.py) when it has any, which makes the search faster
+        but the plans it finds no longer necessarily optimal.
+        With a cache_dir, the parsed domain is cached there (see PgParser).
         """
-        p = PgParser(domain_file, problem_file)
+        p = PgParser(domain_file, problem_file, cache_dir)
         self.actions, self.propositions = p.parse_actions_and_propositions()
         # list of all the actions and list of all the propositions
 
@@ -36,8 +38,21 @@ class PlanningProblem:
         self.create_noops()
         # creates noOps that are used to propagate existing propositions from one layer to the next
 
-        PlanGraphLevel.set_actions(self.actions)
-        PlanGraphLevel.set_props(self.propositions)
+        self.relaxed_graph = RelaxedPlanGraph(self.actions, self.propositions, self.goal)
+        self.helpful_actions = helpful_actions
+
+        # the actions that can change a state (noOps can't), each with its preconditions,
+        # delete list and add list as frozensets, filed under its first precondition
+        self.state_actions = [action for action in self.actions if not action.is_noop()]
+        self.action_sets = [(frozenset(action.get_pre()), frozenset(action.get_delete()),
+                             frozenset(action.get_add())) for action in self.state_actions]
+        self.actions_by_pre = {}
+        self.free_actions = []
+        for i, action in enumerate(self.state_actions):
+            if action.get_pre():
+                self.actions_by_pre.setdefault(min(action.get_pre()), []).append(i)
+            else:
+                self.free_actions.append(i)
         self.expanded = 0
 
     def get_start_state(self):
@@ -63,13 +78,16 @@ class PlanningProblem:
         Note that a state *must* be hashable!! Therefore, you might want to represent a state as a frozenset
         """
         self.expanded += 1
+        candidates = list(self.free_actions)
+        for prop in state:
+            candidates.extend(self.actions_by_pre.get(prop, ()))
+        helpful = self.relaxed_graph.helpful_actions(state) if self.helpful_actions else None
         lst = []
-        set_state = set(state)
-        for action in self.actions:
-            if action.all_preconds_in_list(state):
-                new_state = set_state - set(action.get_delete())
-                new_state = frozenset(new_state | set(action.get_add()))
-                lst.append((new_state, action, 1))
+        for i in sorted(candidates):
+            pre, delete, add = self.action_sets[i]
+            action = self.state_actions[i]
+            if pre <= state and (not helpful or action in helpful):
+                lst.append(((state - delete) | add, action, 1))
         return lst
 
     @staticmethod
@@ -105,32 +123,8 @@ def max_level(state, planning_problem):
     """
     The heuristic value is the number of layers required to expand all goal propositions.
     If the goal is not reachable from the state your heuristic should return float('inf')
-    A good place to start would be:
-    prop_layer_init = PropositionLayer()          #create a new proposition layer
-    for prop in state:
-        prop_layer_init.add_proposition(prop)        #update the proposition layer with the propositions of the state
-    pg_init = PlanGraphLevel()                   #create a new plan graph level (level is the action layer and the propositions layer)
-    pg_init.set_proposition_layer(prop_layer_init)   #update the new plan graph level with the the proposition layer
     """
-    prop_layer_init = PropositionLayer()
-    for prop in state:
-        prop_layer_init.add_proposition(prop)
-    level = PlanGraphLevel()
-    level.set_proposition_layer(prop_layer_init)
-    count = 0
-    graph = [level]
-
-    while not is_fixed(graph, count):
-        curr_props = graph[-1].get_proposition_layer().get_propositions()
-        if planning_problem.is_goal_state(curr_props):
-            return count
-
-        new_level = PlanGraphLevel()
-        new_level.expand_without_mutex(graph[-1])
-        graph.append(new_level)
-        count += 1
-
-    return float('inf')
+    return planning_problem.relaxed_graph.max_level(state)
 
 
 def level_sum(state, planning_problem):
@@ -138,41 +132,23 @@ def level_sum(state, planning_problem):
     The heuristic value is the sum of sub-goals level they first appeared.
     If the goal is not reachable from the state your heuristic should return float('inf')
     """
-    prop_layer_init = PropositionLayer()
-    for prop in state:
-        prop_layer_init.add_proposition(prop)
-    level = PlanGraphLevel()
-    level.set_proposition_layer(prop_layer_init)
-    count = 0
-    s = 0
-    goals = set(planning_problem.goal)
-    graph = [level]
-
-    while not is_fixed(graph, count):
-        curr_props = graph[-1].get_proposition_layer().get_propositions()
-        helper = set(curr_props) & goals
-        goals = goals - helper
-        s += len(helper) * count
-        if goals == set():
-            return s
-
-        new_level = PlanGraphLevel()
-        new_level.expand_without_mutex(graph[-1])
-        graph.append(new_level)
-        count += 1
-
-    return float('inf')
-
-
-def is_fixed(graph, level):
+    return planning_problem.relaxed_graph.level_sum(state)
+
+
+def additive(state, planning_problem):
     """
-    Checks if we have reached a fixed point,
-    i.e. each level we'll expand would be the same, thus no point in continuing
+    The heuristic value is the sum of the relaxed costs of the sub-goals (h_add).
+    Not admissible, like level_sum.
     """
-    if level == 0:
-        return False
-    return len(graph[level].get_proposition_layer().get_propositions()) == len(
-        graph[level - 1].get_proposition_layer().get_propositions())
+    return planning_problem.relaxed_graph.additive(state)
+
+
+def relaxed_plan(state, planning_problem):
+    """
+    The heuristic value is the number of actions of a relaxed plan (h_FF).
+    Not admissible.
+    """
+    return planning_problem.relaxed_graph.relaxed_plan_length(state)
 
 
 def null_heuristic(*args, **kwargs):
@@ -183,31 +159,44 @@ if __name__ == '__main__':
     import sys
     import time
 
-    if len(sys.argv) != 1 and len(sys.argv) != 4:
-        print("Usage: PlanningProblem.py domainName problemName heuristicName(max, sum or zero)")
+    usage = "Usage: planning_problem.py domain_name problem_name heuristic_name[max, sum, add, ff, zero] [helpful] [--cache dir]"
+    cache_dir = pop_cache_dir(sys.argv)
+    if len(sys.argv) not in (1, 4, 5) or len(sys.argv) == 5 and sys.argv[4] != 'helpful':
+        print(usage)
         exit()
     domain = 'dwrDomain.txt'
     problem = 'dwrProblem.txt'
     heuristic = null_heuristic
-    if len(sys.argv) == 4:
+    if len(sys.argv) >= 4:
         domain = str(sys.argv[1])
         problem = str(sys.argv[2])
         if str(sys.argv[3]) == 'max':
             heuristic = max_level
         elif str(sys.argv[3]) == 'sum':
             heuristic = level_sum
+        elif str(sys.argv[3]) == 'add':
+            heuristic = additive
+        elif str(sys.argv[3]) == 'ff':
+            heuristic = relaxed_plan
         elif str(sys.argv[3]) == 'zero':
             heuristic = null_heuristic
         else:
-            print("Usage: planning_problem.py domain_name problem_name heuristic_name[max, sum, zero]")
+            print(usage)
             exit()
 
-    prob = PlanningProblem(domain, problem)
-    start = time.clock()
-    plan = a_star_search(prob, heuristic)
-    elapsed = time.clock() - start
+    prob = PlanningProblem(domain, problem, helpful_actions=len(sys.argv) == 5, cache_dir=cache_dir)
+    start = time.perf_counter()
+    if SearchStatistics is None:
+        stats = None
+        plan = a_star_search(prob, heuristic)
+    else:
+        stats = SearchStatistics()
+        plan = a_star_search(prob, heuristic, stats=stats)
+    elapsed = time.perf_counter() - start
     if plan is not None:
         print("Plan found with %d actions in %.2f seconds" % (len(plan), elapsed))
     else:
         print("Could not find a plan in %.2f seconds" % elapsed)
     print("Search nodes expanded: %d" % prob.expanded)
+    if stats is not None:
+        print("Search statistics: %s" % stats)
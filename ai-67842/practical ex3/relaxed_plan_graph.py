@@ -0,0 +1,223 @@
+"""
+The relaxed plan graph of a planning problem, the one whose actions have no
+delete effects, for the heuristics of planning_problem.py. Propositions and
+actions get integer ids, and instead of building plan graph levels every
+action counts its preconditions that are not reached yet: an action is
+reached when its counter drops to zero, so exploring the graph from a state
+touches every action once per precondition.
+"""
+import heapq
+
+INFINITY = float('inf')
+
+
+class RelaxedPlanGraph(object):
+    """
+    The relaxed plan graph heuristics of a planning problem, cached per state
+    (a frozenset of propositions)
+    """
+
+    def __init__(self, actions, propositions, goal):
+        """
+        Constructor. The noOps in actions are ignored, a relaxed state only grows.
+        """
+        self.actions = [action for action in actions if not action.is_noop()]
+        self.propositions = list(propositions)
+        self.prop_ids = {prop.get_name(): i for i, prop in enumerate(self.propositions)}
+        self.pre = [self.prop_id_list(action.get_pre()) for action in self.actions]
+        self.add = [self.prop_id_list(action.get_add()) for action in self.actions]
+        self.goal = self.prop_id_list(goal)
+        self.is_goal = [False] * len(self.propositions)
+        for g in self.goal:
+            self.is_goal[g] = True
+
+        # prop -> the actions that need / add it
+        self.needers = [[] for _ in self.propositions]
+        self.adders = [[] for _ in self.propositions]
+        for a in range(len(self.actions)):
+            for p in self.pre[a]:
+                self.needers[p].append(a)
+            for p in self.add[a]:
+                self.adders[p].append(a)
+        self.free_actions = [a for a in range(len(self.actions)) if not self.pre[a]]
+
+        self.cache = {}  # (heuristic name, state) -> value
+        self.helpful = {}  # state -> the helpful actions of the state
+
+    def prop_id_list(self, propositions):
+        """
+        Returns the sorted ids of the given propositions (matched by name), without repetitions
+        """
+        return sorted({self.prop_ids[prop.get_name()] for prop in propositions})
+
+    def explore(self, state):
+        """
+        Expands the relaxed plan graph of state level by level, until all the goal
+        propositions are reached or nothing new is. Returns the first level of every
+        proposition and the first level every action is applicable in (None if never).
+        """
+        prop_level = [None] * len(self.propositions)
+        action_level = [None] * len(self.actions)
+        counters = [len(pre) for pre in self.pre]
+        frontier = self.prop_id_list(state)
+        for p in frontier:
+            prop_level[p] = 0
+        ready = list(self.free_actions)
+        missing = len(self.goal)
+        level = 0
+        while True:
+            for p in frontier:
+                if self.is_goal[p]:
+                    missing -= 1
+                for a in self.needers[p]:
+                    counters[a] -= 1
+                    if counters[a] == 0:
+                        ready.append(a)
+            if missing == 0 or not ready:
+                return prop_level, action_level
+            frontier = []
+            for a in ready:
+                action_level[a] = level
+                for p in self.add[a]:
+                    if prop_level[p] is None:
+                        prop_level[p] = level + 1
+                        frontier.append(p)
+            ready = []
+            level += 1
+
+    def goal_levels(self, state):
+        """
+        Returns the first level of every goal proposition, or None if one is unreachable
+        """
+        prop_level, _ = self.explore(state)
+        levels = [prop_level[g] for g in self.goal]
+        return None if None in levels else levels
+
+    def max_level(self, state):
+        """
+        The number of levels required to reach all goal propositions (h_max)
+        """
+        key = ('max', state)
+        if key not in self.cache:
+            levels = self.goal_levels(state)
+            self.cache[key] = INFINITY if levels is None else max(levels, default=0)
+        return self.cache[key]
+
+    def level_sum(self, state):
+        """
+        The sum of the levels the goal propositions first appear in
+        """
+        key = ('sum', state)
+        if key not in self.cache:
+            levels = self.goal_levels(state)
+            self.cache[key] = INFINITY if levels is None else sum(levels)
+        return self.cache[key]
+
+    def additive(self, state):
+        """
+        The sum of the costs of the goal propositions, where the cost of an action is one
+        plus the sum of the costs of its preconditions, and the cost of a proposition is
+        the lowest cost of an action adding it (h_add). The costs are settled in increasing
+        order, Dijkstra style.
+        """
+        key = ('add', state)
+        if key in self.cache:
+            return self.cache[key]
+        cost = [INFINITY] * len(self.propositions)
+        action_cost = [0] * len(self.actions)
+        counters = [len(pre) for pre in self.pre]
+        heap = []
+        for p in self.prop_id_list(state):
+            cost[p] = 0
+            heap.append((0, p))
+        for a in self.free_actions:
+            for p in self.add[a]:
+                if cost[p] > 1:
+                    cost[p] = 1
+                    heap.append((1, p))
+        heapq.heapify(heap)
+        missing = len(self.goal)
+        while heap and missing:
+            c, p = heapq.heappop(heap)
+            if c > cost[p]:
+                continue
+            if self.is_goal[p]:
+                missing -= 1
+            for a in self.needers[p]:
+                action_cost[a] += c
+                counters[a] -= 1
+                if counters[a] == 0:
+                    new_cost = action_cost[a] + 1
+                    for q in self.add[a]:
+                        if new_cost < cost[q]:
+                            cost[q] = new_cost
+                            heapq.heappush(heap, (new_cost, q))
+        value = INFINITY if missing else sum(cost[g] for g in self.goal)
+        self.cache[key] = value
+        return value
+
+    def relaxed_plan(self, state):
+        """
+        Extracts a relaxed plan from the relaxed plan graph of state, FF style: the goals
+        are achieved from the last level down, each by the action of the level before it
+        with the easiest preconditions, unless an action already chosen achieves it.
+        Returns the action ids of the plan and of the helpful actions, those applicable in
+        state that add a goal of the first level, or None if the goal is unreachable.
+        """
+        prop_level, action_level = self.explore(state)
+        if any(prop_level[g] is None for g in self.goal):
+            return None
+        top = max([prop_level[g] for g in self.goal], default=0)
+        goals = [[] for _ in range(top + 1)]
+        is_sub_goal = set()
+        for g in self.goal:
+            goals[prop_level[g]].append(g)
+            is_sub_goal.add((g, prop_level[g]))
+        achieved = set()  # (prop, level) pairs achieved by the chosen actions
+        plan = []
+        for level in range(top, 0, -1):
+            for g in goals[level]:
+                if (g, level) in achieved:
+                    continue
+                action = min((a for a in self.adders[g] if action_level[a] == level - 1),
+                             key=lambda a: sum(prop_level[p] for p in self.pre[a]))
+                plan.append(action)
+                for p in self.add[action]:
+                    achieved.add((p, level))
+                    achieved.add((p, level - 1))
+                for p in self.pre[action]:
+                    sub_goal = (p, prop_level[p])
+                    if prop_level[p] != 0 and sub_goal not in is_sub_goal and sub_goal not in achieved:
+                        is_sub_goal.add(sub_goal)
+                        goals[prop_level[p]].append(p)
+        helpful = set()
+        if top > 0:
+            for g in goals[1]:
+                helpful.update(a for a in self.adders[g] if action_level[a] == 0)
+        return plan, helpful
+
+    def relaxed_plan_length(self, state):
+        """
+        The number of actions in the relaxed plan of state (h_FF). Also remembers the
+        helpful actions of state.
+        """
+        key = ('ff', state)
+        if key in self.cache:
+            return self.cache[key]
+        result = self.relaxed_plan(state)
+        if result is None:
+            value, helpful = INFINITY, []
+        else:
+            plan, helpful = result
+            value = len(plan)
+        self.cache[key] = value
+        self.helpful[state] = set(self.actions[a] for a in helpful)
+        return value
+
+    def helpful_actions(self, state):
+        """
+        Returns the set of helpful actions of state
+        """
+        if state not in self.helpful:
+            self.relaxed_plan_length(state)
+        return self.helpful[state]
@@ -2,6 +2,7 @@ import sys
 import inspect
 import heapq
 import random
+from collections import deque
 
 
 class Pair(object):
@@ -72,13 +73,13 @@ class Queue:
     """
 
     def __init__(self):
-        self.list = []
+        self.list = deque()
 
     def push(self, item):
         """
         Enqueue the 'item' into the queue
         """
-        self.list.insert(0, item)
+        self.list.appendleft(item)
 
     def pop(self):
         """
@@ -148,6 +149,95 @@ class PriorityQueueWithFunction(PriorityQueue):
         PriorityQueue.push(self, item, self.priorityFunction(item))
 
 
+class IndexedPriorityQueue:
+    """
+    A binary min-heap of distinct items that keeps the position of every
+    item, so the priority of a queued item can be lowered in place
+    (decrease-key) instead of pushing a duplicate. Items must be hashable;
+    items of equal priority are popped in the order they were first pushed.
+    """
+
+    def __init__(self):
+        self.heap = []  # [(priority, count), item] entries
+        self.index = {}  # item -> position of its entry in the heap
+        self.count = 0
+
+    def push(self, item, priority):
+        """Adds 'item', or lowers its priority if it is queued with a higher one"""
+        position = self.index.get(item)
+        if position is None:
+            self.heap.append([(priority, self.count), item])
+            self.count += 1
+            self.index[item] = len(self.heap) - 1
+            self._sift_up(len(self.heap) - 1)
+        elif priority < self.heap[position][0][0]:
+            entry = self.heap[position]
+            entry[0] = (priority, entry[0][1])
+            self._sift_up(position)
+
+    update = push
+
+    def pop(self):
+        """Removes and returns the item of the lowest priority"""
+        return self.pop_with_priority()[0]
+
+    def pop_with_priority(self):
+        """Removes the item of the lowest priority and returns (item, priority)"""
+        last = self.heap.pop()
+        if self.heap:
+            top, self.heap[0] = self.heap[0], last
+            self.index[last[1]] = 0
+            self._sift_down(0)
+        else:
+            top = last
+        del self.index[top[1]]
+        return top[1], top[0][0]
+
+    def priority(self, item):
+        """Returns the priority of a queued 'item'"""
+        return self.heap[self.index[item]][0][0]
+
+    def isEmpty(self):
+        return len(self.heap) == 0
+
+    def __contains__(self, item):
+        return item in self.index
+
+    def __len__(self):
+        return len(self.heap)
+
+    def _sift_up(self, position):
+        heap, index = self.heap, self.index
+        entry = heap[position]
+        while position > 0:
+            parent = (position - 1) >> 1
+            if heap[parent][0] <= entry[0]:
+                break
+            heap[position] = heap[parent]
+            index[heap[position][1]] = position
+            position = parent
+        heap[position] = entry
+        index[entry[1]] = position
+
+    def _sift_down(self, position):
+        heap, index = self.heap, self.index
+        size = len(heap)
+        entry = heap[position]
+        while True:
+            child = 2 * position + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1][0] < heap[child][0]:
+                child += 1
+            if entry[0] <= heap[child][0]:
+                break
+            heap[position] = heap[child]
+            index[heap[position][1]] = position
+            position = child
+        heap[position] = entry
+        index[entry[1]] = position
+
+
 def manhattan_distance(xy1, xy2):
     """Returns the Manhattan distance between points xy1 and xy2"""
     return abs(xy1[0] - xy2[0]) + abs(xy1[1] - xy2[1])
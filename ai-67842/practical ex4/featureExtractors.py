@@ -10,6 +10,8 @@
 
 from game import Directions, Actions
 import util
+from collections import deque
+import numpy as np
 
 class FeatureExtractor:  
   def getFeatures(self, state, action):    
@@ -85,4 +87,119 @@ class SimpleExtractor(FeatureExtractor):
       # will diverge wildly
       features["closest-food"] = float(dist) / (walls.width * walls.height) 
     features.divideAll(10.0)
-    return features
\ No newline at end of file
+    return features
+
+class MazeDistances:
+  """
+  The maze distance between every two open cells of a layout, found once
+  by a breadth first search from every cell (the walls never change), so
+  a distance is a table lookup. Unreachable cells are at distance inf.
+  """
+  def __init__(self, walls):
+    self.cells = [(x, y) for x in range(walls.width) for y in range(walls.height) if not walls[x][y]]
+    self.cellIndex = dict((cell, i) for i, cell in enumerate(self.cells))
+    neighbors = [[self.cellIndex[n] for n in Actions.getLegalNeighbors(cell, walls) if n != cell]
+                 for cell in self.cells]
+    self.distances = np.full((len(self.cells), len(self.cells)), np.inf)
+    for source in range(len(self.cells)):
+      row = self.distances[source]
+      row[source] = 0
+      fringe = deque([source])
+      while fringe:
+        cell = fringe.popleft()
+        for n in neighbors[cell]:
+          if row[n] == np.inf:
+            row[n] = row[cell] + 1
+            fringe.append(n)
+
+  def index(self, position):
+    "The index of the cell of a position, rounded the way Actions.getLegalNeighbors does"
+    x, y = position
+    return self.cellIndex[(int(x + 0.5), int(y + 0.5))]
+
+_mazeDistances = {}  # the walls of a layout, as a tuple of columns -> its MazeDistances
+_lastMazeDistances = [None, None]  # the last walls looked up, and their MazeDistances
+
+def getMazeDistances(walls):
+  """
+  The MazeDistances of the given walls, computed once per layout
+  """
+  if _lastMazeDistances[0] is walls:
+    return _lastMazeDistances[1]
+  key = tuple(tuple(column) for column in walls.data)
+  if key not in _mazeDistances:
+    _mazeDistances[key] = MazeDistances(walls)
+  _lastMazeDistances[:] = [walls, _mazeDistances[key]]
+  return _mazeDistances[key]
+
+class FeatureSchema:
+  """
+  The names of the features of a VectorFeatureExtractor, in the order of
+  the entries of its feature vectors
+  """
+  def __init__(self, names):
+    self.names = tuple(names)
+    self.index = dict((name, i) for i, name in enumerate(self.names))
+
+  def __len__(self):
+    return len(self.names)
+
+  def toCounter(self, vector):
+    "The features of a vector as the dict getFeatures returns, zeros left out"
+    feats = util.Counter()
+    for name, value in zip(self.names, vector):
+      if value:
+        feats[name] = float(value)
+    return feats
+
+class VectorFeatureExtractor(FeatureExtractor):
+  """
+  A feature extractor whose features are the entries of a dense NumPy
+  vector, named by its schema. getFeatureMatrix extracts the features of
+  many actions of a state at once, a row per action.
+  """
+  schema = FeatureSchema([])
+
+  def getFeatureMatrix(self, state, actions):
+    util.raiseNotDefined()
+
+  def getFeatureVector(self, state, action):
+    return self.getFeatureMatrix(state, [action])[0]
+
+  def getFeatures(self, state, action):
+    return self.schema.toCounter(self.getFeatureVector(state, action))
+
+class SimpleVectorExtractor(VectorFeatureExtractor):
+  """
+  The features of SimpleExtractor, with the distances looked up in the
+  MazeDistances of the layout instead of searched for.
+  """
+  schema = FeatureSchema(["bias", "#-of-ghosts-1-step-away", "eats-food", "closest-food"])
+
+  def getFeatureMatrix(self, state, actions):
+    food = state.getFood()
+    walls = state.getWalls()
+    maze = getMazeDistances(walls)
+    foodCells = [maze.cellIndex[(x, y)] for x, column in enumerate(food.data)
+                 for y, isFood in enumerate(column) if isFood]
+    ghostCells = [maze.index(g) for g in state.getGhostPositions()]
+
+    x, y = state.getPacmanPosition()
+    nextCells = []
+    for action in actions:
+      dx, dy = Actions.directionToVector(action)
+      nextCells.append(maze.cellIndex[(int(x + dx), int(y + dy))])
+
+    features = np.zeros((len(actions), len(self.schema)))
+    features[:, 0] = 1.0
+    if ghostCells:
+      features[:, 1] = (maze.distances[np.ix_(nextCells, ghostCells)] <= 1).sum(axis=1)
+    for i, cell in enumerate(nextCells):
+      x_next, y_next = maze.cells[cell]
+      if not features[i, 1] and food[x_next][y_next]:
+        features[i, 2] = 1.0
+    if foodCells:
+      closest = maze.distances[np.ix_(nextCells, foodCells)].min(axis=1)
+      reachable = closest < np.inf
+      features[reachable, 3] = closest[reachable] / (walls.width * walls.height)
+    return features / 10.0
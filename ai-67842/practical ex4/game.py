@@ -193,7 +193,9 @@ class Grid:
     return hash(h)
 
   def copy(self):
-    g = Grid(self.width, self.height)
+    # skips filling a new grid with the initial value, the data is replaced anyway
+    g = Grid.__new__(Grid)
+    g.__dict__.update(self.__dict__)
     g.data = [x[:] for x in self.data]
     return g
 
@@ -201,8 +203,8 @@ class Grid:
     return self.copy()
 
   def shallowCopy(self):
-    g = Grid(self.width, self.height)
-    g.data = self.data
+    g = Grid.__new__(Grid)
+    g.__dict__.update(self.__dict__)
     return g
 
   def count(self, item =True ):
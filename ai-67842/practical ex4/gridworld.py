@@ -394,7 +394,7 @@ def parseOptions():
                          help='Request a window width of X pixels *per grid cell* (default %default)')
     optParser.add_option('-a', '--agent',action='store', metavar="A",
                          type='string',dest='agent',default="random",
-                         help='Agent type (options are \'random\', \'value\' and \'q\', default %default)')
+                         help='Agent type (options are \'random\', \'value\', \'q\' and \'arrayq\', default %default)')
     optParser.add_option('-t', '--text',action='store_true',
                          dest='textDisplay',default=False,
                          help='Use text-only ASCII display')
@@ -412,10 +412,17 @@ def parseOptions():
                          help='Manually control agent')
     optParser.add_option('-v', '--valueSteps',action='store_true' ,default=False,
                          help='Display each step of value iteration')
+    optParser.add_option('--solver',action='store', metavar="S",
+                         type='string',dest='solver',default=None,
+                         help='Solve the MDP of the value agent on compiled matrices with solver S ' +
+                         '(options are value, gauss-seidel, prioritized and policy)')
+    optParser.add_option('--tolerance',action='store', metavar="T",
+                         type='float',dest='tolerance',default=0.0,
+                         help='Stop the --solver once the values change by no more than T (default %default)')
 
     opts, args = optParser.parse_args()
     
-    if opts.manual and opts.agent != 'q':
+    if opts.manual and opts.agent not in ('q', 'arrayq'):
       print('## Disabling Agents in Manual Mode (-m) ##')
       opts.agent = None
 
@@ -464,9 +471,11 @@ if __name__ == '__main__':
 
   import valueIterationAgents, qlearningAgents
   a = None
-  if opts.agent == 'value':
+  if opts.agent == 'value' and opts.solver is not None:
+    a = valueIterationAgents.MatrixValueIterationAgent(mdp, opts.discount, opts.iters, opts.solver, opts.tolerance)
+  elif opts.agent == 'value':
     a = valueIterationAgents.ValueIterationAgent(mdp, opts.discount, opts.iters)
-  elif opts.agent == 'q':
+  elif opts.agent in ('q', 'arrayq'):
     #env.getPossibleActions, opts.discount, opts.learningRate, opts.epsilon
     #simulationFn = lambda agent, state: simulation.GridworldSimulation(agent,state,mdp)
     gridWorldEnv = GridworldEnvironment(mdp)
@@ -475,7 +484,10 @@ if __name__ == '__main__':
                   'alpha': opts.learningRate, 
                   'epsilon': opts.epsilon,
                   'actionFn': actionFn}
-    a = qlearningAgents.QLearningAgent(**qLearnOpts)
+    if opts.agent == 'q':
+      a = qlearningAgents.QLearningAgent(**qLearnOpts)
+    else:
+      a = qlearningAgents.ArrayQLearningAgent(**qLearnOpts)
   elif opts.agent == 'random':
     # # No reason to use the random agent without episodes
     if opts.episodes == 0:
@@ -523,7 +535,7 @@ if __name__ == '__main__':
     else:
       if opts.agent == 'random': displayCallback = lambda state: display.displayValues(a, state, "CURRENT VALUES")
       if opts.agent == 'value': displayCallback = lambda state: display.displayValues(a, state, "CURRENT VALUES")
-      if opts.agent == 'q': displayCallback = lambda state: display.displayQValues(a, state, "CURRENT Q-VALUES")
+      if opts.agent in ('q', 'arrayq'): displayCallback = lambda state: display.displayQValues(a, state, "CURRENT Q-VALUES")
 
   messageCallback = lambda x: printString(x)
   if opts.quiet:
@@ -555,7 +567,7 @@ if __name__ == '__main__':
     print()
     
   # DISPLAY POST-LEARNING VALUES / Q-VALUES
-  if opts.agent == 'q' and not opts.manual:
+  if opts.agent in ('q', 'arrayq') and not opts.manual:
     display.displayQValues(a, message = "Q-VALUES AFTER "+str(opts.episodes)+" EPISODES")
     display.pause()
     display.displayValues(a, message = "VALUES AFTER "+str(opts.episodes)+" EPISODES")
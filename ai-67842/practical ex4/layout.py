@@ -83,7 +83,16 @@ class Layout:
     return "\n".join(self.layoutText)
     
   def deepCopy(self):
-    return Layout(self.layoutText[:])
+    # copies the parsed layout instead of parsing the text again, as this
+    # runs for every copy of a game state
+    layout = Layout.__new__(Layout)
+    layout.__dict__.update(self.__dict__)
+    layout.walls = self.walls.copy()
+    layout.food = self.food.copy()
+    layout.capsules = self.capsules[:]
+    layout.agentPositions = self.agentPositions[:]
+    layout.layoutText = self.layoutText[:]
+    return layout
     
   def processLayoutText(self, layoutText):
     """
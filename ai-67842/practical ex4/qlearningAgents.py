@@ -11,6 +11,9 @@ from learningAgents import ReinforcementAgent
 from featureExtractors import *
 
 import random, util, math
+import numpy as np
+
+from vectorizedQLearning import ReplayBuffer, batchQUpdate
 
 
 class QLearningAgent(ReinforcementAgent):
@@ -108,6 +111,106 @@ class QLearningAgent(ReinforcementAgent):
         self.qvalues[(state, action)] = val + self.alpha * (reward + self.discount * next_value - val)
 
 
+class ArrayQLearningAgent(QLearningAgent):
+    """
+    A QLearningAgent that numbers the states and actions it sees and keeps
+    the Q-values in a NumPy array, a row per state and a column per action.
+    The legal actions of a state are asked for once, when it is first seen.
+    Stepping the environment takes most of an episode, so this agent is only
+    a little faster than QLearningAgent; for many training episodes use
+    VectorizedQLearning (see vectorizedQLearning.py).
+    Stepping the environment takes most of an episode, so this agent is only
+    a little faster than QLearningAgent; for many training episodes use
+    VectorizedQLearning (see vectorizedQLearning.py).
+
+    With replaySize > 0 the agent also keeps its last replaySize transitions,
+    and replays replayBatch of them after every update (see
+    vectorizedQLearning.py).
+    """
+
+    def __init__(self, replaySize=0, replayBatch=32, **args):
+        QLearningAgent.__init__(self, **args)
+        self.stateIndex = {}
+        self.actionIndex = {}
+        self.legalActions = []  # state row -> its legal actions
+        self.legalColumns = []  # state row -> the columns of its legal actions
+        self.q = np.zeros((64, 4))
+        self.legal = np.zeros((64, 4), dtype=bool)
+        self.replay = ReplayBuffer(replaySize) if int(replaySize) > 0 else None
+        self.replayBatch = int(replayBatch)
+
+    def stateRow(self, state):
+        """
+      Returns the row of the state, adding it if it is new
+    """
+        row = self.stateIndex.get(state)
+        if row is None:
+            row = self.addState(state)
+        return row
+
+    def addState(self, state):
+        row = len(self.legalActions)
+        actions = list(self.actionFn(state))
+        columns = [self.actionColumn(action) for action in actions]
+        if row == self.q.shape[0]:
+            self.q = np.vstack([self.q, np.zeros_like(self.q)])
+            self.legal = np.vstack([self.legal, np.zeros_like(self.legal)])
+        self.legal[row, columns] = True
+        self.stateIndex[state] = row
+        self.legalActions.append(actions)
+        self.legalColumns.append(columns)
+        return row
+
+    def actionColumn(self, action):
+        column = self.actionIndex.get(action)
+        if column is None:
+            column = len(self.actionIndex)
+            if column == self.q.shape[1]:
+                self.q = np.hstack([self.q, np.zeros_like(self.q)])
+                self.legal = np.hstack([self.legal, np.zeros_like(self.legal)])
+            self.actionIndex[action] = column
+        return column
+
+    # a state has only a few actions, so the values are read one by one with
+    # q.item, which is cheaper than indexing the array with their columns
+
+    def getLegalActions(self, state):
+        return self.legalActions[self.stateRow(state)]
+
+    def getQValue(self, state, action):
+        return self.q.item(self.stateRow(state), self.actionColumn(action))
+
+    def rowValue(self, row):
+        columns = self.legalColumns[row]
+        if len(columns) == 0:
+            return 0.0
+        item = self.q.item
+        return max([item(row, column) for column in columns])
+
+    def getValue(self, state):
+        return self.rowValue(self.stateRow(state))
+
+    def getPolicy(self, state):
+        row = self.stateRow(state)
+        columns = self.legalColumns[row]
+        if len(columns) == 0:
+            return None
+        item = self.q.item
+        values = [item(row, column) for column in columns]
+        best = max(values)
+        return random.choice([action for action, value in zip(self.legalActions[row], values)
+                              if value == best])
+
+    def update(self, state, action, nextState, reward):
+        row, column, nextRow = self.stateRow(state), self.actionColumn(action), self.stateRow(nextState)
+        val = self.q.item(row, column)
+        self.q[row, column] = val + self.alpha * (reward + self.discount * self.rowValue(nextRow) - val)
+        if self.replay is not None:
+            self.replay.add(row, column, reward, nextRow)
+            batchQUpdate(self.q, self.legal, *self.replay.sample(self.replayBatch),
+                         alpha=self.alpha, discount=self.discount)
+
+
 class PacmanQAgent(QLearningAgent):
     "Exactly the same as QLearningAgent, but with different default parameters"
 
@@ -182,3 +285,61 @@ class ApproximateQAgent(PacmanQAgent):
             # you might want to print your weights here for debugging
             "*** YOUR CODE HERE ***"
             pass
+
+
+class VectorApproximateQAgent(PacmanQAgent):
+    """
+     An ApproximateQAgent for the extractors of featureExtractors.py that
+     give feature vectors (VectorFeatureExtractor): the weights are a NumPy
+     vector, the features of all the legal actions of a state are extracted
+     at once, and an update is one vector operation.
+  """
+
+    def __init__(self, extractor='SimpleVectorExtractor', **args):
+        self.featExtractor = util.lookup(extractor, globals())()
+        PacmanQAgent.__init__(self, **args)
+        self.w = np.zeros(len(self.featExtractor.schema))
+        self.lastFeatures = (None, None, None)  # (state, its legal actions, their features)
+
+    def getWeights(self):
+        return self.featExtractor.schema.toCounter(self.w)
+
+    def actionFeatures(self, state):
+        """
+      The legal actions of the state and their feature matrix, remembered for
+      the last state asked for, which the next update asks for again
+    """
+        lastState, actions, features = self.lastFeatures
+        if lastState is not state:
+            actions = self.getLegalActions(state)
+            features = self.featExtractor.getFeatureMatrix(state, actions) if actions else None
+            self.lastFeatures = (state, actions, features)
+        return actions, features
+
+    def getQValue(self, state, action):
+        actions, features = self.actionFeatures(state)
+        if action in actions:
+            return float(features[actions.index(action)].dot(self.w))
+        return float(self.featExtractor.getFeatureVector(state, action).dot(self.w))
+
+    def getValue(self, state):
+        actions, features = self.actionFeatures(state)
+        if not actions:
+            return 0.0
+        return float(features.dot(self.w).max())
+
+    def getPolicy(self, state):
+        actions, features = self.actionFeatures(state)
+        if not actions:
+            return None
+        values = features.dot(self.w)
+        return actions[random.choice(np.flatnonzero(values == values.max()))]
+
+    def update(self, state, action, nextState, reward):
+        actions, features = self.actionFeatures(state)
+        if action in actions:
+            feature = features[actions.index(action)]
+        else:
+            feature = self.featExtractor.getFeatureVector(state, action)
+        correction = (reward + self.discount * self.getValue(nextState)) - feature.dot(self.w)
+        self.w += self.alpha * correction * feature
@@ -0,0 +1,249 @@
+# sparseMdp.py
+# ------------
+# A MarkovDecisionProcess compiled into matrices, and solvers that work on them.
+
+import heapq
+
+import numpy as np
+
+try:
+    import scipy.sparse as sparse
+    import scipy.sparse.linalg as sparseLinalg
+except ImportError:
+    sparse = None
+
+
+class SparseMDP:
+    """
+      A MarkovDecisionProcess (see mdp.py) compiled once into matrices.
+
+      The states and the actions are numbered in the order the mdp lists them.
+      The transitions of all the (action, state) pairs are the rows of one
+      transition matrix, row a * n + s for action a and state s of n states,
+      sparse when SciPy is available, so a Bellman backup of every state is
+      one matrix-vector product. rewards holds the expected reward of the same
+      rows, and legal which actions each state has.
+    """
+
+    def __init__(self, mdp):
+        self.mdp = mdp
+        self.states = list(mdp.getStates())
+        self.stateIndex = dict((state, i) for i, state in enumerate(self.states))
+        self.actions = []
+        actionIndex = {}
+        # the action columns of every state, in the order the mdp gives them
+        self.stateActions = []
+        transitions = []
+        rowRewards = {}  # (action, state) -> its expected reward
+        for s, state in enumerate(self.states):
+            columns = []
+            for action in mdp.getPossibleActions(state):
+                if action not in actionIndex:
+                    actionIndex[action] = len(self.actions)
+                    self.actions.append(action)
+                a = actionIndex[action]
+                columns.append(a)
+                rewards = []
+                for nextState, prob in mdp.getTransitionStatesAndProbs(state, action):
+                    reward = mdp.getReward(state, action, nextState)
+                    transitions.append((a, s, self.stateIndex[nextState], prob))
+                    rewards.append((prob, reward))
+                # a reward that does not depend on the next state is kept exact, so the
+                # actions of a state tie the way they do without the rounding of the sum
+                if len(set(reward for _, reward in rewards)) == 1:
+                    rowRewards[a, s] = float(rewards[0][1])
+                else:
+                    rowRewards[a, s] = float(sum(prob * reward for prob, reward in rewards))
+            self.stateActions.append(columns)
+        self.actionIndex = actionIndex
+
+        n, numActions = len(self.states), len(self.actions)
+        self.legal = np.zeros((numActions, n), dtype=bool)
+        for s, columns in enumerate(self.stateActions):
+            self.legal[columns, s] = True
+        self.hasActions = self.legal.any(axis=0)
+
+        rows = np.array([a * n + s for a, s, _, _ in transitions], dtype=np.intp)
+        columns = np.array([t for _, _, t, _ in transitions], dtype=np.intp)
+        probs = np.array([p for _, _, _, p in transitions], dtype=float)
+        self.rewards = np.zeros(numActions * n)
+        for (a, s), reward in rowRewards.items():
+            self.rewards[a * n + s] = reward
+        if sparse is not None:
+            # duplicate (row, column) entries are summed
+            self.transitions = sparse.csr_matrix((probs, (rows, columns)), shape=(numActions * n, n))
+        else:
+            self.transitions = np.zeros((numActions * n, n))
+            np.add.at(self.transitions, (rows, columns), probs)
+
+        # state -> the (expected reward, [(next state, probability)]) of each of its
+        # actions, for the solvers that update one state at a time
+        self.stateRows = [[] for _ in range(n)]
+        matrix = self.transitions
+        for s, actionColumns in enumerate(self.stateActions):
+            for a in actionColumns:
+                row = a * n + s
+                if sparse is not None:
+                    start, end = matrix.indptr[row], matrix.indptr[row + 1]
+                    successors = list(zip(matrix.indices[start:end].tolist(), matrix.data[start:end].tolist()))
+                else:
+                    successors = [(int(t), float(matrix[row, t])) for t in np.flatnonzero(matrix[row])]
+                self.stateRows[s].append((float(self.rewards[row]), successors))
+        # state -> the states with a transition into it, for prioritized sweeping
+        self.predecessors = [set() for _ in range(n)]
+        for s in range(n):
+            for _, successors in self.stateRows[s]:
+                for t, _ in successors:
+                    self.predecessors[t].add(s)
+
+    def qValues(self, values, discount):
+        """
+          The Q-values of the given state values, an (actions, states) array
+          that is -inf for the illegal actions of a state
+        """
+        q = self.rewards + discount * self.transitions.dot(values)
+        q = q.reshape(len(self.actions), len(self.states))
+        return np.where(self.legal, q, -np.inf)
+
+    def backup(self, values, discount):
+        """
+          One Bellman backup of every state, 0 for the states without actions
+        """
+        if not self.actions:
+            return np.zeros(len(self.states))
+        return np.where(self.hasActions, self.qValues(values, discount).max(axis=0), 0.0)
+
+    def valueIteration(self, discount, iterations, tolerance=0.0):
+        """
+          Runs (at most) the given number of synchronous backups from all-zero
+          values, and stops early once no value changes by more than tolerance
+        """
+        values = np.zeros(len(self.states))
+        for _ in range(iterations):
+            newValues = self.backup(values, discount)
+            change = np.abs(newValues - values).max(initial=0.0)
+            values = newValues
+            if change <= tolerance:
+                break
+        return values
+
+    def stateBackup(self, s, values, discount):
+        """
+          The backup of the single state s, for values given as a list
+        """
+        rows = self.stateRows[s]
+        if not rows:
+            return 0.0
+        return max(reward + discount * sum(prob * values[t] for t, prob in successors)
+                   for reward, successors in rows)
+
+    def gaussSeidel(self, discount, iterations, tolerance=0.0):
+        """
+          Value iteration that updates the values in place, state after state,
+          so each backup already sees the new values of the states before it
+        """
+        values = [0.0] * len(self.states)
+        for _ in range(iterations):
+            change = 0.0
+            for s in range(len(self.states)):
+                value = self.stateBackup(s, values, discount)
+                change = max(change, abs(value - values[s]))
+                values[s] = value
+            if change <= tolerance:
+                break
+        return np.array(values)
+
+    def prioritizedSweeping(self, discount, iterations, tolerance=0.0):
+        """
+          Updates the state whose value is the most wrong first, and then
+          requeues its predecessors whose values became wrong by more than
+          tolerance. Makes at most iterations times the number of states updates.
+        """
+        n = len(self.states)
+        errors = np.abs(self.backup(np.zeros(n), discount)).tolist()
+        values = [0.0] * n
+        queue = [(-errors[s], s) for s in range(n) if errors[s] > tolerance]
+        heapq.heapify(queue)
+        queued = set(s for _, s in queue)
+        for _ in range(iterations * n):
+            if not queue:
+                break
+            _, s = heapq.heappop(queue)
+            queued.discard(s)
+            values[s] = self.stateBackup(s, values, discount)
+            for p in self.predecessors[s]:
+                error = abs(self.stateBackup(p, values, discount) - values[p])
+                if error > tolerance and p not in queued:
+                    heapq.heappush(queue, (-error, p))
+                    queued.add(p)
+        return np.array(values)
+
+    def policyEvaluation(self, policy, discount):
+        """
+          The values of following the given policy (an action column per state,
+          -1 for the states without actions), by solving the linear system
+          V = R + discount * P V of the policy
+        """
+        n = len(self.states)
+        active = np.flatnonzero(policy >= 0)
+        rows = policy[active] * n + active
+        if sparse is not None:
+            selector = sparse.csr_matrix((np.ones(len(active)), (active, rows)),
+                                         shape=(n, len(self.actions) * n))
+            system = sparse.identity(n, format='csc') - discount * (selector @ self.transitions).tocsc()
+            values = sparseLinalg.spsolve(system, selector @ self.rewards)
+        else:
+            selector = np.zeros((n, len(self.actions) * n))
+            selector[active, rows] = 1.0
+            system = np.identity(n) - discount * selector.dot(self.transitions)
+            values = np.linalg.solve(system, selector.dot(self.rewards))
+        return np.asarray(values, dtype=float)
+
+    def policyIteration(self, discount, iterations, tolerance=0.0):
+        """
+          Alternates policy evaluation and greedy improvement, starting from the
+          first action of every state, until the policy is stable (at most
+          iterations times). A state keeps its action unless another one is
+          better by more than tolerance.
+        """
+        n = len(self.states)
+        policy = np.array([columns[0] if columns else -1 for columns in self.stateActions], dtype=np.intp)
+        active = np.flatnonzero(policy >= 0)
+        values = np.zeros(n)
+        for _ in range(iterations):
+            values = self.policyEvaluation(policy, discount)
+            q = self.qValues(values, discount)
+            best = q.argmax(axis=0)
+            current = q[policy[active], active]
+            improved = active[q[best[active], active] > current + tolerance]
+            if len(improved) == 0:
+                break
+            policy[improved] = best[improved]
+        return values
+
+    SOLVERS = {'value': 'valueIteration',
+               'gauss-seidel': 'gaussSeidel',
+               'prioritized': 'prioritizedSweeping',
+               'policy': 'policyIteration'}
+
+    def solve(self, solver, discount, iterations, tolerance=0.0):
+        """
+          Runs the named solver (one of SOLVERS) and returns the state values
+        """
+        if solver not in SparseMDP.SOLVERS:
+            raise Exception('Unknown solver: ' + solver)
+        return getattr(self, SparseMDP.SOLVERS[solver])(discount, iterations, tolerance)
+
+    def greedyPolicy(self, q):
+        """
+          The best action of every state for the given Q-values (None without
+          actions), ties broken by the order the mdp gives the actions in
+        """
+        policy = []
+        for s, columns in enumerate(self.stateActions):
+            best, bestValue = None, -np.inf
+            for a in columns:
+                if q[a, s] > bestValue:
+                    best, bestValue = self.actions[a], q[a, s]
+            policy.append(best)
+        return policy
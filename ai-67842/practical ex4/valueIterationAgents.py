@@ -9,6 +9,7 @@
 import mdp, util
 
 from learningAgents import ValueEstimationAgent
+from sparseMdp import SparseMDP
 
 
 class ValueIterationAgent(ValueEstimationAgent):
@@ -94,3 +95,40 @@ class ValueIterationAgent(ValueEstimationAgent):
     def getAction(self, state):
         "Returns the policy at the state (no exploration)."
         return self.getPolicy(state)
+
+
+class MatrixValueIterationAgent(ValueEstimationAgent):
+    """
+      A ValueIterationAgent that compiles the mdp into matrices once (see
+      sparseMdp.py) and solves it with one of the solvers of SparseMDP:
+      'value' (value iteration, the same values as ValueIterationAgent),
+      'gauss-seidel', 'prioritized' (prioritized sweeping) or 'policy'
+      (policy iteration). The solver stops early once the values change by
+      no more than tolerance. The Q-values and the policy of every state are
+      computed once, after solving.
+    """
+
+    def __init__(self, mdp, discount=0.9, iterations=100, solver='value', tolerance=0.0):
+        self.mdp = mdp
+        self.discount = discount
+        self.iterations = iterations
+        self.compiled = SparseMDP(mdp)
+        values = self.compiled.solve(solver, discount, iterations, tolerance)
+        self.values = util.Counter()
+        for state, value in zip(self.compiled.states, values.tolist()):
+            self.values[state] = value
+        self.qValues = self.compiled.qValues(values, discount)
+        self.policy = dict(zip(self.compiled.states, self.compiled.greedyPolicy(self.qValues)))
+
+    def getValue(self, state):
+        return self.values[state]
+
+    def getQValue(self, state, action):
+        return float(self.qValues[self.compiled.actionIndex[action], self.compiled.stateIndex[state]])
+
+    def getPolicy(self, state):
+        return self.policy[state]
+
+    def getAction(self, state):
+        "Returns the policy at the state (no exploration)."
+        return self.getPolicy(state)
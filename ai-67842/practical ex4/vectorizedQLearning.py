@@ -0,0 +1,239 @@
+# vectorizedQLearning.py
+# ----------------------
+# Headless, array-backed tabular Q-learning: a replay buffer, a batched
+# Q-update, and a runner that steps many copies of an MDP at once.
+
+import random
+import time
+
+import numpy as np
+
+from sparseMdp import SparseMDP
+
+
+def batchQUpdate(q, legal, states, actions, rewards, nextStates, alpha, discount):
+    """
+      Q-learning updates of a batch of transitions, given as arrays of state
+      rows, action columns, rewards and next state rows, on the Q array q
+      (states x actions) whose legal mask is legal. A (state, action) pair that
+      appears more than once in the batch moves toward the mean of its targets.
+    """
+    nextQ = np.where(legal[nextStates], q[nextStates], -np.inf)
+    nextValues = np.where(legal[nextStates].any(axis=1), nextQ.max(axis=1, initial=-np.inf), 0.0)
+    deltas = rewards + discount * nextValues - q[states, actions]
+    flat = states * q.shape[1] + actions
+    sums = np.bincount(flat, weights=deltas, minlength=q.size)
+    counts = np.bincount(flat, minlength=q.size)
+    touched = np.flatnonzero(counts)
+    q.reshape(-1)[touched] += alpha * sums[touched] / counts[touched]
+
+
+class ReplayBuffer:
+    """
+      The last capacity transitions, as (state row, action column, reward,
+      next state row) arrays, sampled uniformly.
+    """
+
+    def __init__(self, capacity, seed=None):
+        self.capacity = int(capacity)
+        self.states = np.zeros(self.capacity, dtype=np.intp)
+        self.actions = np.zeros(self.capacity, dtype=np.intp)
+        self.rewards = np.zeros(self.capacity)
+        self.nextStates = np.zeros(self.capacity, dtype=np.intp)
+        self.size = 0
+        self.position = 0
+        self.rng = np.random.default_rng(seed)
+
+    def add(self, states, actions, rewards, nextStates):
+        """
+          Adds a transition, or a batch of them given as arrays
+        """
+        states, actions, rewards, nextStates = [np.atleast_1d(x)[-self.capacity:]
+                                                for x in (states, actions, rewards, nextStates)]
+        i = (self.position + np.arange(len(states))) % self.capacity
+        self.states[i], self.actions[i], self.rewards[i], self.nextStates[i] = states, actions, rewards, nextStates
+        self.position = (self.position + len(states)) % self.capacity
+        self.size = min(self.size + len(states), self.capacity)
+
+    def sample(self, batchSize):
+        """
+          Returns batchSize transitions drawn with replacement
+        """
+        i = self.rng.integers(0, self.size, batchSize)
+        return self.states[i], self.actions[i], self.rewards[i], self.nextStates[i]
+
+    def __len__(self):
+        return self.size
+
+
+class VectorizedQLearning:
+    """
+      Tabular Q-learning on copies independent episodes of an mdp (see mdp.py)
+      at once, without any display. The mdp is compiled once (see
+      sparseMdp.py); every tick picks an epsilon-greedy action in every copy,
+      samples the next states, updates the Q array with all the transitions
+      of the tick (and a replayed batch, with a replay buffer), and restarts
+      the copies that reached a state without actions.
+    """
+
+    def __init__(self, mdp, copies=64, alpha=0.5, epsilon=0.3, discount=0.9,
+                 replay=None, replayBatch=32, seed=None):
+        self.compiled = SparseMDP(mdp)
+        self.copies = copies
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.discount = discount
+        self.replay = replay
+        self.replayBatch = replayBatch
+        self.rng = np.random.default_rng(seed)
+
+        compiled = self.compiled
+        n, numActions = len(compiled.states), len(compiled.actions)
+        self.legal = compiled.legal.T.copy()
+        self.q = np.zeros((n, numActions))
+        self.start = compiled.stateIndex[mdp.getStartState()]
+
+        # the outcomes of every (state, action) row s * numActions + a, flattened:
+        # row r has the entries rowStart[r]:rowStart[r + 1], with the next state,
+        # the reward and r plus the cumulative probability of each
+        nextStates, rewards, keys = [], [], []
+        self.rowStart = np.zeros(n * numActions + 1, dtype=np.intp)
+        for s, state in enumerate(compiled.states):
+            outcomes = dict((a, successors) for a, (_, successors)
+                            in zip(compiled.stateActions[s], compiled.stateRows[s]))
+            for a in range(numActions):
+                row = s * numActions + a
+                cumulative = 0.0
+                for t, prob in outcomes.get(a, ()):
+                    cumulative += prob
+                    nextStates.append(t)
+                    rewards.append(mdp.getReward(state, compiled.actions[a], compiled.states[t]))
+                    keys.append(row + cumulative)
+                self.rowStart[row + 1] = len(nextStates)
+        self.nextStates = np.array(nextStates, dtype=np.intp)
+        self.rewards = np.array(rewards, dtype=float)
+        self.keys = np.array(keys)
+
+        self.states = np.full(copies, self.start, dtype=np.intp)
+        self.returns = np.zeros(copies)
+        self.totalDiscounts = np.ones(copies)
+        self.episodes = 0
+        self.episodeReturns = []
+
+    def chooseActions(self, states):
+        """
+          Epsilon-greedy action columns for the given state rows, ties and
+          exploration broken uniformly at random
+        """
+        legal = self.legal[states]
+        noise = self.rng.random(legal.shape)
+        q = np.where(legal, self.q[states], -np.inf)
+        best = (q == q.max(axis=1, keepdims=True)) & legal
+        greedy = (best * noise).argmax(axis=1)
+        explore = (legal * noise).argmax(axis=1)
+        return np.where(self.rng.random(len(states)) < self.epsilon, explore, greedy)
+
+    def sampleOutcomes(self, states, actions):
+        """
+          Samples the next state rows and rewards of the given transitions
+        """
+        rows = states * self.q.shape[1] + actions
+        i = np.searchsorted(self.keys, rows + self.rng.random(len(rows)), side='right')
+        i = np.clip(i, self.rowStart[rows], self.rowStart[rows + 1] - 1)
+        return self.nextStates[i], self.rewards[i]
+
+    def tick(self):
+        """
+          Advances every copy by one step
+        """
+        states = self.states
+        actions = self.chooseActions(states)
+        nextStates, rewards = self.sampleOutcomes(states, actions)
+        batchQUpdate(self.q, self.legal, states, actions, rewards, nextStates, self.alpha, self.discount)
+        if self.replay is not None:
+            self.replay.add(states, actions, rewards, nextStates)
+            batchQUpdate(self.q, self.legal, *self.replay.sample(self.replayBatch),
+                         alpha=self.alpha, discount=self.discount)
+
+        self.returns += rewards * self.totalDiscounts
+        self.totalDiscounts *= self.discount
+        done = np.flatnonzero(~self.legal[nextStates].any(axis=1))
+        if len(done):
+            self.episodes += len(done)
+            self.episodeReturns.extend(self.returns[done].tolist())
+            nextStates[done] = self.start
+            self.returns[done] = 0.0
+            self.totalDiscounts[done] = 1.0
+        self.states = nextStates
+
+    def train(self, episodes):
+        """
+          Ticks until at least the given number of episodes completed, and
+          returns the number of ticks
+        """
+        target = self.episodes + episodes
+        ticks = 0
+        while self.episodes < target:
+            self.tick()
+            ticks += 1
+        return ticks
+
+    def getQValue(self, state, action):
+        compiled = self.compiled
+        return float(self.q[compiled.stateIndex[state], compiled.actionIndex[action]])
+
+    def getValue(self, state):
+        s = self.compiled.stateIndex[state]
+        return float(self.q[s][self.legal[s]].max()) if self.legal[s].any() else 0.0
+
+    def getPolicy(self, state):
+        s = self.compiled.stateIndex[state]
+        columns = self.compiled.stateActions[s]
+        if not columns:
+            return None
+        return self.compiled.actions[max(columns, key=lambda a: self.q[s, a])]
+
+
+def benchmark(grid='BookGrid', episodes=2000, copies=64, discount=0.9, alpha=0.5, epsilon=0.3):
+    """
+      Prints the training episodes per second of QLearningAgent,
+      ArrayQLearningAgent (with and without replay) and VectorizedQLearning
+      on a gridworld, run headless
+    """
+    import gridworld
+    import qlearningAgents
+
+    mdp = getattr(gridworld, 'get' + grid)()
+    env = gridworld.GridworldEnvironment(mdp)
+    options = {'gamma': discount, 'alpha': alpha, 'epsilon': epsilon,
+               'actionFn': mdp.getPossibleActions, 'numTraining': episodes}
+    nothing = lambda *args: None
+    agents = [('QLearningAgent', qlearningAgents.QLearningAgent(**options)),
+              ('ArrayQLearningAgent', qlearningAgents.ArrayQLearningAgent(**options)),
+              ('ArrayQLearningAgent+replay', qlearningAgents.ArrayQLearningAgent(replaySize=10000, **options))]
+    for name, agent in agents:
+        random.seed(0)
+        start = time.perf_counter()
+        for episode in range(episodes):
+            gridworld.runEpisode(agent, env, discount, agent.getAction, nothing, nothing, nothing, episode)
+        elapsed = time.perf_counter() - start
+        print('%-30s %9.0f episodes/s   V(start) = %.3f' % (name, episodes / elapsed, agent.getValue(mdp.getStartState())))
+    for name, replay in (('VectorizedQLearning', None), ('VectorizedQLearning+replay', ReplayBuffer(10000, seed=0))):
+        runner = VectorizedQLearning(mdp, copies, alpha, epsilon, discount, replay=replay, seed=0)
+        start = time.perf_counter()
+        runner.train(episodes)
+        elapsed = time.perf_counter() - start
+        print('%-30s %9.0f episodes/s   V(start) = %.3f' % (name, runner.episodes / elapsed, runner.getValue(mdp.getStartState())))
+
+
+if __name__ == '__main__':
+    import optparse
+    optParser = optparse.OptionParser()
+    optParser.add_option('-g', '--grid', dest='grid', default='BookGrid',
+                         help='Grid to use (default %default)')
+    optParser.add_option('-k', '--episodes', type='int', dest='episodes', default=2000,
+                         help='Number of training episodes (default %default)')
+    optParser.add_option('-c', '--copies', type='int', dest='copies', default=64,
+                         help='Number of copies VectorizedQLearning steps at once (default %default)')
+    opts, args = optParser.parse_args()
+    benchmark(opts.grid, opts.episodes, opts.copies)
@@ -7,11 +7,13 @@
 #   ###    ##    ##      ##     ## ###   #### #### #### #### #### #### ####
 
 import numpy as np
+import random
 from itertools import cycle
 from Enums import Tile, LoopDirection
 
 HEIGHT = 6
 WIDTH = 6
+ZOBRIST_SEED = 67842
 
 
 class Action:  # always legal
@@ -31,7 +33,7 @@ class Action:  # always legal
                self.end_point == other.end_point
 
     def __hash__(self):
-        return hash(self.__repr__())
+        return hash((self.start_point, self.end_point))
 
     def __repr__(self):
         return repr(self.color) + ' ' + str(self.start_point) + ' ' + str(
@@ -56,7 +58,27 @@ class Action:  # always legal
         return self.end_point
 
 
+def bit_indices(bits: int):
+    """
+    :param bits: a bitboard
+    :return: the indices of the set bits of the bitboard, lowest first
+    """
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
 class Board:  # turns out to be Board
+    """
+    The pieces of each color are kept as a bitboard, an int whose bit
+    y * width + x is set iff the color has a piece at (y, x), and the board
+    keeps its Zobrist key (the xor of the random keys of its pieces) up to
+    date as they move. The tables of a board size (neighbours, loop circuits
+    and the rays along them, Zobrist keys) are built once and shared by all
+    the boards of that size.
+    """
+    _tables = {}  # (height, width) -> the tables of boards of that size
 
     def init_portal_dict(self):
         """
@@ -84,6 +106,78 @@ class Board:  # turns out to be Board
 
         return mapping
 
+    def init_circuits(self) -> list:
+        """
+        :return: the loop circuits of the board, each as the list of the lines
+                 it goes through in order, a line being the list of the indices
+                 of its tiles. Going from the last tile of a line to the first
+                 of the next one goes through a loop.
+        """
+        circuits = []
+        for k in range(1, self.height // 2):
+            lines, line = [], []
+            y, x, direction = k, 0, LoopDirection.RIGHT
+            while True:
+                line.append(y * self.width + x)
+                y_dir, x_dir = direction.value
+                if self.is_legal_index(y + y_dir, x + x_dir):
+                    y, x = y + y_dir, x + x_dir
+                    continue
+                lines.append(line)
+                line = []
+                y, x, direction = self.portal(y, x)
+                if (y, x, direction) == (k, 0, LoopDirection.RIGHT):
+                    break
+            circuits.append(lines)
+        return circuits
+
+    def init_tables(self) -> dict:
+        """
+        :return: the tables of boards of this size:
+                 points - the (y, x) of every index
+                 neighbours - the bitboard of the tiles around every index
+                 rays - for every index, a (first, rest, rest_bits) tuple for each
+                        way a piece there can go along a circuit: first is the
+                        bitboard of the tiles before the first loop, rest_bits
+                        the bits of the tiles after it (all around the circuit,
+                        back to the piece) in order, and rest their bitboard
+                 black_keys, red_keys - the Zobrist key of a piece of the color
+                                        at every index
+        """
+        size = self.height * self.width
+        points = tuple((i // self.width, i % self.width) for i in range(size))
+        neighbours = []
+        for y, x in points:
+            bits = 0
+            for j in range(-1, 2):
+                for i in range(-1, 2):
+                    if (i or j) and self.is_legal_index(y + j, x + i):
+                        bits |= 1 << ((y + j) * self.width + x + i)
+            neighbours.append(bits)
+        rays = [[] for _ in range(size)]
+        for lines in self.init_circuits():
+            for way in (lines, [line[::-1] for line in reversed(lines)]):
+                sequence = [i for line in way for i in line]
+                position = 0
+                for line in way:
+                    loop = position + len(line)  # where the first loop leads to
+                    for p in range(position, loop):
+                        first = 0
+                        for i in sequence[p + 1:loop]:
+                            first |= 1 << i
+                        rest_bits = tuple(1 << i for i in sequence[loop:] + sequence[:p + 1])
+                        rest = 0
+                        for bit in rest_bits:
+                            rest |= bit
+                        rays[sequence[p]].append((first, rest, rest_bits))
+                    position = loop
+        keys = random.Random(ZOBRIST_SEED)
+        return {'points': points,
+                'neighbours': tuple(neighbours),
+                'rays': tuple(tuple(index_rays) for index_rays in rays),
+                'black_keys': tuple(keys.getrandbits(64) for _ in range(size)),
+                'red_keys': tuple(keys.getrandbits(64) for _ in range(size))}
+
     def __init__(self, height=HEIGHT, width=WIDTH):
         """
         creates the board and initializes the portal dict to hold the loops around
@@ -91,16 +185,56 @@ class Board:  # turns out to be Board
         :param width: gets the width of the board
         """
         self.height, self.width = height, width
-        self.board = np.zeros((self.height, self.width), dtype=Tile)
-        self.board[self.board == 0] = Tile.EMPTY
-        self.board[:(self.height // 2 - 1), :] = Tile.BLACK
-        self.board[-(self.height // 2 - 1):, :] = Tile.RED
         self.portal_dict = self.init_portal_dict()
-        self.red_count = np.sum(self.board == Tile.RED)
-        self.black_count = np.sum(self.board == Tile.BLACK)
+        self.attach_tables()
+        rows = height // 2 - 1
+        self.black = (1 << (rows * width)) - 1
+        self.red = ((1 << (rows * width)) - 1) << ((height - rows) * width)
+        self.red_count = bin(self.red).count('1')
+        self.black_count = bin(self.black).count('1')
+        self.key = 0
+        for i in bit_indices(self.black):
+            self.key ^= self.black_keys[i]
+        for i in bit_indices(self.red):
+            self.key ^= self.red_keys[i]
         self.last_eat_red = 0
         self.last_eat_black = 0
 
+    TABLE_NAMES = ('points', 'neighbours', 'rays', 'black_keys', 'red_keys')
+
+    def attach_tables(self):
+        """
+        sets the tables of the board size as attributes of the board, building
+        them if this is the first board of its size
+        """
+        key = (self.height, self.width)
+        if key not in Board._tables:
+            Board._tables[key] = self.init_tables()
+        self.__dict__.update(Board._tables[key])
+
+    def __getstate__(self):
+        # the tables are shared, so they are not pickled with every board
+        return {name: value for name, value in self.__dict__.items()
+                if name not in Board.TABLE_NAMES}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.attach_tables()
+
+    @property
+    def board(self):
+        """
+        :return: the board as a numpy array of tiles
+        """
+        tiles = [Tile.EMPTY] * (self.height * self.width)
+        for i in bit_indices(self.black):
+            tiles[i] = Tile.BLACK
+        for i in bit_indices(self.red):
+            tiles[i] = Tile.RED
+        board = np.empty(len(tiles), dtype=Tile)
+        board[:] = tiles
+        return board.reshape(self.height, self.width)
+
     def is_legal_index(self, y: int, x: int) -> bool:
         """
         :param y: gets the y in the board
@@ -109,31 +243,46 @@ class Board:  # turns out to be Board
         """
         return 0 <= y < self.height and 0 <= x < self.width
 
-    def _check_tile(self, y: int, x: int, tile: Tile) -> bool:
+    def get_tile(self, y: int, x: int) -> Tile:
         """
         :param y: gets the y in the board
         :param x: gets the x in the board
-        :param tile: the tile type
-        :return: true iff (y,x) valid index and
-                 board[y,x] contains tile of type input tile
+        :return: the tile at (y,x)
         """
-        return self.is_legal_index(y, x) and self.board[y, x] == tile
+        bit = 1 << (y * self.width + x)
+        if self.black & bit:
+            return Tile.BLACK
+        if self.red & bit:
+            return Tile.RED
+        return Tile.EMPTY
 
-    def _get_king_actions(self, y: int, x: int, player: Tile) -> set:
+    def set_tile(self, y: int, x: int, tile: Tile):
         """
-        :param y: the y of the tile we want to find the actions where we can move it to
-        :param x: the x of the tile we want to find the actions where we can move it to
-        :param player: the color of the player making the move
-        :return: the legal king actions from position (y,x) for player player
+        :param y: gets the y in the board
+        :param x: gets the x in the board
+        :param tile: the tile to put at (y,x)
+        """
+        i = y * self.width + x
+        bit = 1 << i
+        if self.black & bit:
+            self.black ^= bit
+            self.key ^= self.black_keys[i]
+        elif self.red & bit:
+            self.red ^= bit
+            self.key ^= self.red_keys[i]
+        if tile == Tile.BLACK:
+            self.black |= bit
+            self.key ^= self.black_keys[i]
+        elif tile == Tile.RED:
+            self.red |= bit
+            self.key ^= self.red_keys[i]
+
+    def get_bits(self, color: Tile) -> int:
         """
-        king_actions = set()
-        for i in range(-1, 2):
-            for j in range(-1, 2):
-                if i == 0 and j == 0:
-                    continue
-                if self._check_tile(y + j, x + i, Tile.EMPTY):
-                    king_actions.add(Action(player, (y, x), (y + j, x + i)))
-        return king_actions
+        :param color: the color
+        :return: the bitboard of the pieces of the given color
+        """
+        return self.red if color == Tile.RED else self.black
 
     def portal(self, y: int, x: int) -> (int, int, LoopDirection):
         """
@@ -150,82 +299,73 @@ class Board:  # turns out to be Board
             return y, x, LoopDirection.RIGHT
         return y, x, LoopDirection.LEFT
 
-    def _get_loop_action(self, y, x, direction, player):
+    def get_legal_moves(self, player: Tile) -> list:
         """
-        :param y: the current y
-        :param x: the current x
-        :param direction: the direction we loop through
-        :param player: the color of the player
-        :return: the enemy found in that direction on None
-                 if we didn't encounter an enemy
-        """
-        for loop_count in range(5):  # portals
-            # run to the next portal / another piece
-            y_dir, x_dir = direction.value
-            while self._check_tile(y, x, Tile.EMPTY):
-                y, x = y + y_dir, x + x_dir
-            #
-            if not self.is_legal_index(y, x) and (y - y_dir, x - x_dir) in self.portal_dict:
-                y, x, direction = self.portal(y - y_dir, x - x_dir)
-            # we reached a player without going through a portal or it
-            # is our player so we can't eat it
-            elif loop_count == 0 or self.board[y, x] == player:
-                return None
-            # we reached the enemy player so we can eat it
-            else:
-                return y, x
-        return None
-
-    def _get_loop_actions(self, y, x, directions, player):
+        :param player: the color of the player to check
+        :return: all the legal actions to the player as a list of moves, the
+                 move of a piece from index i to index j being
+                 i * height * width + j
+        """
+        own, enemy = (self.red, self.black) if player == Tile.RED else (self.black, self.red)
+        neighbours, rays = self.neighbours, self.rays
+        size = self.height * self.width
+        occupied = own | enemy
+        moves, eating_moves = [], set()
+        for i in bit_indices(own):
+            base = i * size
+            # get free not eating move
+            for j in bit_indices(neighbours[i] & ~occupied):
+                moves.append(base + j)
+            # calculate eating move: the first piece along a circuit (the
+            # piece itself is not in the way) if at least one loop was passed
+            others = occupied ^ (1 << i)
+            for first, rest, rest_bits in rays[i]:
+                if others & first or not others & rest:
+                    continue
+                for bit in rest_bits:
+                    if others & bit:
+                        if enemy & bit:
+                            eating_moves.add(base + bit.bit_length() - 1)
+                        break
+        moves.extend(eating_moves)
+        return moves
+
+    def get_move_action(self, player: Tile, move: int) -> Action:
         """
-        :param y: the current y
-        :param x: the current x
-        :param directions: the directions we search in
-        :param player: the player to search actions for
-        :return: all the loop move actions that can be preformed by player
-                 from points (y, x) via the given directions
-        """
-        temp, self.board[y, x] = self.board[y, x], Tile.EMPTY
-        locs = set()
-        for direction in directions:
-            val = self._get_loop_action(y, x, direction, player)
-            if val is not None and val not in locs:
-                locs.add(Action(player, (y, x), val))
-        self.board[y, x] = temp
-        return locs
+        :param player: the color of the player making the move
+        :param move: a move (see get_legal_moves)
+        :return: the action of the move
+        """
+        i, j = divmod(move, self.height * self.width)
+        return Action(player, self.points[i], self.points[j])
+
+    def get_action_move(self, action: Action) -> int:
+        """
+        :param action: an action
+        :return: the move of the action (see get_legal_moves)
+        """
+        (start_y, start_x), (end_y, end_x) = action.start_point, action.end_point
+        return (start_y * self.width + start_x) * self.height * self.width + \
+            end_y * self.width + end_x
 
     def get_legal_actions(self, player: Tile):
         """
         :param player: the color of the player to check
         :return: all the legal actions to the player as a set
         """
-        ys, xs = np.where(self.board == player)
-        legal_actions = set()
-        # get free not eating move
-        for y, x in zip(ys, xs):
-            legal_actions.update(self._get_king_actions(y, x, player))
-        # calculate eating move
-        directions = [LoopDirection.UP, LoopDirection.DOWN,
-                      LoopDirection.LEFT, LoopDirection.RIGHT]
-        for y, x in zip(ys, xs):
-            legal_actions.update(self._get_loop_actions(y, x, directions, player))
-        return legal_actions
+        points, size = self.points, self.height * self.width
+        return set(Action(player, points[move // size], points[move % size])
+                   for move in self.get_legal_moves(player))
 
     def __hash__(self):
-        return hash(self.board)
+        return self.key
 
     def __eq__(self, other):
-        return self.board == other.board
+        return self.black == other.black and self.red == other.red
 
     def __copy__(self):
-        copy_board = Board(0, 0)
-        copy_board.height, copy_board.width = self.height, self.width
-        copy_board.board = np.copy(self.board)
-        copy_board.portal_dict = self.portal_dict
-        copy_board.red_count = self.red_count
-        copy_board.black_count = self.black_count
-        copy_board.last_eat_black = self.last_eat_black
-        copy_board.last_eat_red = self.last_eat_red
+        copy_board = Board.__new__(Board)
+        copy_board.__dict__.update(self.__dict__)
         return copy_board
 
     def is_legal_action(self, action: Action) -> bool:
@@ -240,25 +380,43 @@ class Board:  # turns out to be Board
         :param action: gets a legal action
         preforms the action on the current board
         """
-        if action.color == Tile.RED:
+        self.do_move(self.get_action_move(action))
+
+    def do_move(self, move: int):
+        """
+        :param move: a legal move (see get_legal_moves)
+        preforms the move on the current board
+        """
+        i, j = divmod(move, self.height * self.width)
+        start, end = 1 << i, 1 << j
+        if self.red & start:
             self.last_eat_red += 1
         else:
             self.last_eat_black += 1
-        if self.board[action.end_point] == Tile.RED:
+        if self.red & end:
             self.red_count -= 1
             self.last_eat_black = 0
-        if self.board[action.end_point] == Tile.BLACK:
+            self.red ^= end
+            self.key ^= self.red_keys[j]
+        if self.black & end:
             self.black_count -= 1
             self.last_eat_red = 0
-        self.board[action.end_point] = self.board[action.start_point]
-        self.board[action.start_point] = Tile.EMPTY
+            self.black ^= end
+            self.key ^= self.black_keys[j]
+        if self.red & start:
+            self.red ^= start | end
+            self.key ^= self.red_keys[i] ^ self.red_keys[j]
+        elif self.black & start:
+            self.black ^= start | end
+            self.key ^= self.black_keys[i] ^ self.black_keys[j]
 
     def print_board(self):  # textual. WITHOUT loops
         """
         prints the board to the terminal
         """
-        for i in range(len(self.board)):
-            print(f'[{i}]', self.board[i])
+        board = self.board
+        for i in range(len(board)):
+            print(f'[{i}]', board[i])
         print('   ', np.arange(WIDTH))
 
     def get_num_pieces(self, color: Tile):
@@ -279,17 +437,24 @@ class Board:  # turns out to be Board
         :param color: the color interested
         :return: a set of (y,x) for all positions in the board with the given color
         """
-        ys, xs = np.where(self.board == color)
-        return set((y, x) for y, x in zip(ys, xs))
+        return set(self.points[i] for i in bit_indices(self.get_bits(color)))
 
-    def revert_action(self, action: Action, changed_tile: Tile):
+    def revert_action(self, action: Action, changed_tile: Tile, last_eat=None):
         """
         :param action: the action to revert
         :param changed_tile: the tile that was eaten by the action
+        :param last_eat: the (last_eat_red, last_eat_black) from before the
+                         action, or None to leave them as they are
         the function reverts the last action preformed
         """
-        self.board[action.get_start_point()] = action.get_color()
-        self.board[action.get_end_point()] = changed_tile
+        self.set_tile(*action.get_start_point(), action.get_color())
+        self.set_tile(*action.get_end_point(), changed_tile)
+        if changed_tile == Tile.RED:
+            self.red_count += 1
+        elif changed_tile == Tile.BLACK:
+            self.black_count += 1
+        if last_eat is not None:
+            self.last_eat_red, self.last_eat_black = last_eat
 
     def get_last_eating_move_red(self) -> int:
         """
@@ -1,5 +1,5 @@
 from Enums import Tile
-from Board import Board
+from Board import Board, bit_indices
 import numpy as np
 
 position_array = np.array([[0, 5, 5, 5, 5, 0],
@@ -16,6 +16,28 @@ position_array_2 = np.array([[0, 5, 5, 5, 5, 0],
                              [5, 20, 10, 10, 20, 5],
                              [0, 5, 5, 5, 5, 0]])
 
+CHUNK = 12  # bits looked up at once
+CHUNK_MASK = (1 << CHUNK) - 1
+
+
+def chunk_tables(weights: np.ndarray):
+    """
+    :param weights: a weight for every tile of the board
+    :return: for each CHUNK bits of a bitboard, the sum of the weights of
+             every value of those bits
+    """
+    weights = weights.ravel().tolist()
+    tables = []
+    for start in range(0, len(weights), CHUNK):
+        chunk = weights[start:start + CHUNK]
+        tables.append(tuple(sum(chunk[i] for i in bit_indices(bits))
+                            for bits in range(1 << len(chunk))))
+    return tables
+
+
+position_tables = chunk_tables(position_array)
+position_tables_2 = chunk_tables(position_array_2)
+
 
 def switch_color(color: Tile):
     """
@@ -42,7 +64,10 @@ def position_heuristic(board: Board, player_color: Tile):
     :return: a number that combines evaluate the board via the position of the
     pieces
     """
-    return np.sum(position_array * (board.get_np_board() == player_color))
+    low, middle, high = position_tables
+    bits = board.get_bits(player_color)
+    return low[bits & CHUNK_MASK] + middle[bits >> CHUNK & CHUNK_MASK] + \
+           high[bits >> 2 * CHUNK]
 
 
 def position2_heuristic(board: Board, player_color: Tile):
@@ -52,7 +77,10 @@ def position2_heuristic(board: Board, player_color: Tile):
     :return: a number that combines evaluate the board via the position of the
     pieces, another evaluator
     """
-    return np.sum(position_array_2 * (board.get_np_board() == player_color))
+    low, middle, high = position_tables_2
+    bits = board.get_bits(player_color)
+    return low[bits & CHUNK_MASK] + middle[bits >> CHUNK & CHUNK_MASK] + \
+           high[bits >> 2 * CHUNK]
 
 
 def attack_heuristic(board: Board, player_color: Tile):
@@ -21,7 +21,9 @@ def build_MCST_agent() -> MonteCarloPlayer:
     depth = int(input('Choose the depth of this agent: '))
     num_simulations = int(input('Choose the number of simulations: '))
     heuristic = PLAYERS_HEURISTICS[input('Choose heuristic (H1, H2, H3, H4, H5): ')]
-    return MonteCarloPlayer(depth, num_simulations, heuristic)
+    time_limit = input('Choose the seconds per move instead (empty for no limit): ')
+    return MonteCarloPlayer(depth, num_simulations, heuristic,
+                            float(time_limit) if time_limit else None)
 
 
 def build_MINIMAX_agent() -> MiniMaxPlayer:
@@ -30,7 +32,8 @@ def build_MINIMAX_agent() -> MiniMaxPlayer:
     """
     depth = int(input('Choose the depth of this agent: '))
     heuristic = PLAYERS_HEURISTICS[input('Choose heuristic (H1, H2, H3, H4, H5): ')]
-    return MiniMaxPlayer(depth, heuristic)
+    time_limit = input('Choose the seconds per move (empty for no limit): ')
+    return MiniMaxPlayer(depth, heuristic, float(time_limit) if time_limit else None)
 
 
 def get_player(is_gui: bool) -> Player:
@@ -4,7 +4,9 @@ from abc import ABC, abstractmethod
 from Board import Action
 from Enums import Tile
 from Heuristics import switch_color
+import multiprocessing
 import random
+import time
 
 
 class Player(ABC):
@@ -100,26 +102,123 @@ class HumanPlayer(Player):
             return self.update_info_point_chosen(board, y, x)
 
 
+class SearchTimeout(Exception):
+    """
+    raised inside the search when the time for the move is up
+    """
+    pass
+
+
+EXACT, LOWER, UPPER = 0, 1, 2  # what a stored score is of the true score
+
+
 class MiniMaxPlayer(Player):
-    def __init__(self, depth, heuristic):
+    """
+    Alpha-beta minimax with iterative deepening: the depths are searched one
+    after the other, until depth or until the time for the move is up, and the
+    action of the deepest finished search is played. The searches share a
+    transposition table (Zobrist key and color -> depth, score, bound, best
+    action), and every node tries its actions best first: the table's action,
+    captures, the killer moves of its ply and then by history. The actions are
+    done and reverted on one copy of the board.
+    """
+    CHECK_EVERY = 1024  # nodes between time checks
+    MAX_TABLE_SIZE = 1 << 20  # entries the table is cleared at
+
+    def __init__(self, depth, heuristic, time_limit=None):
         """
         :param depth: the depth of the tree
         :param heuristic: the heuristic for evaluation
+        :param time_limit: the seconds to search each move for, or None to
+                           always search to depth
         """
         super().__init__()
         self.depth = depth
         self.heuristic = heuristic
+        self.time_limit = time_limit
+        self.table = {}
+        self.table_color = None
+        self.killers = []
+        self.history = {}
+        self.deadline = None
+        self.nodes = 0
+        self.reached_depth = 0
 
     def get_action(self, board) -> Action:
         """
         :param board: gets a board object
         :return: the chosen action by the player for the given board
         """
-        action, score = self.minimax_alpha_beta(board, self.depth, self.color)
-        return action
+        if self.table_color != self.color or len(self.table) > self.MAX_TABLE_SIZE:
+            self.table.clear()
+            self.table_color = self.color
+        self.killers = [[] for _ in range(self.depth)]
+        self.history = {}
+        self.nodes = 0
+        self.reached_depth = 0
+        self.deadline = None if self.time_limit is None else \
+            time.perf_counter() + self.time_limit
+        state = board.__copy__()
+        best_action = None
+        for depth in range(1, self.depth + 1):
+            try:
+                action, score = self.minimax_alpha_beta(state, depth, self.color)
+            except SearchTimeout:
+                state = board.__copy__()
+                break
+            if action is not None:
+                best_action = action
+            self.reached_depth = depth
+        if best_action is None:
+            actions = state.get_legal_actions(self.color)
+            best_action = self.order_actions(state, actions, self.color, None, 0)[0] \
+                if actions else None
+        return best_action
+
+    def order_actions(self, game_state, actions, color, table_action, ply):
+        """
+        :param game_state: the current game state
+        :param actions: the legal actions of color
+        :param color: the current color of the player
+        :param table_action: the best action the transposition table knows of
+        :param ply: the number of actions from the root
+        :return: the actions sorted best first
+        """
+        enemy = game_state.get_bits(switch_color(color))
+        width = game_state.width
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        history = self.history
+
+        def priority(action):
+            if table_action is not None and action == table_action:
+                return 3, 0
+            end_y, end_x = action.end_point
+            if enemy >> (end_y * width + end_x) & 1:
+                return 2, 0
+            move = (action.start_point, action.end_point)
+            if move in killers:
+                return 1, 0
+            return 0, history.get(move, 0)
+
+        return sorted(actions, key=priority, reverse=True)
+
+    def update_cutoff(self, action, depth, ply):
+        """
+        :param action: a quiet (not eating) action that caused a cutoff
+        :param depth: the depth left at the node
+        :param ply: the number of actions from the root
+        remembers the action as a killer of its ply and in the history
+        """
+        move = (action.start_point, action.end_point)
+        self.history[move] = self.history.get(move, 0) + depth * depth
+        if ply < len(self.killers):
+            killers = self.killers[ply]
+            if move not in killers:
+                killers.insert(0, move)
+                del killers[2:]
 
     def minimax_alpha_beta(self, game_state, depth, color, is_max=True,
-                           alpha=-float('inf'), beta=float('inf')):
+                           alpha=-float('inf'), beta=float('inf'), ply=0):
         """
         :param game_state: the current game state
         :param depth: the depth left
@@ -127,147 +226,402 @@ class MiniMaxPlayer(Player):
         :param is_max: boolean if the player is the max player or not
         :param alpha: the alpha parameter
         :param beta: the beta parameter
+        :param ply: the number of actions from the root
         :return: a tuple of (Action, score) for the best action for the player
         """
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % self.CHECK_EVERY == 0 and \
+                time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        if depth == 0:
+            return None, self.heuristic(game_state, self.color)
+        key = (hash(game_state) << 1) | (color == Tile.RED)
+        entry = self.table.get(key)
+        table_action = None
+        if entry is not None:
+            entry_depth, score, bound, table_action = entry
+            if entry_depth >= depth and ply > 0 and \
+                    (bound == EXACT or
+                     (bound == LOWER and score >= beta) or
+                     (bound == UPPER and score <= alpha)):
+                return table_action, score
         actions = game_state.get_legal_actions(color)
-        if depth == 0 or len(actions) == 0:
+        if len(actions) == 0:
             return None, self.heuristic(game_state, self.color)
-        if is_max:
-            max_action = None
-            for action in actions:
-                state = game_state.__copy__()
-                state.do_action(action)
-                last_action, score = self.minimax_alpha_beta(state, depth - 1,
-                                                             switch_color(color),
-                                                             False, alpha, beta)
-                if alpha < score:
-                    max_action, alpha = action, score
-                if alpha >= beta:
-                    return None, alpha
-            return max_action, alpha
+        if table_action is not None and table_action not in actions:
+            table_action = None
+
+        alpha_start, beta_start = alpha, beta
+        best_action = None
+        cutoff = False
+        for action in self.order_actions(game_state, actions, color, table_action, ply):
+            eaten = game_state.get_tile(*action.end_point)
+            last_eat = (game_state.get_last_eating_move_red(),
+                        game_state.get_last_eating_move_black())
+            game_state.do_action(action)
+            last_action, score = self.minimax_alpha_beta(game_state, depth - 1,
+                                                         switch_color(color),
+                                                         not is_max, alpha, beta,
+                                                         ply + 1)
+            game_state.revert_action(action, eaten, last_eat)
+            if is_max and alpha < score:
+                best_action, alpha = action, score
+            elif not is_max and beta > score:
+                best_action, beta = action, score
+            if alpha >= beta:
+                if eaten == Tile.EMPTY:
+                    self.update_cutoff(action, depth, ply)
+                cutoff = True
+                break
+
+        score = alpha if is_max else beta
+        if cutoff:
+            bound = LOWER if is_max else UPPER
+        elif (is_max and score <= alpha_start) or (not is_max and score >= beta_start):
+            bound = UPPER if is_max else LOWER
         else:
-            min_action = None
-            for action in actions:
-                state = game_state.__copy__()
-                state.do_action(action)
-                last_action, score = self.minimax_alpha_beta(state, depth - 1,
-                                                             switch_color(color),
-                                                             True, alpha, beta)
-                if beta > score:
-                    min_action, beta = action, score
-                if alpha >= beta:
-                    return None, beta
-            return min_action, beta
-
-
-class Node:
-    total_simulations = 0
-
-    def __init__(self, state, color, prev=None, action=None):
-        """
-        :param state: the current state of the game
-        :param color: the color of the node
-        :param prev: a pointer to the previous node or None
-        :param action: the action that created this Node or None
-        """
-        self.state = state
-        self.color = color
-        self.next = set()
-        self.prev = prev
-        self.action = action
-        self.visit_num = 0
-        self.win = 0
+            bound = EXACT
+        self.table[key] = (depth, score, bound, best_action or table_action)
+        if cutoff:
+            return None, score
+        return best_action, score
+
+
+def rollout(state, color, depth, heuristic, player_color, seed=None, rng=None):
+    """
+    :param state: the state to simulate from (not changed)
+    :param color: the color to play first
+    :param depth: the number of random actions to play
+    :param heuristic: the heuristic for evaluation
+    :param player_color: the color the heuristic evaluates for
+    :param seed: the seed of the random actions, when rng is None
+    :param rng: a random.Random to draw the random actions from
+    :return: the heuristic of the state after depth random actions (or before,
+             when a player has none)
+    """
+    rng = random.Random(seed) if rng is None else rng
+    state = state.__copy__()
+    for _ in range(depth):
+        moves = state.get_legal_moves(color)
+        if not moves:
+            break
+        state.do_move(moves[int(rng.random() * len(moves))])
+        color = switch_color(color)
+    return heuristic(state, player_color)
+
+
+class MonteCarloTree:
+    """
+    A Monte Carlo search tree whose statistics are kept in arrays indexed by
+    node, node 0 being the root. The children of a node are made all at once
+    when it is expanded, so they are the nodes first_child[node] up to
+    first_child[node] + num_children[node]. Only the states of the expanded
+    nodes (and the ones looked at for reuse) are kept.
+    """
 
-    def expand(self, add_actions=False):
+    def __init__(self, state, color, player_color, depth, heuristic, rng):
         """
-        :param add_actions: boolean if should remember the actions to create the nodes
-        creates all the children of the node
+        :param state: the state of the root
+        :param color: the color to play at the root
+        :param player_color: the color the heuristic evaluates for
+        :param depth: the depth of the rollout each time
+        :param heuristic: the heuristic for evaluation
+        :param rng: the random.Random of the rollouts
         """
-        actions = self.state.get_legal_actions(self.color)
-        for action in actions:
-            next_state = self.state.__copy__()
-            next_state.do_action(action)
-            self.next.add(Node(next_state, switch_color(self.color),
-                               self, action if add_actions else None))
+        self.player_color = player_color
+        self.depth = depth
+        self.heuristic = heuristic
+        self.rng = rng
+        self.size = 0
+        self.parent = np.zeros(0, dtype=np.int64)
+        self.first_child = np.zeros(0, dtype=np.int64)  # -1 until expanded
+        self.num_children = np.zeros(0, dtype=np.int64)
+        self.visits = np.zeros(0)
+        self.wins = np.zeros(0)
+        self.moves, self.colors, self.states = [], [], []  # of every node
+        self.add_nodes(1, -1, [None], color)
+        self.states[0] = state
+
+    def add_nodes(self, count, parent, moves, color):
+        """
+        :param count: the number of nodes to add
+        :param parent: the parent of the new nodes
+        :param moves: the moves leading to the new nodes
+        :param color: the color to play at the new nodes
+        :return: the first new node
+        """
+        first = self.size
+        self.size += count
+        if self.size > len(self.visits):
+            capacity = max(2 * len(self.visits), self.size, 1024)
+            for name in ('parent', 'first_child', 'num_children', 'visits', 'wins'):
+                old = getattr(self, name)
+                new = np.zeros(capacity, dtype=old.dtype)
+                new[:len(old)] = old
+                setattr(self, name, new)
+        self.parent[first:self.size] = parent
+        self.first_child[first:self.size] = -1
+        self.num_children[first:self.size] = 0
+        self.visits[first:self.size] = 0
+        self.wins[first:self.size] = 0
+        self.moves.extend(moves)
+        self.colors.extend([color] * count)
+        self.states.extend([None] * count)
+        return first
 
-    def get_uct(self):
+    def get_state(self, node):
         """
-        :return: get the value of the node
+        :param node: a node
+        :return: the state of the node
         """
-        return (self.win / self.visit_num + (2 * np.log(Node.total_simulations) / self.visit_num) ** 0.5) \
-            if self.visit_num else float('inf')
+        if self.states[node] is None:
+            state = self.get_state(self.parent[node]).__copy__()
+            state.do_move(self.moves[node])
+            self.states[node] = state
+        return self.states[node]
 
-    @staticmethod
-    def best_child_uct(node):
+    def children(self, node):
         """
-        :param node: the node
-        :return: the best child of the node (unexplored is always better)
+        :param node: a node
+        :return: the range of the children of the node
         """
-        return max(node.next, key=lambda n: n.get_uct())
+        first = self.first_child[node]
+        return range(first, first + self.num_children[node]) if first >= 0 else range(0)
+
+    def expand(self, node):
+        """
+        :param node: a node
+        creates all the children of the node, if it has none yet
+        """
+        if self.first_child[node] >= 0:
+            return
+        moves = sorted(self.get_state(node).get_legal_moves(self.colors[node]))
+        first = self.add_nodes(len(moves), node, moves, switch_color(self.colors[node]))
+        self.first_child[node] = first
+        self.num_children[node] = len(moves)
+
+    def traverse(self):
+        """
+        :return: the first node without children or visits on the path that
+                 picks the child with the best uct from the root
+        """
+        node = 0
+        while self.num_children[node] and self.visits[node]:
+            first = self.first_child[node]
+            last = first + self.num_children[node]
+            visits = self.visits[first:last]
+            unvisited = np.flatnonzero(visits == 0)
+            if len(unvisited):
+                node = first + unvisited[0]
+                continue
+            uct = self.wins[first:last] / visits + \
+                np.sqrt(2 * np.log(self.visits[node]) / visits)
+            node = first + int(np.argmax(uct))
+        return node
+
+    def backpropagate(self, node, result, count=1):
+        """
+        :param node: the node the simulations ran from
+        :param result: the sum of the results of the simulations
+        :param count: the number of simulations
+        adds the simulations to the node and all its ancestors
+        """
+        while node >= 0:
+            self.visits[node] += count
+            self.wins[node] += result
+            node = self.parent[node]
+
+    def search(self, iterations=None, deadline=None, pool=None, rollouts=1):
+        """
+        :param iterations: the number of iterations to run, or None to run
+                           until deadline
+        :param deadline: the time.perf_counter() to stop at, or None
+        :param pool: a multiprocessing pool to run the rollouts in, or None to
+                     run them here
+        :param rollouts: the number of rollouts of each leaf (in the pool)
+        runs iterations of traverse, expand, rollout and backpropagate
+        """
+        done = 0
+        while (iterations is None or done < iterations) and \
+                (deadline is None or time.perf_counter() < deadline):
+            leaf = self.traverse()
+            self.expand(leaf)
+            state, color = self.get_state(leaf), self.colors[leaf]
+            if pool is None:
+                result = rollout(state, color, self.depth, self.heuristic,
+                                 self.player_color, rng=self.rng)
+                self.backpropagate(leaf, result)
+            else:
+                tasks = [(state, color, self.depth, self.heuristic, self.player_color,
+                          self.rng.getrandbits(32)) for _ in range(rollouts)]
+                self.backpropagate(leaf, sum(pool.starmap(rollout, tasks)), rollouts)
+            done += 1
+
+    def root_statistics(self) -> dict:
+        """
+        :return: the move -> (visits, wins) of every child of the root
+        """
+        return {self.moves[child]: (float(self.visits[child]), float(self.wins[child]))
+                for child in self.children(0)}
+
+    def find(self, state, color, max_depth=1):
+        """
+        :param state: a state
+        :param color: the color to play at the state
+        :param max_depth: the number of levels under the root to look in
+        :return: a node of the tree, at most max_depth levels under the root,
+                 with the given state and color to play, or None
+        """
+        level = [0]
+        for depth in range(max_depth + 1):
+            for node in level:
+                if self.colors[node] == color and self.get_state(node) == state:
+                    return node
+            if depth < max_depth:
+                level = [child for node in level for child in self.children(node)]
+        return None
+
+    def reroot(self, node):
+        """
+        :param node: a node
+        makes the node the root, keeping only its subtree
+        """
+        order = [node]  # the old nodes in their new order, each block of
+        new_index = {node: 0}  # children after the blocks before it
+        for old in order:
+            for child in self.children(old):
+                new_index[child] = len(order)
+                order.append(child)
+        index = np.array(order, dtype=np.int64)
+        self.parent = np.array([new_index.get(self.parent[old], -1) for old in order],
+                               dtype=np.int64)
+        self.parent[0] = -1
+        self.first_child = np.array([new_index[self.first_child[old]]
+                                     if self.num_children[old] else
+                                     (len(order) if self.first_child[old] >= 0 else -1)
+                                     for old in order], dtype=np.int64)
+        self.num_children = self.num_children[index]
+        self.visits = self.visits[index]
+        self.wins = self.wins[index]
+        self.moves = [self.moves[old] for old in order]
+        self.colors = [self.colors[old] for old in order]
+        self.states = [self.states[old] for old in order]
+        self.moves[0] = None
+        self.size = len(order)
+
+
+def search_root(state, color, depth, heuristic, iterations, time_limit, seed):
+    """
+    runs a search from a new tree, for root parallel search in a pool
+    :return: the root statistics of the tree (see MonteCarloTree.root_statistics)
+    """
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    tree = MonteCarloTree(state, color, color, depth, heuristic, random.Random(seed))
+    tree.search(iterations, deadline)
+    return tree.root_statistics()
 
 
 class MonteCarloPlayer(Player):
-    def __init__(self, depth, num, heuristic):
+    """
+    Monte Carlo tree search. The tree is kept between moves: after the action
+    is chosen its node becomes the root, and the next move starts from the
+    node of the opponent's reply, if it is in the tree.
+    With more than one worker, the search runs on a pool of processes, either
+    root parallel (every other worker grows its own tree from the root, and
+    the statistics of the roots are summed) or leaf parallel (every leaf is
+    rolled out once by every worker). Every rollout draws from its own seed.
+    """
+
+    def __init__(self, depth, num, heuristic, time_limit=None, workers=1,
+                 parallel='root', seed=None):
         """
         :param depth: the depth of the rollout each time
         :param num: the number of iteration
         :param heuristic: the heuristic for evaluation
+        :param time_limit: the seconds to search each move for instead of num
+                           iterations, or None
+        :param workers: the number of processes to search with
+        :param parallel: 'root' or 'leaf', how the workers share the search
+        :param seed: the seed of the random rollouts
         """
         super().__init__()
+        if parallel not in ('root', 'leaf'):
+            raise ValueError('parallel should be root or leaf, not ' + repr(parallel))
         self.depth = depth
         self.num = num
         self.heuristic = heuristic
+        self.time_limit = time_limit
+        self.workers = workers
+        self.parallel = parallel
+        self.rng = random.Random(seed)
+        self.tree = None
+        self.pool = None
 
-    def get_action(self, board) -> Action:
+    def get_pool(self):
         """
-        :param board: gets a board object
-        :return: the chosen action by the player for the given board
+        :return: the pool of the player's worker processes
         """
-        root = Node(board, self.color)
-        for i in range(self.num):
-            leaf = self.traverse(root)
-            leaf.expand(leaf == root)
-            result = self.rollout(leaf)
-            self.backpropagate(leaf, result)
-            Node.total_simulations += 1
-        best = max(root.next, key=lambda n: n.win / n.visit_num if n.visit_num else -float('inf'))
-        return best.action
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.workers - (self.parallel == 'root'))
+        return self.pool
 
-    @staticmethod
-    def traverse(node):
+    def close(self):
         """
-        :param node: gets the root
-        :return: an unexplored child of the root that has the most potential
+        stops the player's worker processes
         """
-        while node.next and node.get_uct() != float('inf'):
-            node = Node.best_child_uct(node)
-        return node
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
 
-    def rollout(self, node):
+    def get_tree(self, board):
         """
-        :param node: the node to simulate through
-        simulates a run from node for depth steps
-        """
-        state = node.state.__copy__()
-        cur_color = node.color
-        for _ in range(self.depth):
-            actions = state.get_legal_actions(cur_color)
-            if len(actions) == 0:
-                return self.heuristic(state, self.color)
-            state.do_action(random.choice(tuple(actions)))
-            cur_color = switch_color(cur_color)
-        return self.heuristic(state, self.color)
+        :param board: gets a board object
+        :return: the tree from the last move rerooted at board, or a new one
+        """
+        tree = self.tree
+        node = None if tree is None or tree.player_color != self.color else \
+            tree.find(board, self.color)
+        if node is None:
+            return MonteCarloTree(board.__copy__(), self.color, self.color,
+                                  self.depth, self.heuristic, self.rng)
+        tree.reroot(node)
+        return tree
 
-    def backpropagate(self, node, result):
+    def get_action(self, board) -> Action:
         """
-        :param node: the current node
-        :param result: the result by the simulation
-        updates the node with the result and calls to update the previous one
+        :param board: gets a board object
+        :return: the chosen action by the player for the given board
         """
-        if node:
-            node.visit_num += 1
-            node.win += result
-            self.backpropagate(node.prev, result)
+        tree = self.get_tree(board)
+        deadline = None if self.time_limit is None else \
+            time.perf_counter() + self.time_limit
+        iterations = None if self.time_limit is not None else self.num
+        if self.workers > 1 and self.parallel == 'root':
+            share = None if iterations is None else -(-iterations // self.workers)
+            tasks = [(board.__copy__(), self.color, self.depth, self.heuristic, share,
+                      self.time_limit, self.rng.getrandbits(32))
+                     for _ in range(self.workers - 1)]
+            pending = self.get_pool().starmap_async(search_root, tasks)
+            tree.search(share, deadline)
+            statistics = tree.root_statistics()
+            for other in pending.get():
+                for move, (visits, wins) in other.items():
+                    total_visits, total_wins = statistics.get(move, (0, 0))
+                    statistics[move] = (total_visits + visits, total_wins + wins)
+        elif self.workers > 1:
+            tree.search(None if iterations is None else -(-iterations // self.workers),
+                        deadline, self.get_pool(), self.workers)
+            statistics = tree.root_statistics()
+        else:
+            tree.search(iterations, deadline)
+            statistics = tree.root_statistics()
+        self.tree = tree
+        if not statistics:
+            return None
+        best = max(statistics, key=lambda move: statistics[move][1] / statistics[move][0]
+                   if statistics[move][0] else -float('inf'))
+        tree.reroot(next(child for child in tree.children(0) if tree.moves[child] == best))
+        return board.get_move_action(self.color, best)
 
 
 class RandomPlayer(Player):
@@ -3,6 +3,7 @@ import numpy as np
 from imageio import imread
 from skimage.color import rgb2gray
 import cv2
+from concurrent.futures import ThreadPoolExecutor
 
 REPRESENTATION_GRAY = 1  # the gray representation constant
 REPRESENTATION_RGB = 2  # the rgb representation constant
@@ -13,6 +14,7 @@ RGB_TO_YIQ_MATRIX = np.array([
 ])
 YIQ_TO_RGB_MATRIX = np.linalg.inv(RGB_TO_YIQ_MATRIX)
 MAX_COLOR_RANGE = 255
+STRIP_HEIGHT = 256  # the rows of a strip of the tiled functions
 
 
 def is_gray_img(img):
@@ -26,7 +28,16 @@ def read_image(filename, representation):
     :param representation: the type of the img (gray or rgb)
     :return: the img
     """
-    im = np.array(imread(filename)).astype(np.float64)  # read the image
+    return normalize_image(imread(filename), representation)
+
+
+def normalize_image(im, representation):
+    """
+    :param im: get an img of range [0-255], as read from a file
+    :param representation: the type of the img (gray or rgb)
+    :return: the img of range [0-1] in the representation
+    """
+    im = np.array(im, dtype=np.float64)
     im /= MAX_COLOR_RANGE  # normalise img
     if representation == REPRESENTATION_RGB:
         return im[:, :, 0:3]
@@ -42,7 +53,9 @@ def convert_to_unit8_img(img):
     :param img: get an img of range [0-1]
     :return: the img to be in the range [0-255]
     """
-    return (img * MAX_COLOR_RANGE).astype(np.uint8)
+    # cast as it is computed, without a float temporary
+    return np.multiply(img, MAX_COLOR_RANGE, dtype=img.dtype,
+                       out=np.empty(img.shape, np.uint8), casting='unsafe')
 
 
 def display_img_rgb(img):
@@ -106,36 +119,89 @@ def histogram_equalize(im_orig):
     changed image
     """
     if is_gray_img(im_orig):
-        im_fixed, hist_orig, hist_eq = histogram_equalize_gray(im_orig)
-        return [np.clip(im_fixed, 0, 1), hist_orig, hist_eq]
-    # it is rgb
-    yiq = rgb2yiq(im_orig)
-    gray_im_fixed, hist_orig, hist_eq = histogram_equalize_gray(yiq[:, :, 0])
-    yiq[:, :, 0] = gray_im_fixed
-    rgb = yiq2rgb(yiq)
-    return [np.clip(rgb, 0, 1), hist_orig, hist_eq]
+        return histogram_equalize_gray(im_orig)
+    # it is rgb, only the y channel changes
+    y = rgb2y(im_orig)
+    gray_im_fixed, hist_orig, hist_eq = histogram_equalize_gray(y, clip=False)
+    rgb = update_rgb_y(im_orig, y, gray_im_fixed)
+    return [np.clip(rgb, 0, 1, out=rgb), hist_orig, hist_eq]
+
+
+def rgb2y(imRGB):
+    """
+    :param imRGB: get a rgb img of range [0-1]
+    :return: the y channel of the yiq of the img
+    """
+    return np.dot(imRGB, RGB_TO_YIQ_MATRIX[0])
+
+
+def update_rgb_y(imRGB, y, new_y):
+    """
+    :param imRGB: get a rgb img of range [0-1]
+    :param y: the y channel of the yiq of the img
+    :param new_y: a new y channel
+    :return: the rgb img of the yiq of the img with the new y channel, i.e.
+    yiq2rgb of the yiq with y changed, without computing the i and q channels
+    """
+    delta = np.subtract(new_y, y, out=new_y)
+    rgb = delta[:, :, np.newaxis] * YIQ_TO_RGB_MATRIX[:, 0]
+    rgb += imRGB
+    return rgb
 
 
-def histogram_equalize_gray(im_orig, bin_number=256):
+def uint8_histogram(fixed_im):
+    """
+    :param fixed_im: an img of range [0-255] (uint8)
+    :return: the histogram of the img with a bin per value, the same as
+    np.histogram(fixed_im, 256, (0, 255))
+    """
+    return np.bincount(fixed_im.ravel(), minlength=MAX_COLOR_RANGE + 1)
+
+
+def histogram_equalize_gray(im_orig, bin_number=256, clip=True):
     """
     :param im_orig: get an img of range [0-1]
     :param bin_number: the number of bins
+    :param clip: true to clip im_eq to [0-1]
     :return: [im_eq, hist_orig, hist_eq] when the hist_orig is the histogram
     before change, hist_eq is the histogram after change, and im_eq is the
     changed image
     """
     fixed_im = convert_to_unit8_img(im_orig)  # [0-255] mapping
-    hist_orig, bins = np.histogram(fixed_im, bin_number, (0, MAX_COLOR_RANGE))
+    hist_orig = uint8_histogram(fixed_im) if bin_number == MAX_COLOR_RANGE + 1 \
+        else np.histogram(fixed_im, bin_number, (0, MAX_COLOR_RANGE))[0]
 
+    # the img is mapped in one pass
+    lut = equalization_lut(hist_orig)
+    if clip:
+        lut = np.clip(lut, 0, 1)
+    im_eq = lut[fixed_im]
+    return [im_eq, hist_orig, lut_histogram(lut, hist_orig, bin_number)]
+
+
+def equalization_lut(hist_orig):
+    """
+    :param hist_orig: the histogram of an img of range [0-255]
+    :return: the 0-1 mapping of every value that equalizes the histogram
+    """
     cumsum = hist_orig.cumsum()
     cumsum = cumsum * (MAX_COLOR_RANGE / cumsum[-1])  # normalize cumsum
 
     m = np.where(cumsum > 0)[0][0]  # the first non zero value
-    # 0-1 mapping
-    im_eq = (cumsum[fixed_im] - cumsum[m]) / (cumsum[-1] - cumsum[m])
-    hist_eq, bins = np.histogram(convert_to_unit8_img(im_eq),
-                                 bin_number, (0, MAX_COLOR_RANGE))
-    return [im_eq, hist_orig, hist_eq]
+    return (cumsum - cumsum[m]) / (cumsum[-1] - cumsum[m])
+
+
+def lut_histogram(lut, hist, bin_number=256):
+    """
+    :param lut: a 0-1 mapping of every value of range [0-255]
+    :param hist: the histogram of an img of range [0-255]
+    :param bin_number: the number of bins
+    :return: the histogram of the img mapped by the lut, every pixel of a
+    value goes to the same bin
+    """
+    hist_lut, bins = np.histogram(convert_to_unit8_img(lut), bin_number,
+                                  (0, MAX_COLOR_RANGE), weights=hist)
+    return hist_lut.astype(hist.dtype)
 
 
 def calculate_new_z(q, n_quant):
@@ -150,50 +216,57 @@ def calculate_new_z(q, n_quant):
     z[0] = 0
     z[1:-1] = (last_q + next_q) / 2.0  # (qi + q_(i+1)) / 2
     z[-1] = MAX_COLOR_RANGE
-    return np.rint(z).astype(np.int)
+    return np.rint(z).astype(np.int64)
+
+
+def cumulative_moments(histogram):
+    """
+    :param histogram: the histogram of the img, the amount of pixels of every
+    z (integer counts, so every sum below is exact)
+    :return: the cumulative sums of h(z), z * h(z) and z^2 * h(z), each with a
+    0 first, so the sum over the values a to b is [b + 1] - [a] of it
+    """
+    histogram = np.asarray(histogram)
+    z = np.arange(len(histogram))
+    moments = np.zeros((3, len(histogram) + 1),
+                       np.result_type(histogram, z))
+    np.cumsum(histogram, out=moments[0, 1:])
+    np.cumsum(z * histogram, out=moments[1, 1:])
+    np.cumsum(z * z * histogram, out=moments[2, 1:])
+    return moments
 
 
-def calculate_new_q(z, probability_z, n_quant):
+def calculate_new_q(z, moments):
     """
     :param z: get the current z vector from values [0-255]
-    :param probability_z: get the probability of z in the img
-    :param n_quant: get the length of the q vector
-    :return:
+    :param moments: the cumulative_moments of the histogram of the img
+    :return: the new q, the mean of every segment z[i] to z[i + 1]
     """
-    q = np.empty((n_quant,), np.float64)
-    prod = probability_z * np.arange(MAX_COLOR_RANGE + 1)  # z * p(z)
-    for i in range(n_quant):
-        range_i = np.arange(z[i], z[i + 1] + 1)
-        q[i] = sum(prod[range_i]) / sum(probability_z[range_i])
-    return q
+    p, zp, zzp = moments[:, z[1:] + 1] - moments[:, z[:-1]]
+    return zp / p
 
 
-def calculate_error(z, q, probability_z, n_quant):
+def calculate_error(z, q, moments):
     """
     :param z: the z vector
     :param q: the q vector
-    :param probability_z: the amount of pixels in z
-    :param n_quant: the length of the q vector
-    :return: the error of q on this probability
+    :param moments: the cumulative_moments of the histogram
+    :return: the error of q on the probability of z (the normalized histogram)
     """
-    error = 0
-    prob = probability_z
-    for i in range(n_quant):
-        range_i = np.arange(z[i], z[i + 1] + 1)
-        squared = (range_i - q[i]) * (range_i - q[i])
-        error += sum(prob[range_i] * squared)
-    return error
+    # the sum of p(z) * (z - q)^2 over every segment z[i] to z[i + 1]
+    p, zp, zzp = moments[:, z[1:] + 1] - moments[:, z[:-1]]
+    return np.sum(zzp - 2 * q * zp + q * q * p) / moments[0, -1]
 
 
 def init_z(histogram, n_quant):
     """
-    :param histogram: a NORMALIZED histogram
+    :param histogram: the histogram of the img (pixel counts)
     :param n_quant: the length of the q vector
     :return: an initialize guess of vector z
     """
-    cumsum = histogram.cumsum()
+    cumsum = (histogram / histogram.sum()).cumsum()  # normalized histogram
     cumsum = (cumsum / cumsum[-1]) * MAX_COLOR_RANGE  # normalized cumsum
-    z = np.empty(n_quant + 1).astype(np.int)
+    z = np.empty(n_quant + 1).astype(np.int64)
     z[0] = 0
     procent = MAX_COLOR_RANGE / n_quant
     for i in range(1, n_quant + 1):
@@ -201,30 +274,74 @@ def init_z(histogram, n_quant):
         z[i] = np.where(cumsum >= num)[0][0]  # the first value bigger than
         # i*procent
     z[-1] = MAX_COLOR_RANGE
-    return np.rint(z).astype(np.int)
+    return np.rint(z).astype(np.int64)
 
 
 def calculate_q(histogram, n_quant, n_iter):
     """
-    :param histogram: a NORMALIZED histogram
+    :param histogram: the histogram of the img (pixel counts)
     :param n_quant: the length of the q vector
     :param n_iter: the amount of iterations
     :return: [z, q, errors] when z, q are the calculated values and errors
     are the errors of all calculations up to now
     """
     z = init_z(histogram, n_quant)
+    moments = cumulative_moments(histogram)
     errors = np.array([])
     last_q = np.zeros((n_quant,))
     q = None
     for i in range(n_iter):
-        q = calculate_new_q(z, histogram, n_quant)
+        q = calculate_new_q(z, moments)
         z = calculate_new_z(q, n_quant)
         errors = np.append(errors, np.array(
-            [calculate_error(z, q, histogram, n_quant)]))
+            [calculate_error(z, q, moments)]))
         if sum(abs(q - last_q)) == 0:  # q == last_q
             break
         last_q = q
-    return [z, q, np.rint(errors).astype(np.int)]
+    return [z, q, np.rint(errors).astype(np.int64)]
+
+
+def calculate_optimal_q(histogram, n_quant):
+    """
+    finds the quantization with the least error by dynamic programming: the
+    least error of the values up to b in k segments is the least over a of
+    the error of the values up to a - 1 in k - 1 segments and the error of
+    the segment a to b
+    :param histogram: the histogram of the img (pixel counts)
+    :param n_quant: the length of the q vector (at most the histogram length)
+    :return: [z, q, errors] as calculate_q, errors being only the least error.
+    Here segment i is z[i] to z[i + 1] - 1 (the last one to z[-1] as well),
+    which is the segment update_img_with_q maps to q[i]
+    """
+    moments = cumulative_moments(histogram)
+    levels = len(histogram)
+    first = np.arange(levels)[:, np.newaxis]
+    last = np.arange(levels)
+    # segment_error[a, b] is the error of the segment a to b with its mean
+    p, zp, zzp = moments[:, np.newaxis, 1:] - moments[:, :-1, np.newaxis]
+    mean = np.divide(zp, p, out=np.zeros(zp.shape), where=p > 0)
+    segment_error = np.where(first <= last, zzp - zp * mean, np.inf)
+
+    best = segment_error[0]  # the least error of the values up to b
+    starts = []  # the start of the last segment of every best, for every k
+    for _ in range(1, n_quant):
+        candidates = best[:-1, np.newaxis] + segment_error[1:]  # [a - 1, b]
+        start = np.argmin(candidates, axis=0)
+        best = candidates[start, last]
+        starts.append(start + 1)
+
+    z = np.empty(n_quant + 1, dtype=np.int64)
+    z[0], z[-1] = 0, levels - 1
+    end = levels - 1
+    for i in range(n_quant - 1, 0, -1):
+        z[i] = starts[i - 1][end]
+        end = z[i] - 1
+    # the mean of every segment, the middle of an empty one
+    ends = np.append(z[1:-1] - 1, levels - 1)
+    p, zp, _ = moments[:, ends + 1] - moments[:, z[:-1]]
+    q = np.divide(zp, p, out=(z[:-1] + ends) / 2, where=p > 0)
+    error = max(best[-1], 0) / moments[0, -1]
+    return [z, q, np.rint([error]).astype(np.int64)]
 
 
 def update_img_with_q(fixed_im, n_quant, q, z):
@@ -235,49 +352,52 @@ def update_img_with_q(fixed_im, n_quant, q, z):
     :param z: the z vector that was found in the end
     :return: an updated img with q,z in range [0-1]
     """
-    z = np.rint(z).astype(np.int)
-    q = q.astype(np.uint8)
-    new_range = np.zeros(MAX_COLOR_RANGE + 1)
-    for i in range(n_quant):
-        range_i = np.arange(z[i], z[i + 1] + 1)
-        new_range[range_i] = q[i]
-    fixed_im[:, :] = new_range[fixed_im[:, :]]
-    return fixed_im.astype(np.float64) / MAX_COLOR_RANGE
+    # the value z[i] is in segments i - 1 and i, segment i wins
+    values = np.arange(MAX_COLOR_RANGE + 1)
+    segment = np.searchsorted(np.rint(z[1:n_quant]), values, side='right')
+    lut = q.astype(np.uint8)[segment]
+    np.take(lut, fixed_im, out=fixed_im)  # in place
+    return fixed_im / MAX_COLOR_RANGE
 
 
-def quantize_gray(im_orig, n_quant, n_iter, bin_number=256):
+def quantize_gray(im_orig, n_quant, n_iter, bin_number=256, optimal=False):
     """
     :param im_orig: the original img to fix of range [0-1]
     :param n_quant: the length of the q vector
     :param n_iter: the amount of iterations
     :param bin_number: the bin number of the histogram
+    :param optimal: true for the quantization with the least error
+    (calculate_optimal_q) instead of n_iter iterations
     :return: [fixed_im, errors] when the errors is the errors of the img
     and the img is in range [0-1]
     """
     fixed_im = convert_to_unit8_img(im_orig)  # [0-255] mapping
-    hist, bins = np.histogram(fixed_im, bin_number, (0, MAX_COLOR_RANGE))
-    hist = hist / sum(hist)  # normalized histogram
-    z, q, errors = calculate_q(hist, n_quant, n_iter)
+    hist = uint8_histogram(fixed_im) if bin_number == MAX_COLOR_RANGE + 1 \
+        else np.histogram(fixed_im, bin_number, (0, MAX_COLOR_RANGE))[0]
+    if optimal:
+        z, q, errors = calculate_optimal_q(hist, n_quant)
+    else:
+        z, q, errors = calculate_q(hist, n_quant, n_iter)
     fixed_im = update_img_with_q(fixed_im, n_quant, q, z)
     return [fixed_im, errors]
 
 
-def quantize(im_orig, n_quant, n_iter):
+def quantize(im_orig, n_quant, n_iter, optimal=False):
     """
     :param im_orig: the original img to fix of range [0-1]
     :param n_quant: the length of the q vector
     :param n_iter: the amount of iterations
+    :param optimal: true for the quantization with the least error instead
+    of n_iter iterations
     :return: [fixed_im, errors] when the errors is the errors of the img
     and the img is in range [0-1]
     """
     if is_gray_img(im_orig):
-        return quantize_gray(im_orig, n_quant, n_iter)
-    # it is rgb
-    yiq = rgb2yiq(im_orig)
-    gray_im_fixed, errors = quantize_gray(yiq[:, :, 0], n_quant, n_iter)
-    yiq[:, :, 0] = gray_im_fixed
-    rgb = yiq2rgb(yiq)
-    return [rgb, errors]
+        return quantize_gray(im_orig, n_quant, n_iter, optimal=optimal)
+    # it is rgb, only the y channel changes
+    y = rgb2y(im_orig)
+    gray_im_fixed, errors = quantize_gray(y, n_quant, n_iter, optimal=optimal)
+    return [update_rgb_y(im_orig, y, gray_im_fixed), errors]
 
 
 def quantize_rgb(im_orig, n_quant):
@@ -316,3 +436,137 @@ def quantize_rgb(im_orig, n_quant):
     # make sure the type is float64
     im_labels = im_labels.astype(np.float64)
     return im_labels
+
+
+def open_image(filename):
+    """
+    :param filename: get a filename to an img, a .npy file is memory mapped
+    instead of read
+    :return: the img of range [0-255]
+    """
+    if filename.endswith('.npy'):
+        return np.load(filename, mmap_mode='r')
+    return np.asarray(imread(filename))
+
+
+def strip_gray(strip, representation):
+    """
+    :param strip: get some rows of an img of range [0-255]
+    :param representation: the type of the img (gray or rgb)
+    :return: [im, gray] when im is the strip of range [0-1] in the
+    representation, and gray is the gray img quantize and histogram_equalize
+    change: the im itself, or the y channel of an rgb im
+    """
+    im = normalize_image(strip, representation)
+    return [im, im if is_gray_img(im) else rgb2y(im)]
+
+
+def map_strips(function, height, strip_height, workers):
+    """
+    :param function: a function of a slice of rows
+    :param height: the number of rows of the img
+    :param strip_height: the number of rows of a strip
+    :param workers: the number of threads that run the function
+    :return: the results of the function on the strips of the img, in order
+    """
+    strips = [slice(start, start + strip_height)
+              for start in range(0, height, strip_height)]
+    if workers <= 1:
+        return [function(rows) for rows in strips]
+    with ThreadPoolExecutor(workers) as pool:
+        return list(pool.map(function, strips))
+
+
+def tiled_histogram(image, representation, strip_height, workers):
+    """
+    the first pass of the tiled functions
+    :param image: get an img of range [0-255] (see open_image)
+    :param representation: the type of the img (gray or rgb)
+    :param strip_height: the number of rows processed at once
+    :param workers: the number of threads that process strips
+    :return: the histogram of the gray img (see strip_gray), summed over the
+    strips
+    """
+    def strip_histogram(rows):
+        im, gray = strip_gray(image[rows], representation)
+        return uint8_histogram(convert_to_unit8_img(gray))
+    return sum(map_strips(strip_histogram, len(image), strip_height, workers))
+
+
+def tiled_map(image, out_filename, representation, map_gray, clip,
+              strip_height, workers):
+    """
+    the second pass of the tiled functions, every strip is written to
+    out_filename as soon as it is changed
+    :param image: get an img of range [0-255] (see open_image)
+    :param out_filename: the .npy file to write the changed img to
+    :param representation: the type of the img (gray or rgb)
+    :param map_gray: maps the gray img of a strip (see strip_gray) to its
+    changed gray img
+    :param clip: true to clip the changed img to [0-1]
+    :param strip_height: the number of rows processed at once
+    :param workers: the number of threads that process strips
+    """
+    shape = normalize_image(image[:1], representation).shape[1:]
+    out = np.lib.format.open_memmap(out_filename, 'w+', np.float64,
+                                    (len(image),) + shape)
+
+    def map_strip(rows):
+        im, gray = strip_gray(image[rows], representation)
+        new_gray = map_gray(gray)
+        new_im = new_gray if is_gray_img(im) else update_rgb_y(im, gray, new_gray)
+        if clip:
+            np.clip(new_im, 0, 1, out=new_im)
+        out[rows] = new_im
+    map_strips(map_strip, len(image), strip_height, workers)
+    out.flush()
+
+
+def tiled_histogram_equalize(filename, out_filename, representation,
+                             strip_height=STRIP_HEIGHT, workers=1):
+    """
+    histogram_equalize of the img of a file in two passes over its strips,
+    so only strip_height rows of it are processed at once
+    :param filename: get a filename to an img (see open_image)
+    :param out_filename: the .npy file to write the equalized img to
+    :param representation: the type of the img (gray or rgb)
+    :param strip_height: the number of rows processed at once
+    :param workers: the number of threads that process strips
+    :return: [hist_orig, hist_eq] as histogram_equalize
+    """
+    image = open_image(filename)
+    hist_orig = tiled_histogram(image, representation, strip_height, workers)
+    lut = equalization_lut(hist_orig)
+    tiled_map(image, out_filename, representation,
+              lambda gray: lut[convert_to_unit8_img(gray)], True,
+              strip_height, workers)
+    return [hist_orig, lut_histogram(np.clip(lut, 0, 1), hist_orig)]
+
+
+def tiled_quantize(filename, out_filename, representation, n_quant, n_iter,
+                   optimal=False, strip_height=STRIP_HEIGHT, workers=1):
+    """
+    quantize of the img of a file in two passes over its strips, so only
+    strip_height rows of it are processed at once
+    :param filename: get a filename to an img (see open_image)
+    :param out_filename: the .npy file to write the quantized img to
+    :param representation: the type of the img (gray or rgb)
+    :param n_quant: the length of the q vector
+    :param n_iter: the amount of iterations
+    :param optimal: true for the quantization with the least error instead
+    of n_iter iterations
+    :param strip_height: the number of rows processed at once
+    :param workers: the number of threads that process strips
+    :return: the errors as quantize
+    """
+    image = open_image(filename)
+    hist = tiled_histogram(image, representation, strip_height, workers)
+    if optimal:
+        z, q, errors = calculate_optimal_q(hist, n_quant)
+    else:
+        z, q, errors = calculate_q(hist, n_quant, n_iter)
+    tiled_map(image, out_filename, representation,
+              lambda gray: update_img_with_q(convert_to_unit8_img(gray),
+                                             n_quant, q, z), False,
+              strip_height, workers)
+    return errors
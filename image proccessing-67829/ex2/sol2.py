@@ -4,72 +4,250 @@ from imageio import imread
 from skimage.color import rgb2gray
 from scipy.io.wavfile import read, write
 from scipy import signal
-from scipy.ndimage.interpolation import map_coordinates
+import scipy.fft
+from numpy.lib.stride_tricks import sliding_window_view
+from fractions import Fraction
+from itertools import chain
+import wave
+import time
+import os
 
 
-def stft(y, win_length=640, hop_length=160):
-    fft_window = signal.windows.hann(win_length, False)
+STREAM_BLOCK_LENGTH = 1 << 16  # the samples (or frames) processed at once when streaming
+STREAM_MARGIN = 4096  # the context on each side of a block resized when streaming
+STREAM_MAX_DENOMINATOR = 1000  # of the fraction a streamed resize ratio is taken as
 
-    # Window the time series.
-    n_frames = 1 + (len(y) - win_length) // hop_length
-    frames = [y[s:s + win_length] for s in np.arange(n_frames) * hop_length]
 
-    stft_matrix = np.fft.fft(fft_window * frames, axis=1)
-    return stft_matrix.T
+def float_dtype(x):
+    """
+    :param x: an array
+    :return: the float dtype to compute with x in: float32 for single precision
+    (float32 or complex64) arrays, float64 for any other
+    """
+    return np.float32 if x.dtype in (np.float32, np.complex64) else np.float64
 
 
-def istft(stft_matrix, win_length=640, hop_length=160):
-    n_frames = stft_matrix.shape[1]
-    y_rec = np.zeros(win_length + hop_length * (n_frames - 1), dtype=np.float)
-    ifft_window_sum = np.zeros_like(y_rec)
+def stft(y, win_length=640, hop_length=160):
+    y = np.asarray(y)
+    y = y.astype(float_dtype(y), copy=False)
+    fft_window = signal.windows.hann(win_length, False).astype(y.dtype)
+
+    # Window the time series (the last axis), the frames are a view of y
+    n_frames = max(0, 1 + (y.shape[-1] - win_length) // hop_length)
+    frames = sliding_window_view(y, win_length, axis=-1)
+    frames = frames[..., ::hop_length, :][..., :n_frames, :]
+
+    stft_matrix = np.fft.fft(fft_window * frames, axis=-1)
+    return np.swapaxes(stft_matrix, -1, -2)
+
+
+def overlap_add(frames, hop_length):
+    """
+    :param frames: an array of frames (..., n_frames, win_length)
+    :param hop_length: the distance between the starts of consecutive frames
+    :return: the sum of the frames, each put at its start (along the last axis)
+    """
+    *batch, n_frames, win_length = frames.shape
+    length = win_length + hop_length * (n_frames - 1) if n_frames else 0
+    y = np.zeros((*batch, length), dtype=frames.dtype)
+    if win_length % hop_length == 0:
+        # hop_length sample parts: part j of frame f goes to part f + j of y,
+        # the earlier frames are added first
+        parts = win_length // hop_length
+        y_parts = y.reshape(*batch, length // hop_length, hop_length)
+        frame_parts = frames.reshape(*batch, n_frames, parts, hop_length)
+        for j in reversed(range(parts)):
+            y_parts[..., j:j + n_frames, :] += frame_parts[..., j, :]
+    else:
+        starts = np.arange(n_frames)[:, np.newaxis] * hop_length
+        np.add.at(y, (Ellipsis, starts + np.arange(win_length)), frames)
+    return y
 
-    ifft_window = signal.windows.hann(win_length, False)[:, np.newaxis]
+
+def istft(stft_matrix, win_length=640, hop_length=160):
+    n_frames = stft_matrix.shape[-1]
+    ifft_window = signal.windows.hann(win_length, False)
+    ifft_window = ifft_window.astype(float_dtype(stft_matrix))[:, np.newaxis]
     win_sq = ifft_window.squeeze() ** 2
 
     # invert the block and apply the window function
-    ytmp = ifft_window * np.fft.ifft(stft_matrix, axis=0).real
+    ytmp = ifft_window * np.fft.ifft(stft_matrix, axis=-2).real
 
-    for frame in range(n_frames):
-        frame_start = frame * hop_length
-        frame_end = frame_start + win_length
-        y_rec[frame_start: frame_end] += ytmp[:, frame]
-        ifft_window_sum[frame_start: frame_end] += win_sq
+    y_rec = overlap_add(np.swapaxes(ytmp, -1, -2), hop_length)
+    ifft_window_sum = overlap_add(np.broadcast_to(win_sq, (n_frames, win_length)),
+                                  hop_length)
 
     # Normalize by sum of squared window
-    y_rec[ifft_window_sum > 0] /= ifft_window_sum[ifft_window_sum > 0]
+    y_rec[..., ifft_window_sum > 0] /= ifft_window_sum[ifft_window_sum > 0]
     return y_rec
 
 
 def phase_vocoder(spec, ratio):
-    time_steps = np.arange(spec.shape[1]) * ratio
-    time_steps = time_steps[time_steps < spec.shape[1]]
+    empty = np.zeros(spec.shape[:-1] + (0,), dtype=np.result_type(spec, np.complex64))
+    return np.concatenate([empty] + list(stream_phase_vocoder([spec], ratio)), axis=-1)
 
-    # interpolate magnitude
-    yy = np.meshgrid(np.arange(time_steps.size), np.arange(spec.shape[0]))[1]
-    xx = np.zeros_like(yy)
-    coordiantes = [yy, time_steps + xx]
-    warped_spec = map_coordinates(np.abs(spec), coordiantes, mode='reflect',
-                                  order=1).astype(np.complex)
 
-    # phase vocoder
-    # Phase accumulator; initialize to the first sample
-    spec_angle = np.pad(np.angle(spec), [(0, 0), (0, 1)], mode='constant')
-    phase_acc = spec_angle[:, 0]
-
-    for (t, step) in enumerate(np.floor(time_steps).astype(np.int)):
-        # Store to output array
-        warped_spec[:, t] *= np.exp(1j * phase_acc)
+def stream_stft(blocks, win_length=640, hop_length=160):
+    """
+    :param blocks: the blocks of samples of a signal (along the last axis)
+    :return: a generator of the stft of the signal, block by block: the stft
+    matrix of the frames that end in every block (together the frames of the
+    stft of the whole signal)
+    """
+    tail = None  # the samples of the frames that did not end yet
+    for block in blocks:
+        block = np.asarray(block)
+        block = block.astype(float_dtype(block), copy=False)
+        y = block if tail is None else np.concatenate((tail, block), axis=-1)
+        n_frames = max(0, 1 + (y.shape[-1] - win_length) // hop_length)
+        if n_frames:
+            yield stft(y, win_length, hop_length)
+        tail = y[..., n_frames * hop_length:]
 
-        # Compute phase advance
-        dphase = (spec_angle[:, step + 1] - spec_angle[:, step])
 
-        # Wrap to -pi:pi range
-        dphase = np.mod(dphase - np.pi, 2 * np.pi) - np.pi
+def stream_istft(spec_blocks, win_length=640, hop_length=160):
+    """
+    :param spec_blocks: the blocks of frames of an stft matrix (along the last
+    axis)
+    :return: a generator of the signal istft computes from the matrix, in
+    blocks of the samples no later frame adds to
+    """
+    ifft_window = signal.windows.hann(win_length, False)[:, np.newaxis]
+    win_sq = ifft_window.squeeze() ** 2
+    overlap = win_length - hop_length
+    # the sums of the frames so far on the samples not yielded yet
+    pending = pending_sum = 0
+    seen = False
+    for spec in spec_blocks:
+        n_frames = spec.shape[-1]
+        if n_frames == 0:
+            continue
+        seen = True
+        window = ifft_window.astype(float_dtype(spec))
+        ytmp = window * np.fft.ifft(spec, axis=-2).real
+        y_rec = overlap_add(np.swapaxes(ytmp, -1, -2), hop_length)
+        ifft_window_sum = overlap_add(np.broadcast_to(win_sq, (n_frames, win_length)),
+                                      hop_length)
+        y_rec[..., :overlap] += pending
+        ifft_window_sum[:overlap] += pending_sum
+        done = n_frames * hop_length
+        pending, pending_sum = y_rec[..., done:], ifft_window_sum[done:]
+        y_rec, ifft_window_sum = y_rec[..., :done], ifft_window_sum[:done]
+        y_rec[..., ifft_window_sum > 0] /= ifft_window_sum[ifft_window_sum > 0]
+        yield y_rec
+    if seen:
+        pending[..., pending_sum > 0] /= pending_sum[pending_sum > 0]
+        yield pending
+
+
+def wrap_phase(phase):
+    """
+    :param phase: an array of angles
+    :return: the angles wrapped to the -pi:pi range
+    """
+    return phase - 2 * np.pi * np.rint(phase / (2 * np.pi))
+
+
+def stream_phase_vocoder(spec_blocks, ratio):
+    """
+    :param spec_blocks: the blocks of frames of an stft matrix (along the last
+    axis)
+    :param ratio: the ratio to speed up by
+    :return: a generator of the phase vocoder of the matrix: output frame t is
+    interpolated at time t * ratio, so it is yielded once the two frames around
+    that time arrived. The phase accumulator is carried from block to block.
+    There are about n_frames / ratio output frames, so a ratio below 1
+    lengthens the signal (before, the output had at most n_frames frames)
+    """
+    frames = None  # the frames from first on that are still needed
+    first = 0
+    t = 0  # the next output frame
+    phase_acc = None
+    blocks = iter(spec_blocks)
+    last = False
+    while not last:
+        spec = next(blocks, None)
+        last = spec is None
+        if not last:
+            frames = spec if frames is None else np.concatenate((frames, spec), axis=-1)
+        if frames is None or frames.shape[-1] == 0:
+            continue
+        end = first + frames.shape[-1]
+        # the frame after the last one is needed, unless it is the last of all
+        limit = end if last else end - 1
+        time_steps = np.arange(t, int(limit / ratio) + 2) * ratio
+        time_steps = time_steps[time_steps < limit]
+        if len(time_steps) == 0:
+            continue
+        steps = np.floor(time_steps).astype(np.int64)
+        # interpolate magnitude, the frame after the last is the last again
+        local = steps - first
+        following = np.minimum(local + 1, frames.shape[-1] - 1)
+        magnitude = np.abs(frames)
+        fraction = (time_steps - steps).astype(magnitude.dtype)
+        warped_magnitude = magnitude[..., local]
+        warped_magnitude += fraction * (magnitude[..., following] - warped_magnitude)
+
+        # the angle of the frame after the last is 0
+        spec_angle = np.angle(frames)
+        if last:
+            spec_angle = np.pad(spec_angle, [(0, 0)] * (frames.ndim - 1) + [(0, 1)],
+                                mode='constant')
+        if phase_acc is None:
+            # Phase accumulator; initialize to the first sample
+            phase_acc = spec_angle[..., 0].astype(np.float64)
+        # Compute the phase advances of all the frames
+        dphase = wrap_phase(np.diff(spec_angle, axis=-1))
+        # the phase of an output frame is the accumulator with the advances
+        # of the frames before it
+        advance = np.cumsum(dphase[..., local], axis=-1, dtype=np.float64)
+        phases = np.concatenate((phase_acc[..., np.newaxis],
+                                 phase_acc[..., np.newaxis] + advance[..., :-1]), axis=-1)
+        phase_acc = wrap_phase(phase_acc + advance[..., -1])
+        # Store to output array, the sines in the precision of the output
+        phases = wrap_phase(phases).astype(magnitude.dtype)
+        warped_spec = np.empty(phases.shape, dtype=np.result_type(frames, np.complex64))
+        np.multiply(warped_magnitude, np.cos(phases), out=warped_spec.real)
+        np.multiply(warped_magnitude, np.sin(phases), out=warped_spec.imag)
+        yield warped_spec
+
+        t += len(time_steps)
+        keep = min(int(np.floor(t * ratio)), end - 1)
+        frames = frames[..., keep - first:]
+        first = keep
+
+
+def read_wav_blocks(filename, block_length=STREAM_BLOCK_LENGTH):
+    """
+    :param filename: the path to a wav
+    :param block_length: the number of samples in a block
+    :return: the rate of the wav and a generator of its blocks of samples, read
+    from the memory mapped file
+    """
+    rate, data = read(filename, mmap=True)
+    return rate, (data[start: start + block_length]
+                  for start in range(0, len(data), block_length))
 
-        # Accumulate phase
-        phase_acc += dphase
 
-    return warped_spec
+def write_wav_blocks(filename, rate, blocks):
+    """
+    :param filename: the path to save the wav to
+    :param rate: the rate of the wav
+    :param blocks: the int16 blocks of samples of the wav, each written as it
+    comes
+    :return: the number of samples written
+    """
+    blocks = iter(blocks)
+    first = next(blocks, np.zeros(0, dtype=np.int16))
+    length = 0
+    with wave.open(filename, 'wb') as wav:
+        wav.setnchannels(1 if first.ndim == 1 else first.shape[1])
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        for block in chain([first], blocks):
+            wav.writeframes(np.ascontiguousarray(block, dtype='<i2').tobytes())
+            length += len(block)
+    return length
 
 
 REPRESENTATION_GRAY = 1  # the gray representation constant
@@ -148,40 +326,212 @@ def imdisplay(filename, representation):
         display_img_rgb(img)
 
 
+FFT_BASE_LENGTH = 32  # the power of 2 transforms start with DFTs of this length
+
+
+class FFTPlan:
+    """
+    the precomputed tables of the fast fourier transform of one length: a power
+    of 2 is transformed by radix-2 Cooley-Tukey, any other length by Bluestein's
+    algorithm, as a circular convolution of a power of 2 length
+    """
+
+    def __init__(self, length):
+        """
+        :param length: the length of the signals to transform
+        """
+        self.length = length
+        if length & (length - 1) == 0:
+            self.base = min(length, FFT_BASE_LENGTH)
+            u = np.arange(self.base)[:, np.newaxis]
+            self.base_matrix = np.exp(-2j * np.pi * np.dot(u, u.T) / self.base)
+            self.twiddles = np.exp(-2j * np.pi * np.arange(length // 2) / length)
+            self.chirp = None
+        else:
+            # k * k is taken mod 2 * length so the angles stay small
+            k = np.arange(length)
+            self.chirp = np.exp(-1j * np.pi * (k * k % (2 * length)) / length)
+            padded_length = 1 << (2 * length - 2).bit_length()
+            kernel = np.zeros(padded_length, dtype=np.complex128)
+            kernel[:length] = np.conj(self.chirp)
+            kernel[padded_length - length + 1:] = np.conj(self.chirp[1:])[::-1]
+            self.padded = get_fft_plan(padded_length)
+            self.kernel_fourier = self.padded.forward(kernel[:, np.newaxis])
+
+    def forward(self, x):
+        """
+        :param x: a complex array of shape (length, batch)
+        :return: the fourier transform of every column of x
+        """
+        if self.chirp is not None:
+            padded = np.zeros((self.padded.length, x.shape[1]), dtype=np.complex128)
+            padded[:self.length] = x * self.chirp[:, np.newaxis]
+            convolution = self.padded.inverse(self.padded.forward(padded) * self.kernel_fourier)
+            return convolution[:self.length] * self.chirp[:, np.newaxis]
+        length, batch = x.shape
+        # column m of x holds the transform of the samples m, m + columns, ...
+        columns = length // self.base
+        x = np.tensordot(self.base_matrix, x.reshape(self.base, columns, batch), axes=1)
+        while columns > 1:
+            # the samples of column m < columns / 2 are the even samples of m
+            # in the next step, and those of m + columns / 2 the odd ones
+            rows, columns = x.shape[0], columns // 2
+            twiddles = self.twiddles[::length // (2 * rows)][:, np.newaxis, np.newaxis]
+            odd = x[:, columns:] * twiddles
+            combined = np.empty((2 * rows, columns, batch), dtype=np.complex128)
+            np.add(x[:, :columns], odd, out=combined[:rows])
+            np.subtract(x[:, :columns], odd, out=combined[rows:])
+            x = combined
+        return x.reshape(length, batch)
+
+    def inverse(self, x):
+        """
+        :param x: a complex array of shape (length, batch)
+        :return: the inverse fourier transform of every column of x
+        """
+        return np.conj(self.forward(np.conj(x))) / self.length
+
+
+FFT_PLANS = {}  # length -> the FFTPlan of that length
+
+
+def get_fft_plan(length):
+    """
+    :param length: the length of the signals to transform
+    :return: the (cached) FFTPlan of the length
+    """
+    if length not in FFT_PLANS:
+        FFT_PLANS[length] = FFTPlan(length)
+    return FFT_PLANS[length]
+
+
+def native_fft(x, inverse=False):
+    """
+    :param x: an array
+    :param inverse: true for the inverse transform
+    :return: the fourier transform of x along its first axis, by FFTPlan
+    """
+    x = np.asarray(x, dtype=np.complex128)
+    if x.shape[0] == 0:
+        return x.copy()
+    plan = get_fft_plan(x.shape[0])
+    columns = x.reshape(x.shape[0], -1)
+    transformed = plan.inverse(columns) if inverse else plan.forward(columns)
+    return transformed.reshape(x.shape)
+
+
+def numpy_fft(x, inverse=False):
+    """
+    :param x: an array
+    :param inverse: true for the inverse transform
+    :return: the fourier transform of x along its first axis, by numpy.fft
+    """
+    return np.fft.ifft(x, axis=0) if inverse else np.fft.fft(x, axis=0)
+
+
+def scipy_fft(x, inverse=False):
+    """
+    :param x: an array
+    :param inverse: true for the inverse transform
+    :return: the fourier transform of x along its first axis, by scipy.fft
+    """
+    return scipy.fft.ifft(x, axis=0) if inverse else scipy.fft.fft(x, axis=0)
+
+
+FFT_BACKENDS = {'native': native_fft, 'numpy': numpy_fft, 'scipy': scipy_fft}
+fft_backend = 'native'  # the FFT_BACKENDS entry DFT and IDFT use
+
+
+def set_fft_backend(name):
+    """
+    :param name: the name of one of FFT_BACKENDS
+    makes DFT and IDFT (and everything built on them) use that backend
+    """
+    global fft_backend
+    if name not in FFT_BACKENDS:
+        raise ValueError("unknown fft backend " + repr(name))
+    fft_backend = name
+
+
 def DFT(signal):
     """
     :param signal: gets a signal
     :return: returns an array of the same size that the fourier transform was
-    used on
+    used on (along the first axis, so every column of a 2D array is a signal)
     """
-    length = signal.shape[0]
-    coefficient = -2 * np.pi * 1j / length
-    u = np.arange(length)[:, np.newaxis]  # u * u.T creates the table of powers
-    exp = np.exp(coefficient * np.dot(u, u.T))
-    return np.dot(exp, signal)
+    return np.asarray(FFT_BACKENDS[fft_backend](signal), dtype=np.complex128)
 
 
 def IDFT(fourier_signal):
     """
     :param fourier_signal: gets a fourier signal
     :return: returns an array of the same size that the inverse fourier
-    transform was used on
+    transform was used on (along the first axis)
     """
-    length = fourier_signal.shape[0]
-    coefficient = 2 * np.pi * 1j / length
-    u = np.arange(length)[:, np.newaxis]  # u * u.T creates the table of powers
-    exp = np.exp(coefficient * np.dot(u, u.T))
-    return np.dot(exp, fourier_signal) / length
+    return np.asarray(FFT_BACKENDS[fft_backend](fourier_signal, inverse=True),
+                      dtype=np.complex128)
+
+
+def real_DFT(signal):
+    """
+    :param signal: gets a real signal
+    :return: the first len(signal) // 2 + 1 coefficients of the fourier
+    transform of the signal, the others are their conjugates. An even length
+    signal is transformed as a complex signal of half the length.
+    """
+    signal = np.asarray(signal, dtype=np.float64)
+    length = signal.shape[0]
+    if length % 2:
+        return DFT(signal)[:length // 2 + 1]
+    half = length // 2
+    packed = DFT(signal[0::2] + 1j * signal[1::2])
+    packed = np.concatenate((packed, packed[:1]))  # index half is index 0
+    mirrored = np.conj(packed[::-1])
+    even = (packed + mirrored) / 2
+    odd = (packed - mirrored) / 2j
+    twiddles = np.exp(-2j * np.pi * np.arange(half + 1) / length)
+    return even + twiddles.reshape((half + 1,) + (1,) * (signal.ndim - 1)) * odd
+
+
+def real_IDFT(fourier_signal, length):
+    """
+    :param fourier_signal: the first length // 2 + 1 coefficients of the
+    fourier transform of a real signal (see real_DFT)
+    :param length: the length of the signal
+    :return: the real signal
+    """
+    fourier_signal = np.asarray(fourier_signal, dtype=np.complex128)
+    if length % 2:
+        rest = np.conj(fourier_signal[1:][::-1])
+        return IDFT(np.concatenate((fourier_signal, rest))).real
+    half = length // 2
+    mirrored = np.conj(fourier_signal[::-1])
+    twiddles = np.exp(-2j * np.pi * np.arange(half + 1) / length)
+    twiddles = twiddles.reshape((half + 1,) + (1,) * (fourier_signal.ndim - 1))
+    even = (fourier_signal + mirrored) / 2
+    odd = (fourier_signal - mirrored) / (2 * twiddles)
+    packed = IDFT((even + 1j * odd)[:half])
+    signal = np.empty((length,) + fourier_signal.shape[1:])
+    signal[0::2], signal[1::2] = packed.real, packed.imag
+    return signal
 
 
 def DFT2(image):
     """
     :param image: gets a 2D gray image
-    :return: the fourier transform of the image
+    :return: the fourier transform of the image. The columns of a real image
+    are transformed by real_DFT, and the missing rows are the conjugates of
+    the mirrored ones.
     """
-    fourier = DFT(image.T)
-    fourier = DFT(fourier.T)
-    return fourier
+    if not np.isrealobj(image):
+        fourier = DFT(image.T)
+        fourier = DFT(fourier.T)
+        return fourier
+    rows = image.shape[0]
+    fourier = DFT(real_DFT(image).T).T
+    # row rows - k is row k conjugated, with column l at -l
+    mirrored = np.conj(fourier[1:(rows + 1) // 2][::-1, ::-1])
+    return np.concatenate((fourier, np.roll(mirrored, 1, axis=1)), axis=0)
 
 
 def IDFT2(fourier_image):
@@ -223,45 +573,176 @@ def change_samples(filename, ratio):
 
 def resize(data, ratio):
     """
-    :param data: the data to resize
+    :param data: the data to resize (along the first axis, so every column of
+    a 2D array is resized)
     :param ratio: the ratio to resize with
     :return: the resized data array with with ratio
     """
+    return resize_to_length(data, int(len(data) / ratio))
+
+
+def resize_to_length(data, new_length):
+    """
+    :param data: the data to resize (along the first axis)
+    :param new_length: the length to resize to
+    :return: the data resized to new_length by cropping or padding its
+    frequencies around the 0 frequency
+    """
     fourier = DFT(data)
-    shifted = np.fft.fftshift(fourier)
-    new_length = int(len(data) / ratio)
-    if ratio > 1:
-        start = int(len(data) / (2 * ratio))
+    shifted = np.fft.fftshift(fourier, axes=0)
+    # the 0 frequency is at len // 2 of the shifted data
+    if new_length < len(data):
+        start = len(data) // 2 - new_length // 2
         shifted = shifted[start: start + new_length]
-    elif ratio < 1:
-        start = int((new_length - len(data)) / 2)
+    elif new_length > len(data):
+        start = new_length // 2 - len(data) // 2
         end = new_length - len(data) - start
-        shifted = np.pad(shifted, (start, end), 'constant')
-    if data.dtype == np.float64:
-        return IDFT(np.fft.ifftshift(shifted)).real.astype(data.dtype)
-    return IDFT(np.fft.ifftshift(shifted)).astype(data.dtype)
+        shifted = np.pad(shifted, [(start, end)] + [(0, 0)] * (data.ndim - 1),
+                         'constant')
+    if data.dtype.kind == 'f':
+        return IDFT(np.fft.ifftshift(shifted, axes=0)).real.astype(data.dtype)
+    return IDFT(np.fft.ifftshift(shifted, axes=0)).astype(data.dtype)
+
+
+def stream_resize(blocks, ratio, block_length=STREAM_BLOCK_LENGTH, margin=STREAM_MARGIN):
+    """
+    :param blocks: the blocks of the data to resize (along the first axis)
+    :param ratio: the ratio to resize with, taken as a fraction p / q
+    :param block_length: the length of the data resized at once, rounded to a
+    multiple of p
+    :param margin: the length of the data on each side of a block resized with
+    it (and then dropped), so the blocks join smoothly
+    :return: a generator of the blocks of the resized data
+    """
+    fraction = Fraction(ratio).limit_denominator(STREAM_MAX_DENOMINATOR)
+    p, q = fraction.numerator, fraction.denominator
+    core = max(1, block_length // p) * p
+    margin = -(-margin // p) * p
+    buffer = None  # the data from the margin before the next block on
+    before = 0  # the length of that margin
+    length = produced = 0
+    for block in chain(blocks, [None]):
+        if block is not None:
+            buffer = block if buffer is None else np.concatenate((buffer, block))
+            length += len(block)
+        if buffer is None:
+            return
+        while len(buffer) - before >= core + margin:
+            resized = resize_to_length(buffer[:before + core + margin],
+                                       (before + core + margin) * q // p)
+            yield resized[before * q // p: (before + core) * q // p]
+            produced += core * q // p
+            buffer = buffer[before + core - margin:]
+            before = margin
+    # the rest is resized to what is left of the length resize gives
+    new_length = max(0, int(length / ratio) - produced)
+    yield resize_to_length(buffer, before * q // p + new_length)[before * q // p:]
 
 
 def resize_spectrogram(data, ratio):
     """
-    :param data: the data to resize
+    :param data: the data to resize (along the last axis), float32 data is
+    resized in single precision
     :param ratio: the ratio to resize with
     :return: use the spec to resize the data for comparison
     """
     spec = stft(data)
-    new_data = np.array([resize(spec[i], ratio) for i in range(len(spec))])
-    return istft(new_data).real.astype(np.float64)
+    # every row of spec resized at once
+    new_data = np.moveaxis(resize(np.moveaxis(spec, -1, 0), ratio), 0, -1)
+    return istft(new_data).real.astype(float_dtype(spec))
 
 
 def resize_vocoder(data, ratio):
     """
-    :param data: the data to resize
+    :param data: the data to resize (along the last axis), float32 data is
+    resized in single precision
     :param ratio: the ratio to resize with
     :return: use the vocoder to resize the data for comparison
     """
     spec = stft(data)
     vocoder = phase_vocoder(spec, ratio)
-    return istft(vocoder).real.astype(np.float64)
+    return istft(vocoder).real.astype(float_dtype(spec))
+
+
+def stream_change_samples(filename, ratio, out_filename="change_samples.wav",
+                          block_length=STREAM_BLOCK_LENGTH, margin=STREAM_MARGIN):
+    """
+    change_samples block by block, the wav is never read whole
+    :param filename: the path to a wav
+    :param ratio: the ratio to scale the wav with
+    :param out_filename: the path to save the resized wav to
+    :return: the length of the resized wav
+    """
+    rate, blocks = read_wav_blocks(filename, block_length)
+    if ratio != 1:
+        blocks = stream_resize((block.astype(np.float64) for block in blocks),
+                               ratio, block_length, margin)
+    return write_wav_blocks(out_filename, rate,
+                            (block.astype(np.int16) for block in blocks))
+
+
+def stream_resize_spectrogram(filename, ratio, out_filename="resize_spectrogram.wav",
+                              block_length=STREAM_BLOCK_LENGTH, margin=STREAM_MARGIN):
+    """
+    resize_spectrogram of a wav block by block
+    :param filename: the path to a wav
+    :param ratio: the ratio to resize with
+    :param out_filename: the path to save the resized wav to
+    :return: the length of the resized wav
+    """
+    rate, blocks = read_wav_blocks(filename, block_length)
+    specs = (spec.T for spec in stream_stft(blocks))
+    # the spectrogram is resized in frames of 160 samples
+    resized = (spec.T for spec in stream_resize(specs, ratio, block_length // 160,
+                                                margin // 160))
+    return write_wav_blocks(out_filename, rate,
+                            (block.astype(np.int16) for block in stream_istft(resized)))
+
+
+def stream_resize_vocoder(filename, ratio, out_filename="resize_vocoder.wav",
+                          block_length=STREAM_BLOCK_LENGTH):
+    """
+    resize_vocoder of a wav block by block
+    :param filename: the path to a wav
+    :param ratio: the ratio to resize with
+    :param out_filename: the path to save the resized wav to
+    :return: the length of the resized wav
+    """
+    rate, blocks = read_wav_blocks(filename, block_length)
+    vocoder = stream_phase_vocoder(stream_stft(blocks), ratio)
+    return write_wav_blocks(out_filename, rate,
+                            (block.astype(np.int16) for block in stream_istft(vocoder)))
+
+
+def benchmark(filename="external/aria_4kHz.wav", ratio=2, repeat=5):
+    """
+    prints the seconds of audio every way of resizing processes per second
+    :param filename: the path to the wav to resize
+    :param ratio: the ratio to resize with
+    :param repeat: the number of times to resize, the fastest one counts
+    """
+    rate, data = read(filename)
+    seconds = len(data) / rate
+    resizes = [
+        ("resize_vocoder", lambda: resize_vocoder(data.astype(np.float64), ratio)),
+        ("resize_vocoder float32", lambda: resize_vocoder(data.astype(np.float32), ratio)),
+        ("resize_spectrogram", lambda: resize_spectrogram(data.astype(np.float64), ratio)),
+        ("resize_spectrogram float32",
+         lambda: resize_spectrogram(data.astype(np.float32), ratio)),
+        ("stream_resize_vocoder",
+         lambda: stream_resize_vocoder(filename, ratio, "benchmark.wav")),
+        ("stream_resize_spectrogram",
+         lambda: stream_resize_spectrogram(filename, ratio, "benchmark.wav")),
+    ]
+    for name, resize_audio in resizes:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            resize_audio()
+            best = min(best, time.perf_counter() - start)
+        print("%-28s %10.1f seconds of audio per second" % (name, seconds / best))
+    if os.path.exists("benchmark.wav"):
+        os.remove("benchmark.wav")
 
 
 def conv_der(im):
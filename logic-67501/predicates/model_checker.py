@@ -0,0 +1,266 @@
+# File name: predicates/model_checker.py
+
+"""A compiled, vectorized model checker for first-order formulae.
+
+The universe of a `~predicates.semantics.Model` is numbered ``0, ..., n-1``,
+relations become NumPy boolean tables and functions NumPy index tables, and a
+formula is compiled once into a tree of closures that evaluate it for many
+assignments at once: every bound variable is an axis of a broadcast array, so
+a quantifier is a single ``all``/``any`` reduction along its axis. Quantifiers
+nested too deeply for the tensors to fit in `MAX_TENSOR_CELLS` loop over the
+universe instead, and stop as soon as the result is decided.
+"""
+
+from typing import Callable, Dict, Iterable, List, Mapping
+
+import numpy as np
+
+from logic_utils import frozendict
+
+from predicates.syntax import *
+from predicates.semantics import Model, T
+
+#: The most cells a quantifier may reduce at once; above it the quantified
+#: variable is looped over instead, with early exit.
+MAX_TENSOR_CELLS = 1 << 24
+
+# Maps each variable in scope to a broadcastable array of universe indices.
+Bindings = Dict[str, np.ndarray]
+# A compiled term or formula, called with the bindings and the number of axes
+# of the current scope.
+Compiled = Callable[[Bindings, int], np.ndarray]
+
+NUMPY_OPERATOR_DICT = {'|': np.logical_or,
+                       '&': np.logical_and,
+                       '->': lambda x, y: np.logical_or(np.logical_not(x), y)}
+
+
+class ModelChecker:
+    """A model compiled for fast evaluation of many formulae.
+
+    Attributes:
+        model (`~predicates.semantics.Model`): the compiled model.
+        elements (`~typing.List`\\[`T`]): the universe, in index order.
+    """
+    model: Model
+    elements: List[T]
+
+    def __init__(self, model: Model[T]) -> None:
+        """Compiles the given model into index tables.
+
+        Parameters:
+            model: model to compile.
+        """
+        self.model = model
+        self.elements = list(model.universe)
+        self.indices = {element: i for i, element in enumerate(self.elements)}
+        n = len(self.elements)
+        self.constants = {constant: self.indices[value] for constant, value
+                          in model.constant_meanings.items()}
+        self.relations = {}
+        for relation, meaning in model.relation_meanings.items():
+            arity = model.relation_arities[relation]
+            if arity == -1:
+                self.relations[relation] = None  # false for any arguments
+                continue
+            table = np.zeros((n,) * arity, dtype=bool)
+            for arguments in meaning:
+                table[tuple(self.indices[a] for a in arguments)] = True
+            self.relations[relation] = table
+        self.functions = {}
+        for function, meaning in model.function_meanings.items():
+            table = np.zeros((n,) * model.function_arities[function],
+                             dtype=np.intp)
+            for arguments, value in meaning.items():
+                table[tuple(self.indices[a] for a in arguments)] = \
+                    self.indices[value]
+            self.functions[function] = table
+
+    def compile_term(self, term: Term) -> Compiled:
+        """Compiles the given term.
+
+        Parameters:
+            term: term to compile, for the constants and functions of which
+                the model has meanings.
+
+        Returns:
+            A function of the bindings that computes the universe indices of
+            the value of the term for every assignment in scope.
+        """
+        if is_constant(term.root):
+            index = np.intp(self.constants[term.root])
+            return lambda bindings, axes: index
+        if is_variable(term.root):
+            variable = term.root
+            return lambda bindings, axes: bindings[variable]
+        table = self.functions[term.root]
+        arguments = [self.compile_term(argument) for argument in term.arguments]
+        return lambda bindings, axes: table[
+            tuple(argument(bindings, axes) for argument in arguments)]
+
+    def compile_formula(self, formula: Formula) -> Compiled:
+        """Compiles the given formula.
+
+        Parameters:
+            formula: formula to compile, for the constants, functions, and
+                relations of which the model has meanings.
+
+        Returns:
+            A function of the bindings that computes the truth value of the
+            formula for every assignment in scope.
+        """
+        if is_equality(formula.root):
+            left, right = [self.compile_term(argument)
+                           for argument in formula.arguments]
+            return lambda bindings, axes: \
+                np.equal(left(bindings, axes), right(bindings, axes))
+        if is_relation(formula.root):
+            table = self.relations[formula.root]
+            if table is None:
+                return lambda bindings, axes: np.bool_(False)
+            arguments = [self.compile_term(argument)
+                         for argument in formula.arguments]
+            return lambda bindings, axes: table[
+                tuple(argument(bindings, axes) for argument in arguments)]
+        if is_unary(formula.root):
+            first = self.compile_formula(formula.first)
+            return lambda bindings, axes: \
+                np.logical_not(first(bindings, axes))
+        if is_binary(formula.root):
+            operator = NUMPY_OPERATOR_DICT[formula.root]
+            first = self.compile_formula(formula.first)
+            second = self.compile_formula(formula.second)
+            return lambda bindings, axes: \
+                operator(first(bindings, axes), second(bindings, axes))
+        return self.compile_quantifier(formula.root, formula.variable,
+                                       self.compile_formula(formula.predicate))
+
+    def compile_quantifier(self, quantifier: str, variable: str,
+                           predicate: Compiled) -> Compiled:
+        """Compiles a quantification of the given compiled predicate.
+
+        Parameters:
+            quantifier: ``'A'`` or ``'E'``.
+            variable: the quantified variable.
+            predicate: the compiled quantified predicate.
+
+        Returns:
+            A function of the bindings that computes the truth value of the
+            quantification for every assignment in scope.
+        """
+        n = len(self.elements)
+        universal = quantifier == 'A'
+
+        def vectorized(bindings: Bindings, axes: int) -> np.ndarray:
+            inner = dict(bindings)
+            # the newest variable takes the leading axis, so arrays built in
+            # outer scopes keep broadcasting along their own (trailing) axes
+            inner[variable] = np.arange(n).reshape((n,) + (1,) * axes)
+            values = np.asarray(predicate(inner, axes + 1))
+            values = values.reshape((1,) * (axes + 1 - values.ndim) +
+                                    values.shape)
+            return values.all(axis=0) if universal else values.any(axis=0)
+
+        def looped(bindings: Bindings, axes: int) -> np.ndarray:
+            inner = dict(bindings)
+            result = np.bool_(universal)
+            for i in range(n):
+                inner[variable] = np.intp(i)
+                values = predicate(inner, axes)
+                result = np.logical_and(result, values) if universal \
+                    else np.logical_or(result, values)
+                # stop as soon as every assignment in scope is decided
+                if universal and not np.any(result) or \
+                        not universal and np.all(result):
+                    break
+            return result
+
+        def quantified(bindings: Bindings, axes: int) -> np.ndarray:
+            if n ** (axes + 1) <= MAX_TENSOR_CELLS:
+                return vectorized(bindings, axes)
+            return looped(bindings, axes)
+
+        return quantified
+
+    def check_formula(self, formula: Formula) -> None:
+        """Asserts that the model has meanings for all the constants,
+        functions, and relations of the given formula, as
+        `~predicates.semantics.Model.evaluate_formula` does."""
+        assert formula.constants().issubset(self.constants.keys())
+        for function, arity in formula.functions():
+            assert function in self.functions and \
+                   self.model.function_arities[function] == arity
+        for relation, arity in formula.relations():
+            assert relation in self.relations and \
+                   self.model.relation_arities[relation] in {-1, arity}
+
+    def evaluate_formula(self, formula: Formula,
+                         assignment: Mapping[str, T] = frozendict()) -> bool:
+        """Calculates the truth value of the given formula in the model, like
+        `~predicates.semantics.Model.evaluate_formula`.
+
+        Parameters:
+            formula: formula to calculate the truth value of.
+            assignment: mapping from each variable name that has a free
+                occurrence in the given formula to a universe element to which
+                it is to be evaluated.
+
+        Returns:
+            The truth value of the given formula in the model, for the given
+            assignment of values to free occurrences of variable names.
+        """
+        self.check_formula(formula)
+        assert formula.free_variables().issubset(assignment.keys())
+        bindings = {variable: np.intp(self.indices[value])
+                    for variable, value in assignment.items()}
+        return bool(self.compile_formula(formula)(bindings, 0))
+
+    def is_model_of(self, formulas: Iterable[Formula]) -> bool:
+        """Checks if the model is a model of all the given formulas, like
+        `~predicates.semantics.Model.is_model_of`, in one pass: the formulas
+        with the same free variables are compiled into a single conjunction,
+        which is universally quantified over those variables, so every
+        assignment to them is enumerated once for all of these formulas.
+
+        Parameters:
+            formulas: formulas to check.
+
+        Returns:
+            ``True`` if each of the given formulas evaluates to true in the
+            model for any assignment of universe elements to its free
+            variables, ``False`` otherwise.
+        """
+        groups = {}
+        for formula in formulas:
+            self.check_formula(formula)
+            groups.setdefault(tuple(sorted(formula.free_variables())),
+                              []).append(self.compile_formula(formula))
+        for free_variables, compiled_formulas in groups.items():
+            compiled = self.compile_conjunction(compiled_formulas)
+            for variable in free_variables:
+                compiled = self.compile_quantifier('A', variable, compiled)
+            if not compiled({}, 0):
+                return False
+        return True
+
+    @staticmethod
+    def compile_conjunction(compiled_formulas: List[Compiled]) -> Compiled:
+        """Compiles the conjunction of the given compiled formulas.
+
+        Parameters:
+            compiled_formulas: the compiled formulas.
+
+        Returns:
+            A function of the bindings that computes the truth value of the
+            conjunction for every assignment in scope, skipping the formulas
+            after one that is false for all of them.
+        """
+        def conjunction(bindings: Bindings, axes: int) -> np.ndarray:
+            result = np.bool_(True)
+            for compiled in compiled_formulas:
+                result = np.logical_and(result, compiled(bindings, axes))
+                if not np.any(result):
+                    break
+            return result
+
+        return conjunction
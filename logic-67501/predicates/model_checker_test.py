@@ -0,0 +1,115 @@
+# File name: predicates/model_checker_test.py
+
+"""Tests for the predicates.model_checker module."""
+
+import itertools
+
+from logic_utils import frozendict
+
+from predicates.syntax import *
+from predicates.semantics import *
+import predicates.model_checker
+from predicates.model_checker import *
+
+def example_models():
+    """Returns the models the tests evaluate formulas in: the models of the
+    semantics tests of the course, and the integers modulo 3 and 5 with
+    addition and order."""
+    models = [
+        Model({'a', 'b'}, {'c': 'a'},
+              {'Pz': {('a',)}, 'Q': {('a', 'b'), ('b', 'b')}},
+              {'f': {('a',): 'b', ('b',): 'a'}}),
+        Model({'0', '1', '2'}, {'c': '0', 'd': '2'},
+              {'R': {('0', '1'), ('1', '2'), ('2', '0')}, 'Q': {('1',)},
+               'H': set()},
+              {'f': {('0',): '1', ('1',): '2', ('2',): '0'},
+               'g': {(x, y): x for x in '012' for y in '012'}})]
+    for n in (3, 5):
+        universe = set(range(n))
+        models.append(Model(universe, {'c': 0, 'd': 1},
+                            {'GT': {(x, y) for x in universe for y in universe
+                                    if x > y},
+                             'N': {(0,)}},
+                            {'plus': {(x, y): (x + y) % n for x in universe
+                                      for y in universe},
+                             's': {(x,): (x + 1) % n for x in universe}}))
+    return models
+
+EXAMPLE_FORMULAS = {
+    0: ['Pz(c)', 'Pz(f(c))', 'Q(c,f(c))', 'Ax[Q(x,f(c))]', 'Ex[~Pz(x)]',
+        'Ax[(Pz(x)->Q(x,f(x)))]', 'Ex[Ay[Q(y,x)]]', 'Ay[Ex[Q(y,x)]]',
+        'Ax[Ay[(Q(x,y)|Q(y,x))]]', 'f(f(x))=x', 'Q(x,y)', '(Pz(x)|Q(x,x))',
+        'Ax[Ey[(x=f(y)&~Pz(y))]]'],
+    1: ['R(c,f(c))', 'Ax[R(x,f(x))]', 'Ex[Q(x)]', 'Ax[Ey[R(x,y)]]',
+        'Ex[Ay[R(x,y)]]', 'Ax[~H(x,x)]', 'H(c,d)', 'g(x,y)=x', 'g(y,x)=x',
+        'Ax[Ay[Az[((R(x,y)&R(y,z))->R(z,x))]]]', '(R(x,y)->~R(y,x))',
+        'Ex[Ey[Ez[(g(x,y)=z&~x=z)]]]'],
+    2: ['Ax[Ay[plus(x,y)=plus(y,x)]]', 'Ax[plus(x,c)=x]',
+        'Ax[Ey[plus(x,y)=c]]', 'Ex[Ay[(GT(x,y)|x=y)]]',
+        'Ax[Ay[Az[plus(plus(x,y),z)=plus(x,plus(y,z))]]]',
+        'Ax[(N(x)->x=c)]', 'Ex[s(x)=c]', 'GT(s(x),x)', 'plus(x,s(c))=s(x)',
+        'Ax[Ay[(GT(x,y)->Ez[plus(y,z)=x])]]', 'Ax[Ay[Ez[GT(z,plus(x,y))]]]',
+        '(GT(x,y)|(x=y|GT(y,x)))', '~Ax[Ey[GT(y,x)]]']}
+
+def example_pairs():
+    """Returns the pairs of a model and its formulas, parsed."""
+    models = example_models()
+    pairs = [(models[0], EXAMPLE_FORMULAS[0]), (models[1], EXAMPLE_FORMULAS[1])]
+    pairs.extend((model, EXAMPLE_FORMULAS[2]) for model in models[2:])
+    return [(model, [Formula.parse(formula) for formula in formulas])
+            for model, formulas in pairs]
+
+def all_assignments(model, variables):
+    """Yields every assignment of universe elements of the given model to the
+    given variables."""
+    variables = sorted(variables)
+    for values in itertools.product(sorted(model.universe, key=str),
+                                    repeat=len(variables)):
+        yield frozendict(zip(variables, values))
+
+def test_evaluate_formula(debug=False):
+    for model, formulas in example_pairs():
+        checker = ModelChecker(model)
+        for formula in formulas:
+            for assignment in all_assignments(model,
+                                              formula.free_variables()):
+                if debug:
+                    print('Testing evaluation of formula', formula,
+                          'in model', model, 'with assignment', assignment)
+                assert checker.evaluate_formula(formula, assignment) == \
+                       model.evaluate_formula(formula, assignment)
+
+def test_is_model_of(debug=False):
+    for model, formulas in example_pairs():
+        checker = ModelChecker(model)
+        # every single formula, every pair, and all of them at once
+        cases = [[formula] for formula in formulas] + \
+                [list(pair) for pair in itertools.combinations(formulas, 2)] + \
+                [formulas, []]
+        for case in cases:
+            if debug:
+                print('Testing whether model', model, 'is a model of', case)
+            assert checker.is_model_of(case) == \
+                   model.is_model_of(frozenset(case))
+        true_formulas = [formula for formula in formulas
+                         if model.is_model_of({formula})]
+        assert checker.is_model_of(true_formulas)
+
+def test_looped(debug=False):
+    # quantifiers too deep for MAX_TENSOR_CELLS loop over the universe and
+    # exit early, with the same results
+    saved = predicates.model_checker.MAX_TENSOR_CELLS
+    try:
+        for cells in (1, 4, 30):
+            predicates.model_checker.MAX_TENSOR_CELLS = cells
+            if debug:
+                print('Testing with MAX_TENSOR_CELLS =', cells)
+            test_evaluate_formula(debug)
+            test_is_model_of(debug)
+    finally:
+        predicates.model_checker.MAX_TENSOR_CELLS = saved
+
+def test_all(debug=False):
+    test_evaluate_formula(debug)
+    test_is_model_of(debug)
+    test_looped(debug)
@@ -6,8 +6,11 @@
 """Proofs by deduction in propositional logic."""
 
 from __future__ import annotations
-from typing import AbstractSet, Iterable, FrozenSet, List, Mapping, Optional, \
-    Set, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import AbstractSet, Dict, Iterable, FrozenSet, List, Mapping, \
+    MutableMapping, Optional, Sequence, Set, Tuple, Union
+from weakref import WeakValueDictionary
 
 from logic_utils import frozen
 
@@ -41,6 +44,16 @@ class InferenceRule:
         """
         self.assumptions = tuple(assumptions)
         self.conclusion = conclusion
+        self._hash = hash((self.assumptions, self.conclusion))
+
+    def __reduce__(self) -> Tuple[type, Tuple[Tuple[Formula, ...], Formula]]:
+        """Pickles the current inference rule by its assumptions and
+        conclusion, so that its hash is recomputed in the receiving process.
+
+        Returns:
+            The constructor and its arguments.
+        """
+        return InferenceRule, (self.assumptions, self.conclusion)
 
     def __eq__(self, other: object) -> bool:
         """Compares the current inference rule with the given one.
@@ -52,9 +65,10 @@ class InferenceRule:
             ``True`` if the given object is an `InferenceRule` object that
             equals the current inference rule, ``False`` otherwise.
         """
-        return (isinstance(other, InferenceRule) and
-                self.assumptions == other.assumptions and
-                self.conclusion == other.conclusion)
+        return self is other or (isinstance(other, InferenceRule) and
+                                 self._hash == other._hash and
+                                 self.assumptions == other.assumptions and
+                                 self.conclusion == other.conclusion)
 
     def __ne__(self, other: object) -> bool:
         """Compares the current inference rule with the given one.
@@ -70,7 +84,7 @@ class InferenceRule:
         return not self == other
 
     def __hash__(self) -> int:
-        return hash(str(self))
+        return self._hash
 
     def __repr__(self) -> str:
         """Computes a string representation of the current inference rule.
@@ -399,10 +413,7 @@ class Proof:
         assert line_number < len(self.lines)
         line = self.lines[line_number]
         if line.is_assumption():
-            for assumption in self.statement.assumptions:
-                if str(assumption) == str(line):
-                    return True
-            return False
+            return line.formula in self.statement.assumptions
         # this is not an assumption
         if line.rule not in self.rules:
             return False
@@ -420,10 +431,313 @@ class Proof:
             ``True`` if the current proof is a valid proof of its claimed
             statement via its inference rules, ``False`` otherwise.
         """
-        for i in range(len(self.lines)):
-            if self.is_line_valid(i) is False:
+        checker = ProofChecker(self.statement, self.rules)
+        for line in self.lines:
+            if not checker.append(line):
                 return False
-        return str(self.lines[-1].formula) == str(self.statement.conclusion)
+        return checker.proves_statement()
+
+
+class ProofChecker:
+    """An incremental checker of a proof, which validates every line as it is
+    appended.
+
+    Assumptions and rules are looked up in hash sets, and the specialization
+    map of every (rule, specialization) pair is computed only once, which
+    pays off for machine-generated proofs that repeat the same instances of
+    the same axioms many times.
+
+    Attributes:
+        statement (`InferenceRule`): the statement of the checked proof.
+        rules (`~typing.FrozenSet`\\[`InferenceRule`]): the allowed rules of
+            the checked proof.
+        lines (`~typing.List`\\[`Proof.Line`]): the lines appended so far,
+            all of which are valid.
+        rule_times (`~typing.Dict`\\[`~typing.Optional`\\[`InferenceRule`],
+            `float`]): the total seconds spent validating the lines of each
+            rule, where ``None`` stands for assumption lines.
+        rule_counts (`~typing.Dict`\\[`~typing.Optional`\\[`InferenceRule`],
+            `int`]): the number of lines validated for each rule.
+    """
+    statement: InferenceRule
+    rules: FrozenSet[InferenceRule]
+    lines: List[Proof.Line]
+    rule_times: Dict[Optional[InferenceRule], float]
+    rule_counts: Dict[Optional[InferenceRule], int]
+
+    def __init__(self, statement: InferenceRule,
+                 rules: AbstractSet[InferenceRule]) -> None:
+        """Initializes a checker of an empty proof.
+
+        Parameters:
+            statement: the statement of the proof to check.
+            rules: the allowed rules of the proof to check.
+        """
+        self.statement = statement
+        self.rules = frozenset(rules)
+        self.assumptions = frozenset(statement.assumptions)
+        self.lines = []
+        self.specialization_maps = {}
+        self.rule_times = {}
+        self.rule_counts = {}
+
+    def is_line_valid(self, lines: Sequence[Proof.Line],
+                      line_number: int) -> bool:
+        """Checks if the specified line validly follows from its
+        justifications, as `Proof.is_line_valid` does.
+
+        Parameters:
+            lines: lines of a proof of the checked statement.
+            line_number: index of the line to check.
+
+        Returns:
+            ``True`` if the specified line is valid, ``False`` otherwise.
+        """
+        line = lines[line_number]
+        if line.is_assumption():
+            return line.formula in self.assumptions
+        if line.rule not in self.rules:
+            return False
+        for assumption in line.assumptions:
+            if not 0 <= assumption < line_number:
+                return False
+        instance = InferenceRule([lines[i].formula for i in line.assumptions],
+                                 line.formula)
+        key = (line.rule, instance)
+        if key not in self.specialization_maps:
+            self.specialization_maps[key] = \
+                line.rule.specialization_map(instance)
+        return self.specialization_maps[key] is not None
+
+    def append(self, line: Proof.Line) -> bool:
+        """Validates the given line as the next line of the proof and, if it
+        is valid, appends it.
+
+        Parameters:
+            line: the line to append.
+
+        Returns:
+            ``True`` if the line is valid and was appended, ``False``
+            otherwise.
+        """
+        start = perf_counter()
+        self.lines.append(line)
+        valid = self.is_line_valid(self.lines, len(self.lines) - 1)
+        if not valid:
+            self.lines.pop()
+        self.rule_times[line.rule] = \
+            self.rule_times.get(line.rule, 0.0) + perf_counter() - start
+        self.rule_counts[line.rule] = self.rule_counts.get(line.rule, 0) + 1
+        return valid
+
+    def proves_statement(self) -> bool:
+        """Checks if the lines appended so far prove the statement.
+
+        Returns:
+            ``True`` if the last appended line justifies the conclusion of
+            the statement, ``False`` otherwise.
+        """
+        return len(self.lines) > 0 and \
+            self.lines[-1].formula == self.statement.conclusion
+
+    def to_proof(self) -> Proof:
+        """Returns the proof made of the lines appended so far."""
+        return Proof(self.statement, self.rules, self.lines)
+
+    def timing_report(self) -> str:
+        """Computes a human-readable report of the time spent per rule.
+
+        Returns:
+            One line per rule, slowest first, with the number of lines of the
+            rule and the total time spent validating them.
+        """
+        report = ''
+        for rule in sorted(self.rule_times, key=self.rule_times.get,
+                           reverse=True):
+            report += '%8d lines %10.6fs  %s\n' % (
+                self.rule_counts[rule], self.rule_times[rule],
+                'Assumption' if rule is None else str(rule))
+        return report
+
+
+# the proof checked by the worker processes of is_valid_parallel
+_worker_proof: Optional[Proof] = None
+
+
+def _initialize_worker(proof: Proof) -> None:
+    """Stores the proof to be checked by the current worker process."""
+    global _worker_proof
+    _worker_proof = proof
+
+
+def _check_line_range(start: int, end: int) -> bool:
+    """Checks the lines of the worker's proof in the given range.
+
+    Parameters:
+        start: index of the first line to check.
+        end: index after the last line to check.
+
+    Returns:
+        ``True`` if all the lines in the range are valid, ``False``
+        otherwise.
+    """
+    checker = ProofChecker(_worker_proof.statement, _worker_proof.rules)
+    return all(checker.is_line_valid(_worker_proof.lines, i)
+               for i in range(start, end))
+
+
+def is_valid_parallel(proof: Proof, processes: Optional[int] = None,
+                      chunk_size: int = 1000) -> bool:
+    """Checks if the given proof is valid, like `Proof.is_valid`, splitting
+    the validation of its lines across a pool of processes. Each line only
+    depends on the formulae of earlier lines, so the chunks are independent.
+
+    Parameters:
+        proof: the proof to check.
+        processes: the number of worker processes, or ``None`` for the number
+            of CPUs.
+        chunk_size: the number of lines checked by a single task.
+
+    Returns:
+        ``True`` if the given proof is a valid proof of its statement via its
+        rules, ``False`` otherwise.
+    """
+    if len(proof.lines) == 0 or \
+            proof.lines[-1].formula != proof.statement.conclusion:
+        return False
+    if len(proof.lines) <= chunk_size:
+        return proof.is_valid()
+    starts = range(0, len(proof.lines), chunk_size)
+    ends = [min(start + chunk_size, len(proof.lines)) for start in starts]
+    with ProcessPoolExecutor(processes, initializer=_initialize_worker,
+                             initargs=(proof,)) as pool:
+        return all(pool.map(_check_line_range, starts, ends))
+
+
+@frozen
+class ProofNode:
+    """An immutable node of a proof in DAG form: a formula together with its
+    justification, which refers to the nodes justifying its assumptions
+    directly rather than by line numbers, so that sub-proofs can be shared.
+
+    Nodes are hash-consed like `~propositions.syntax.Formula`, so equal
+    justifications of equal formulae are the same object and are emitted only
+    once by `to_proof`.
+
+    Attributes:
+        formula (`~propositions.syntax.Formula`): the formula justified by the
+            node.
+        rule (`~typing.Optional`\\[`InferenceRule`]): the inference rule a
+            specialization of which concludes the formula, or ``None`` if the
+            formula is justified as an assumption.
+        premises (`~typing.Tuple`\\[`ProofNode`, ...]): the nodes whose
+            formulae are the respective assumptions of that specialization.
+    """
+    formula: Formula
+    rule: Optional[InferenceRule]
+    premises: Tuple[ProofNode, ...]
+
+    __slots__ = ('formula', 'rule', 'premises', '_hash', '__weakref__')
+
+    _interned: MutableMapping[Tuple[Formula, Optional[InferenceRule],
+                                    Tuple[ProofNode, ...]], ProofNode] = \
+        WeakValueDictionary()
+
+    def __new__(cls, formula: Formula, rule: Optional[InferenceRule] = None,
+                premises: Iterable[ProofNode] = ()) -> ProofNode:
+        """Returns the interned node with the given formula and
+        justification, creating it if no such node exists yet.
+
+        Parameters:
+            formula: the formula to be justified by the node.
+            rule: the inference rule a specialization of which concludes the
+                formula, or ``None`` if the formula is to be justified as an
+                assumption.
+            premises: the nodes whose formulae are the respective assumptions
+                of that specialization.
+
+        Returns:
+            The unique node with the given formula and justification.
+        """
+        premises = tuple(premises)
+        assert rule is not None or len(premises) == 0
+        key = (formula, rule, premises)
+        node = cls._interned.get(key)
+        if node is not None:
+            return node
+        node = object.__new__(cls)
+        object.__setattr__(node, 'formula', formula)
+        object.__setattr__(node, 'rule', rule)
+        object.__setattr__(node, 'premises', premises)
+        object.__setattr__(node, '_hash', hash(key))
+        cls._interned[key] = node
+        return node
+
+    def __init__(self, formula: Formula, rule: Optional[InferenceRule] = None,
+                 premises: Iterable[ProofNode] = ()) -> None:
+        """Initializes a `ProofNode`; all the work is done by `__new__`."""
+
+    def __eq__(self, other: object) -> bool:
+        return self is other
+
+    def __ne__(self, other: object) -> bool:
+        return self is not other
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __repr__(self) -> str:
+        """Computes a string representation of the current node.
+
+        Returns:
+            The string representation of the line of the node.
+        """
+        return str(self.formula) if self.rule is None else \
+            str(self.formula) + ' Inference Rule ' + str(self.rule)
+
+    def is_assumption(self) -> bool:
+        """Checks if the current node is justified as an assumption.
+
+        Returns:
+            ``True`` if the current node is justified as an assumption,
+            ``False`` otherwise.
+        """
+        return self.rule is None
+
+    def to_proof(self, assumptions: Iterable[Formula],
+                 rules: AbstractSet[InferenceRule]) -> Proof:
+        """Expands the DAG rooted at the current node into a linear proof, in
+        which every distinct node becomes a single line.
+
+        Parameters:
+            assumptions: the assumptions of the statement of the proof.
+            rules: the allowed rules of the proof.
+
+        Returns:
+            A proof of the formula of the current node from the given
+            assumptions via the given rules.
+        """
+        lines = []
+        line_numbers = {}
+        stack = [(self, False)]
+        while len(stack) > 0:
+            node, expanded = stack.pop()
+            if node in line_numbers:
+                continue
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((premise, False)
+                             for premise in reversed(node.premises)
+                             if premise not in line_numbers)
+                continue
+            if node.is_assumption():
+                lines.append(Proof.Line(node.formula))
+            else:
+                lines.append(Proof.Line(node.formula, node.rule,
+                                        [line_numbers[premise]
+                                         for premise in node.premises]))
+            line_numbers[node] = len(lines) - 1
+        return Proof(InferenceRule(assumptions, self.formula), rules, lines)
 
 
 # Chapter 5 tasks
@@ -519,6 +833,79 @@ def convert_lines(main_proof: Proof, lemma_proof: Proof,
     return new_lines
 
 
+def specialize_lemma(lemma_proof: Proof, instance: InferenceRule,
+                     cache: Dict[InferenceRule, List[Formula]]) \
+        -> List[Formula]:
+    """Computes the formulae of the lines of the given lemma proof, specialized
+    to the given instance of its statement.
+
+    Parameters:
+        lemma_proof: valid proof of a lemma.
+        instance: specialization of the statement of the lemma.
+        cache: the specialized formulae already computed for each instance.
+
+    Returns:
+        The specialized formula of every line of the lemma proof, in order.
+    """
+    if instance not in cache:
+        mapping = lemma_proof.statement.specialization_map(instance)
+        assert mapping is not None
+        cache[instance] = [line.formula.substitute_variables(mapping)
+                           for line in lemma_proof.lines]
+    return cache[instance]
+
+
+def inline_lines(main_proof: Proof, lemma_proof: Proof,
+                 line_numbers: AbstractSet[int]) -> List[Proof.Line]:
+    """Inlines the given lemma proof in lieu of each of the specified lines in
+    a single pass over the main proof, keeping a table of where every original
+    line ended up instead of renumbering the proof after each inlining.
+
+    Unlike `inline_proof_once`, assumption lines of the lemma are not copied:
+    their uses refer directly to the lines that justify them in the main
+    proof. The specialized lemma body is computed once per distinct instance
+    of the lemma.
+
+    Parameters:
+        main_proof: valid proof to inline into.
+        lemma_proof: valid proof of the rule of each of the specified lines.
+        line_numbers: indices of the lines of `main_proof` to replace.
+
+    Returns:
+        The lines of the resulting proof.
+    """
+    new_lines = []
+    new_numbers = []
+    cache = {}
+    for i, line in enumerate(main_proof.lines):
+        if i not in line_numbers:
+            if line.is_assumption():
+                new_lines.append(line)
+            else:
+                new_lines.append(Proof.Line(
+                    line.formula, line.rule,
+                    [new_numbers[assumption]
+                     for assumption in line.assumptions]))
+            new_numbers.append(len(new_lines) - 1)
+            continue
+        instance = main_proof.rule_for_line(i)
+        formulae = specialize_lemma(lemma_proof, instance, cache)
+        justified = {formula: new_numbers[assumption] for formula, assumption
+                     in zip(instance.assumptions, line.assumptions)}
+        lemma_numbers = []
+        for lemma_line, formula in zip(lemma_proof.lines, formulae):
+            if lemma_line.is_assumption():
+                lemma_numbers.append(justified[formula])
+                continue
+            new_lines.append(Proof.Line(
+                formula, lemma_line.rule,
+                [lemma_numbers[assumption]
+                 for assumption in lemma_line.assumptions]))
+            lemma_numbers.append(len(new_lines) - 1)
+        new_numbers.append(lemma_numbers[-1])
+    return new_lines
+
+
 def inline_proof_once(main_proof: Proof, line_number: int,
                       lemma_proof: Proof) -> Proof:
     """Inlines the given proof of a "lemma" inference rule into the given proof
@@ -572,17 +959,13 @@ def inline_proof(main_proof: Proof, lemma_proof: Proof) -> Proof:
          is the union of th e rules allowed in the two given proofs but without
           the "lemma" rule proved by lemma_proof`.
     """
-    new_proof = main_proof
-    i = 0
-    while i < len(new_proof.lines):
-        if not new_proof.lines[i].is_assumption() and \
-                lemma_proof.statement.is_specialization_of(
-                    new_proof.lines[i].rule):
-            new_proof = inline_proof_once(new_proof, i, lemma_proof)
-        i += 1
-    return Proof(new_proof.statement,
-                 delete_rule(new_proof, lemma_proof.statement),
-                 new_proof.lines)
+    assert lemma_proof.is_valid()
+    line_numbers = {i for i, line in enumerate(main_proof.lines)
+                    if line.rule == lemma_proof.statement}
+    new_rules = add_rules(main_proof, lemma_proof.rules) - \
+        {lemma_proof.statement}
+    return Proof(main_proof.statement, new_rules,
+                 inline_lines(main_proof, lemma_proof, line_numbers))
 
 
 def add_rule(proof: Proof, rule: InferenceRule) -> AbstractSet[InferenceRule]:
@@ -604,17 +987,6 @@ def add_rules(proof: Proof, rules: AbstractSet[InferenceRule]) \
     return proof.rules | rules
 
 
-def delete_rule(proof: Proof, rule: InferenceRule) \
-        -> AbstractSet[InferenceRule]:
-    """
-    :param proof: a proof
-    :param rule: a rule
-    :return: return the rules of proof without the given rule
-    """
-    return {new_rules for new_rules in proof.rules
-            if not rule.is_specialization_of(new_rules)}
-
-
 def update_line_assumptions(line: Proof.Line, f) -> Proof.Line:
     """
     :param line: a line
@@ -0,0 +1,117 @@
+# File name: propositions/proofs_benchmark.py
+
+"""Benchmarks `~propositions.proofs.inline_proof` on main proofs that use the
+lemmas of `propositions.some_proofs` many times, against inlining the uses
+one at a time with `~propositions.proofs.inline_proof_once`, which copies and
+renumbers the whole proof for every use.
+
+Run from the course root with ``python -m propositions.proofs_benchmark``.
+"""
+
+import sys
+import time
+from typing import Callable, List, Optional, Tuple
+
+from propositions.syntax import *
+from propositions.proofs import *
+from propositions.some_proofs import *
+from propositions.tautology import prove_sound_inference
+
+# the lemmas of propositions.some_proofs and their provers
+LEMMAS: List[Tuple[InferenceRule, Callable[[], Optional[Proof]]]] = [
+    (HS, prove_hypothetical_syllogism), (NNE, prove_NNE), (CP, prove_CP),
+    (CM, prove_CM)]
+
+
+def lemma_proof(rule: InferenceRule,
+                prover: Callable[[], Optional[Proof]]) -> Proof:
+    """Returns the proof of the given lemma from `propositions.some_proofs`,
+    or one by the tautology theorem if that task is not implemented.
+
+    Parameters:
+        rule: the lemma.
+        prover: the function of `propositions.some_proofs` proving it.
+
+    Returns:
+        A valid proof of the lemma.
+    """
+    proof = prover()
+    if proof is None:
+        proof = prove_sound_inference(rule)
+    return proof
+
+
+def main_proof_using(rule: InferenceRule, uses: int) -> Proof:
+    """Builds a proof that uses the given lemma the given number of times, on
+    ``uses // 2`` distinct instances of it.
+
+    Parameters:
+        rule: the lemma to use.
+        uses: the number of lines justified by the lemma.
+
+    Returns:
+        A valid proof via the given lemma alone.
+    """
+    assumptions = []
+    lines = []
+    for use in range(uses):
+        mapping = {variable: Formula(variable + str(use % max(uses // 2, 1)))
+                   for variable in rule.variables()}
+        instance = rule.specialize(mapping)
+        numbers = []
+        for assumption in instance.assumptions:
+            if assumption not in assumptions:
+                assumptions.append(assumption)
+            lines.append(Proof.Line(assumption))
+            numbers.append(len(lines) - 1)
+        lines.append(Proof.Line(instance.conclusion, rule, numbers))
+    return Proof(InferenceRule(assumptions, lines[-1].formula), {rule},
+                 lines)
+
+
+def inline_one_at_a_time(main_proof: Proof, lemma: Proof) -> Proof:
+    """Inlines all uses of the given lemma by repeated
+    `~propositions.proofs.inline_proof_once`, the copy-per-use path
+    `~propositions.proofs.inline_proof` took before it inlined in one pass.
+
+    Parameters:
+        main_proof: the proof to inline into.
+        lemma: the proof of the lemma.
+
+    Returns:
+        The inlined proof.
+    """
+    i = 0
+    while i < len(main_proof.lines):
+        if main_proof.lines[i].rule == lemma.statement:
+            main_proof = inline_proof_once(main_proof, i, lemma)
+        i += 1
+    return main_proof
+
+
+def benchmark(sizes: List[int]) -> None:
+    """Prints the time to inline every lemma into main proofs of the given
+    numbers of uses.
+
+    Parameters:
+        sizes: the numbers of uses of the lemma in the main proofs.
+    """
+    print('| lemma | uses | lines | inline_proof | inline_proof_once |')
+    print('|-------|------|-------|--------------|-------------------|')
+    for rule, prover in LEMMAS:
+        lemma = lemma_proof(rule, prover)
+        for uses in sizes:
+            main_proof = main_proof_using(rule, uses)
+            start = time.perf_counter()
+            inlined = inline_proof(main_proof, lemma)
+            single_pass = time.perf_counter() - start
+            start = time.perf_counter()
+            inline_one_at_a_time(main_proof, lemma)
+            one_at_a_time = time.perf_counter() - start
+            print('| %s | %4d | %5d | %11.4fs | %16.4fs |' %
+                  (prover.__name__, uses, len(inlined.lines), single_pass,
+                   one_at_a_time))
+
+
+if __name__ == '__main__':
+    benchmark([int(n) for n in sys.argv[1:]] or [10, 100, 200])
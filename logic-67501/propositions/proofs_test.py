@@ -523,6 +523,36 @@ def test_is_valid(debug=False):
 
 # Tests for Chapter 5 tasks
 
+def test_proof_checker(debug=False):
+    proof = DISJUNCTION_COMMUTATIVITY_PROOF
+    if debug:
+        print('\nTesting incremental checking of the following deductive '
+              'proof:\n' + str(proof))
+    checker = ProofChecker(proof.statement, proof.rules)
+    assert not checker.proves_statement()
+    assert not checker.append(Proof.Line(Formula.parse('(y|x)'), R1, [0, 1]))
+    assert not checker.append(Proof.Line(Formula.parse('y')))
+    for line in proof.lines:
+        assert checker.append(line)
+    assert checker.proves_statement()
+    assert checker.to_proof().lines == proof.lines
+    assert checker.rule_counts == {None: 2, R1: 2, R2: 1}
+    assert set(checker.rule_times.keys()) == {None, R1, R2}
+    assert 'Assumption' in checker.timing_report()
+
+def test_is_valid_parallel(debug=False):
+    proof = DISJUNCTION_COMMUTATIVITY_PROOF
+    # repeat the lines so that several chunks are checked
+    lines = list(proof.lines[:2]) * 10 + [proof.lines[2]]
+    long_proof = Proof(proof.statement, proof.rules, lines)
+    if debug:
+        print('Testing parallel validity checking of a proof with',
+              len(lines), 'lines')
+    assert is_valid_parallel(long_proof, 2, 4)
+    lines[5] = Proof.Line(Formula.parse('(~y|x)'), R2, [])
+    assert not is_valid_parallel(Proof(proof.statement, proof.rules, lines),
+                                 2, 4)
+
 def offending_line(proof):
     """Finds the first invalid line in the given proof.
 
@@ -853,6 +883,8 @@ def test_ex4(debug=False):
     test_rule_for_line(debug)
     test_is_line_valid(debug)
     test_is_valid(debug)
+    test_proof_checker(debug)
+    test_is_valid_parallel(debug)
 
 def test_ex5(debug=False):
     test_prove_specialization(debug)
@@ -0,0 +1,447 @@
+# File name: propositions/sat.py
+
+"""A conflict-driven clause-learning (CDCL) SAT solver for propositional
+formulae."""
+
+from heapq import heappop, heappush
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from propositions.syntax import *
+
+# the same as propositions.semantics.Model, which itself uses this module
+Model = Mapping[str, bool]
+
+# A literal is a non-zero integer: ``v`` for the solver variable ``v`` and
+# ``-v`` for its negation. A clause is a list of literals.
+Clause = List[int]
+
+# conflicts before the first restart; later restarts follow the Luby sequence
+RESTART_BASE = 100
+ACTIVITY_DECAY = 1.05
+ACTIVITY_LIMIT = 1e100
+
+
+def luby(i: int) -> int:
+    """Computes the `i`-th element (starting from 1) of the Luby sequence
+    1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ...
+
+    Parameters:
+        i: index of the element.
+
+    Returns:
+        The element of the sequence.
+    """
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while i != (1 << k) - 1:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+
+def to_cnf(formulae: Iterable[Formula]) \
+        -> Tuple[List[Clause], Dict[str, int]]:
+    """Converts the conjunction of the given formulae into an equisatisfiable
+    CNF by the Tseitin transformation, introducing one solver variable per
+    distinct binary sub-formula.
+
+    Parameters:
+        formulae: formulae whose conjunction to convert.
+
+    Returns:
+        A pair of the clauses and of the map from every variable of the given
+        formulae to its solver variable. Every satisfying assignment of the
+        clauses, restricted to the mapped solver variables, is a model of all
+        the given formulae, and vice versa.
+    """
+    clauses = []
+    variables = {}
+    literals = {}
+    counter = [0]
+
+    def new_variable() -> int:
+        counter[0] += 1
+        return counter[0]
+
+    def literal_of(formula: Formula) -> int:
+        stack = [(formula, False)]
+        while len(stack) > 0:
+            current, expanded = stack.pop()
+            if current in literals:
+                continue
+            if is_variable(current.root):
+                literal = variables.get(current.root)
+                if literal is None:
+                    literal = new_variable()
+                    variables[current.root] = literal
+                literals[current] = literal
+            elif is_constant(current.root):
+                literal = new_variable()
+                literals[current] = literal
+                clauses.append([literal if current.root == 'T' else -literal])
+            elif not expanded:
+                stack.append((current, True))
+                if is_binary(current.root):
+                    stack.append((current.second, False))
+                stack.append((current.first, False))
+            elif is_unary(current.root):
+                literals[current] = -literals[current.first]
+            else:
+                literal = new_variable()
+                literals[current] = literal
+                clauses.extend(tseitin_clauses(
+                    current.root, literal, literals[current.first],
+                    literals[current.second]))
+        return literals[formula]
+
+    for formula in formulae:
+        clauses.append([literal_of(formula)])
+    return clauses, variables
+
+
+def tseitin_clauses(op: str, c: int, a: int, b: int) -> List[Clause]:
+    """Computes the clauses defining ``c <-> (a op b)``.
+
+    Parameters:
+        op: binary operator.
+        c: the literal defined.
+        a: the literal of the first operand.
+        b: the literal of the second operand.
+
+    Returns:
+        The defining clauses.
+    """
+    if op == '-&':
+        op, c = '&', -c
+    elif op == '-|':
+        op, c = '|', -c
+    elif op == '<->':
+        op, c = '+', -c
+    if op == '&':
+        return [[-c, a], [-c, b], [c, -a, -b]]
+    if op == '|':
+        return [[c, -a], [c, -b], [-c, a, b]]
+    if op == '->':
+        return [[c, a], [c, -b], [-c, -a, b]]
+    assert op == '+'
+    return [[-c, a, b], [-c, -a, -b], [c, -a, b], [c, a, -b]]
+
+
+class Solver:
+    """A CDCL SAT solver over integer literals, with two watched literals per
+    clause, first-UIP clause learning, activity-based branching with phase
+    saving, and Luby restarts.
+
+    Attributes:
+        conflicts (`int`): the number of conflicts met so far.
+        decisions (`int`): the number of branching decisions made so far.
+        propagations (`int`): the number of literals assigned by unit
+            propagation so far.
+    """
+    conflicts: int
+    decisions: int
+    propagations: int
+
+    def __init__(self, number_of_variables: int = 0) -> None:
+        """Initializes an empty solver.
+
+        Parameters:
+            number_of_variables: the number of solver variables to allocate
+                up front; more are allocated by `add_clause` as needed.
+        """
+        self.clauses: List[Clause] = []
+        self.watches: Dict[int, List[int]] = {}
+        # per variable (index 0 is unused): +1, -1 or 0 when unassigned
+        self.values: List[int] = [0]
+        self.levels: List[int] = [0]
+        self.reasons: List[Optional[int]] = [None]
+        self.activity: List[float] = [0.0]
+        self.phases: List[int] = [-1]
+        self.heap: List[Tuple[float, int]] = []
+        self.trail: List[int] = []
+        self.trail_limits: List[int] = []
+        self.propagated = 0
+        self.increment = 1.0
+        self.inconsistent = False
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+        self.ensure_variables(number_of_variables)
+
+    def ensure_variables(self, number_of_variables: int) -> None:
+        """Allocates solver variables up to the given number.
+
+        Parameters:
+            number_of_variables: the largest solver variable to allocate.
+        """
+        for variable in range(len(self.values), number_of_variables + 1):
+            self.values.append(0)
+            self.levels.append(0)
+            self.reasons.append(None)
+            self.activity.append(0.0)
+            self.phases.append(-1)
+            self.watches[variable] = []
+            self.watches[-variable] = []
+            heappush(self.heap, (0.0, variable))
+
+    def value(self, literal: int) -> int:
+        """Returns +1 if the given literal is true, -1 if it is false and 0 if
+        it is unassigned."""
+        value = self.values[abs(literal)]
+        return value if literal > 0 else -value
+
+    def add_clause(self, clause: Iterable[int]) -> None:
+        """Adds the given clause to the problem. Must be called before
+        `solve`, i.e., at decision level 0.
+
+        Parameters:
+            clause: literals of the clause.
+        """
+        assert len(self.trail_limits) == 0
+        clause = list(dict.fromkeys(clause))
+        if len(clause) > 0:
+            self.ensure_variables(max(abs(literal) for literal in clause))
+        if any(-literal in clause or self.value(literal) > 0
+               for literal in clause):
+            return
+        clause = [literal for literal in clause if self.value(literal) == 0]
+        if len(clause) == 0:
+            self.inconsistent = True
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            if self.propagate() is not None:
+                self.inconsistent = True
+        else:
+            self.attach(clause)
+
+    def attach(self, clause: Clause) -> int:
+        """Stores the given clause, watching its first two literals.
+
+        Parameters:
+            clause: clause of at least two literals.
+
+        Returns:
+            The index of the stored clause.
+        """
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        self.watches[clause[0]].append(index)
+        self.watches[clause[1]].append(index)
+        return index
+
+    def assign(self, literal: int, reason: Optional[int]) -> None:
+        """Makes the given literal true at the current decision level.
+
+        Parameters:
+            literal: literal to assign.
+            reason: index of the clause that forced the literal, or ``None``
+                for a decision or a top-level fact.
+        """
+        variable = abs(literal)
+        self.values[variable] = 1 if literal > 0 else -1
+        self.levels[variable] = len(self.trail_limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self) -> Optional[int]:
+        """Runs unit propagation over the watched literals.
+
+        Returns:
+            The index of a falsified clause if a conflict was reached,
+            ``None`` otherwise.
+        """
+        while self.propagated < len(self.trail):
+            false_literal = -self.trail[self.propagated]
+            self.propagated += 1
+            watching = self.watches[false_literal]
+            kept = []
+            i = 0
+            while i < len(watching):
+                index = watching[i]
+                i += 1
+                clause = self.clauses[index]
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.value(clause[0]) > 0:
+                    kept.append(index)
+                    continue
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) >= 0:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches[clause[1]].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if self.value(clause[0]) < 0:
+                        kept.extend(watching[i:])
+                        self.watches[false_literal] = kept
+                        return index
+                    self.assign(clause[0], index)
+                    self.propagations += 1
+            self.watches[false_literal] = kept
+        return None
+
+    def analyze(self, conflict: int) -> Tuple[Clause, int]:
+        """Derives the first-UIP clause of the given conflict.
+
+        Parameters:
+            conflict: index of the falsified clause.
+
+        Returns:
+            A pair of the learnt clause, whose first literal is the asserting
+            one, and of the decision level to backjump to.
+        """
+        level = len(self.trail_limits)
+        seen = set()
+        learnt = [0]
+        pending = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        while True:
+            for other in clause:
+                variable = abs(other)
+                if other == literal or variable in seen or \
+                        self.levels[variable] == 0:
+                    continue
+                seen.add(variable)
+                self.bump(variable)
+                if self.levels[variable] == level:
+                    pending += 1
+                else:
+                    learnt.append(other)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.clauses[self.reasons[abs(literal)]]
+        learnt[0] = -literal
+        if len(learnt) == 1:
+            return learnt, 0
+        # watch the literal of the highest remaining level second
+        highest = max(range(1, len(learnt)),
+                      key=lambda k: self.levels[abs(learnt[k])])
+        learnt[1], learnt[highest] = learnt[highest], learnt[1]
+        return learnt, self.levels[abs(learnt[1])]
+
+    def bump(self, variable: int) -> None:
+        """Raises the branching activity of the given variable."""
+        self.activity[variable] += self.increment
+        if self.activity[variable] > ACTIVITY_LIMIT:
+            self.activity = [activity / ACTIVITY_LIMIT
+                             for activity in self.activity]
+            self.increment /= ACTIVITY_LIMIT
+            self.heap = [(-self.activity[v], v)
+                         for v in range(1, len(self.values))]
+            self.heap.sort()
+        if self.values[variable] == 0:
+            heappush(self.heap, (-self.activity[variable], variable))
+
+    def backjump(self, level: int) -> None:
+        """Undoes all assignments above the given decision level.
+
+        Parameters:
+            level: decision level to return to.
+        """
+        if len(self.trail_limits) <= level:
+            return
+        limit = self.trail_limits[level]
+        for literal in self.trail[limit:]:
+            variable = abs(literal)
+            self.phases[variable] = self.values[variable]
+            self.values[variable] = 0
+            self.reasons[variable] = None
+            heappush(self.heap, (-self.activity[variable], variable))
+        del self.trail[limit:]
+        del self.trail_limits[level:]
+        self.propagated = limit
+
+    def pick_branch(self) -> Optional[int]:
+        """Returns the unassigned variable of highest activity in its saved
+        phase, or ``None`` if all variables are assigned."""
+        while len(self.heap) > 0:
+            activity, variable = heappop(self.heap)
+            if self.values[variable] == 0 and \
+                    -activity == self.activity[variable]:
+                return variable * self.phases[variable]
+        for variable in range(1, len(self.values)):
+            if self.values[variable] == 0:
+                return variable * self.phases[variable]
+        return None
+
+    def solve(self) -> bool:
+        """Decides the satisfiability of the clauses added so far.
+
+        Returns:
+            ``True`` if the clauses are satisfiable, in which case `model`
+            holds a satisfying assignment, ``False`` otherwise.
+        """
+        if self.inconsistent:
+            return False
+        restarts = 1
+        budget = RESTART_BASE * luby(restarts)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                if len(self.trail_limits) == 0:
+                    self.inconsistent = True
+                    return False
+                learnt, level = self.analyze(conflict)
+                self.backjump(level)
+                if len(learnt) == 1:
+                    self.assign(learnt[0], None)
+                else:
+                    self.assign(learnt[0], self.attach(learnt))
+                self.increment *= ACTIVITY_DECAY
+                budget -= 1
+                continue
+            if budget <= 0:
+                restarts += 1
+                budget = RESTART_BASE * luby(restarts)
+                self.backjump(0)
+                continue
+            literal = self.pick_branch()
+            if literal is None:
+                return True
+            self.decisions += 1
+            self.trail_limits.append(len(self.trail))
+            self.assign(literal, None)
+
+    def model(self) -> List[bool]:
+        """Returns the satisfying assignment found by the last successful
+        `solve`, indexed by solver variable (index 0 is unused)."""
+        return [value > 0 for value in self.values]
+
+
+def find_model(formulae: Iterable[Formula],
+               variables: Optional[Sequence[str]] = None) -> Optional[Model]:
+    """Finds a model in which all the given formulae hold.
+
+    Parameters:
+        formulae: formulae to satisfy.
+        variables: the variables of the returned model, a superset of the
+            variables of the formulae, or ``None`` for exactly the variables
+            of the formulae.
+
+    Returns:
+        A model over the given variables in which all the given formulae
+        hold, or ``None`` if there is no such model.
+    """
+    clauses, mapping = to_cnf(formulae)
+    solver = Solver(len(mapping))
+    for clause in clauses:
+        solver.add_clause(clause)
+    if not solver.solve():
+        return None
+    values = solver.model()
+    if variables is None:
+        variables = mapping.keys()
+    return {variable: variable in mapping and values[mapping[variable]]
+            for variable in variables}
@@ -0,0 +1,65 @@
+# File name: propositions/sat_benchmark.py
+
+"""Benchmarks the propositions.sat solver on random 3-SAT instances near the
+satisfiability phase transition (about 4.26 clauses per variable), where they
+are hardest.
+
+Run from the course root with ``python -m propositions.sat_benchmark``.
+"""
+
+import random
+import sys
+import time
+from typing import List
+
+from propositions.sat import Clause, Solver
+
+PHASE_TRANSITION_RATIO = 4.26
+
+
+def random_3sat(number_of_variables: int, number_of_clauses: int,
+                rng: random.Random) -> List[Clause]:
+    """Generates a random 3-SAT instance.
+
+    Parameters:
+        number_of_variables: the number of variables of the instance.
+        number_of_clauses: the number of clauses of the instance.
+        rng: the random generator to draw from.
+
+    Returns:
+        The clauses, each over three distinct variables.
+    """
+    return [[rng.choice([1, -1]) * variable
+             for variable in rng.sample(range(1, number_of_variables + 1), 3)]
+            for _ in range(number_of_clauses)]
+
+
+def benchmark(sizes: List[int], instances: int = 10, seed: int = 0) -> None:
+    """Solves random instances of each of the given sizes and prints the
+    average statistics per size.
+
+    Parameters:
+        sizes: the numbers of variables to benchmark.
+        instances: the number of instances to solve per size.
+        seed: the seed of the random instances.
+    """
+    rng = random.Random(seed)
+    print('| vars | clauses | sat | avg seconds | avg conflicts |')
+    print('|------|---------|-----|-------------|---------------|')
+    for n in sizes:
+        m = round(PHASE_TRANSITION_RATIO * n)
+        satisfiable = conflicts = 0
+        start = time.perf_counter()
+        for _ in range(instances):
+            solver = Solver(n)
+            for clause in random_3sat(n, m, rng):
+                solver.add_clause(clause)
+            satisfiable += solver.solve()
+            conflicts += solver.conflicts
+        elapsed = time.perf_counter() - start
+        print('| %4d | %7d | %3d | %11.4f | %13.1f |' %
+              (n, m, satisfiable, elapsed / instances, conflicts / instances))
+
+
+if __name__ == '__main__':
+    benchmark([int(n) for n in sys.argv[1:]] or [25, 50, 75, 100, 125])
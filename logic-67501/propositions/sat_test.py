@@ -0,0 +1,68 @@
+# File name: propositions/sat_test.py
+
+"""Tests for the propositions.sat module."""
+
+import random
+from itertools import product
+
+from propositions.syntax import *
+from propositions.semantics import *
+from propositions.sat import *
+
+many_fs = ['F', 'T', 'r', '~x', '(x+y)', '(x<->y)', '(x-&y)', '(x-|y)', '(x|y)',
+           '(x->y)', '(x&y)', '(x&~x)', '(p&q)', '(x|(y&z))', '~(~x|~(y|z))',
+           '((p1|~p2)|~(p3|~~p4))', '((x+y)<->(~x+~y))',
+           '((x-|~y)&(~F->(z<->T)))', '~~~~F', '~(p->p)']
+
+def test_luby(debug=False):
+    if debug:
+        print('Testing the Luby sequence')
+    assert [luby(i) for i in range(1, 16)] == \
+           [1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8]
+
+def test_find_model(debug=False):
+    for f in many_fs:
+        if debug:
+            print('Testing find_model on', f)
+        f = Formula.parse(f)
+        model = find_model([f])
+        if model is None:
+            assert not is_satisfiable(f)
+        else:
+            assert is_model(model)
+            assert set(model.keys()) == f.variables()
+            assert evaluate(f, model)
+    if debug:
+        print('Testing find_model on no formulae and on extra variables')
+    assert find_model([]) == {}
+    assert find_model([Formula.parse('p')], ['p', 'q']) == \
+           {'p': True, 'q': False}
+    assert find_model([Formula.parse('p'), Formula.parse('~p')]) is None
+
+def test_solver(debug=False):
+    rng = random.Random(0)
+    for n in [3, 5, 8]:
+        for _ in range(20):
+            clauses = [[rng.choice([1, -1]) * v
+                        for v in rng.sample(range(1, n + 1), 3)]
+                       for _ in range(rng.randint(1, 6 * n))]
+            if debug:
+                print('Testing the solver on', clauses)
+            solver = Solver(n)
+            for clause in clauses:
+                solver.add_clause(clause)
+            satisfiable = any(
+                all(any((literal > 0) == bits[abs(literal) - 1]
+                        for literal in clause) for clause in clauses)
+                for bits in product([False, True], repeat=n))
+            assert solver.solve() == satisfiable
+            if satisfiable:
+                model = solver.model()
+                for clause in clauses:
+                    assert any(model[abs(literal)] == (literal > 0)
+                               for literal in clause)
+
+def test_all(debug=False):
+    test_luby(debug)
+    test_find_model(debug)
+    test_solver(debug)
@@ -5,13 +5,37 @@
 
 """Semantic analysis of propositional-logic constructs."""
 
-from typing import AbstractSet, Iterable, Iterator, List, Mapping
+from typing import AbstractSet, Dict, Iterable, Iterator, List, Mapping, \
+    Optional, Sequence, Tuple
 from itertools import product
 from propositions.syntax import *
 from propositions.proofs import *
+from propositions.sat import find_model
 
 Model = Mapping[str, bool]
 
+# formulae over more variables than this are decided by the SAT solver rather
+# than by evaluating them over all 2^n models
+PACKED_EVALUATION_MAX_VARIABLES = 12
+
+# A compiled instruction is (op, first, second): ``op`` is a variable index
+# loader ``'v'``, a constant ``'T'``/``'F'``, or a unary/binary operator, and
+# ``first``/``second`` are the variable index or the registers (indices of
+# earlier instructions) it reads.
+Instruction = Tuple[str, Optional[int], Optional[int]]
+
+# bitwise counterparts of OPERATOR_BOOLEAN_DICT over packed truth columns,
+# where ``mask`` has one set bit per model
+PACKED_OPERATOR_DICT = {'~': lambda x, mask: mask ^ x,
+                        '|': lambda x, y, mask: x | y,
+                        '&': lambda x, y, mask: x & y,
+                        '->': lambda x, y, mask: (mask ^ x) | y,
+                        '+': lambda x, y, mask: x ^ y,
+                        '<->': lambda x, y, mask: mask ^ (x ^ y),
+                        '-&': lambda x, y, mask: mask ^ (x & y),
+                        '-|': lambda x, y, mask: mask ^ (x | y),
+                        }
+
 
 def calculate_formula(formula, model):
     """calculate the formula for this model
@@ -103,6 +127,130 @@ def all_models(variables: List[str]) -> Iterable[Model]:
         yield {variables[i]: element[i] for i in range(len(variables))}
 
 
+# Compiled evaluation over all models at once
+
+
+def compile_formula(formula: Formula, variables: Sequence[str]) \
+        -> List[Instruction]:
+    """Compiles the given formula into a flat instruction sequence, in which
+    every distinct sub-formula is computed exactly once.
+
+    Parameters:
+        formula: formula to compile.
+        variables: the variables of the models the program will be evaluated
+            over, a superset of the variables of the formula.
+
+    Returns:
+        A list of instructions in evaluation order, the last of which computes
+        the formula itself.
+    """
+    assert formula.variables().issubset(variables)
+    indices = {variable: i for i, variable in enumerate(variables)}
+    program = []
+    registers = {}
+    stack = [(formula, False)]
+    while len(stack) > 0:
+        current, expanded = stack.pop()
+        if current in registers:
+            continue
+        if is_variable(current.root):
+            program.append(('v', indices[current.root], None))
+        elif is_constant(current.root):
+            program.append((current.root, None, None))
+        elif not expanded:
+            stack.append((current, True))
+            if is_binary(current.root):
+                stack.append((current.second, False))
+            stack.append((current.first, False))
+            continue
+        elif is_unary(current.root):
+            program.append((current.root, registers[current.first], None))
+        else:
+            program.append((current.root, registers[current.first],
+                            registers[current.second]))
+        registers[current] = len(program) - 1
+    return program
+
+
+def variable_column(index: int, number_of_variables: int) -> int:
+    """Computes the packed truth column of a single variable.
+
+    Parameters:
+        index: index of the variable in the variables list.
+        number_of_variables: length of the variables list.
+
+    Returns:
+        An integer whose bit `r` is the value of the variable in the model
+        number `r` of `all_models` over the variables list.
+    """
+    number_of_models = 1 << number_of_variables
+    block = 1 << (number_of_variables - 1 - index)
+    column = ((1 << block) - 1) << block
+    length = 2 * block
+    while length < number_of_models:
+        column |= column << length
+        length *= 2
+    return column
+
+
+def evaluate_compiled(program: List[Instruction],
+                      number_of_variables: int) -> int:
+    """Runs the given compiled program over all models at once.
+
+    Parameters:
+        program: program returned by `compile_formula`.
+        number_of_variables: length of the variables list the program was
+            compiled for.
+
+    Returns:
+        An integer whose bit `r` is the truth value of the compiled formula in
+        the model number `r` of `all_models` over the variables list.
+    """
+    mask = (1 << (1 << number_of_variables)) - 1
+    # the index of the last instruction reading each register, so columns
+    # (2^n bits each) can be dropped as soon as they are no longer needed
+    last_use = list(range(len(program)))
+    for i, (op, first, second) in enumerate(program):
+        if is_unary(op) or is_binary(op):
+            last_use[first] = i
+        if is_binary(op):
+            last_use[second] = i
+    columns: Dict[int, int] = {}
+    for i, (op, first, second) in enumerate(program):
+        if op == 'v':
+            columns[i] = variable_column(first, number_of_variables)
+            continue
+        if is_constant(op):
+            columns[i] = mask if op == 'T' else 0
+            continue
+        if is_unary(op):
+            columns[i] = PACKED_OPERATOR_DICT[op](columns[first], mask)
+        else:
+            columns[i] = PACKED_OPERATOR_DICT[op](columns[first],
+                                                  columns[second], mask)
+        for register in {first, second} - {None}:
+            if last_use[register] == i:
+                del columns[register]
+    return columns[len(program) - 1]
+
+
+def all_truth_values(formula: Formula, variables: Sequence[str]) -> int:
+    """Calculates the truth values of the given formula in all models over
+    the given variables as a single packed bit-vector.
+
+    Parameters:
+        formula: formula to calculate the truth values of.
+        variables: variables over which to calculate, a superset of the
+            variables of the formula.
+
+    Returns:
+        An integer whose bit `r` is the truth value of the formula in the model
+        number `r` of `all_models`\ ``(``\ `variables`\ ``)``.
+    """
+    return evaluate_compiled(compile_formula(formula, variables),
+                             len(variables))
+
+
 def truth_values(formula: Formula, models: Iterable[Model]) -> Iterable[bool]:
     """Calculates the truth value of the given formula in each of the given
     model.
@@ -158,14 +306,17 @@ def print_answers(formula, formula_variables):
         | T | F   | T        |
         | T | T   | F        |
      """
-    models = all_models(list(formula_variables))
-    for model in models:
+    number_of_variables = len(formula_variables)
+    number_of_models = 1 << number_of_variables
+    values = all_truth_values(formula, formula_variables)
+    value_padding = ' ' * (len(str(formula)) - 1) + ' |'
+    for row in range(number_of_models):
         s = '| '
-        for var in formula_variables:
-            s += truth_false_string(model[var]) + ' ' * (len(var) - 1) + ' | '
-        s += truth_false_string(evaluate(formula, model)) \
-             + ' ' * (len(str(formula)) - 1) + ' | '
-        print(s[:-1])
+        for i, var in enumerate(formula_variables):
+            value = (row >> (number_of_variables - 1 - i)) & 1
+            s += truth_false_string(value) + ' ' * (len(var) - 1) + ' | '
+        s += truth_false_string((values >> row) & 1) + value_padding
+        print(s)
 
 
 def print_table_second_row(formula, formula_variables):
@@ -225,11 +376,11 @@ def is_tautology(formula: Formula) -> bool:
     Returns:
         ``True`` if the given formula is a tautology, ``False`` otherwise.
     """
-    models = all_models(list(formula.variables()))
-    for model in models:
-        if evaluate(formula, model) is False:
-            return False
-    return True
+    variables = list(formula.variables())
+    if len(variables) > PACKED_EVALUATION_MAX_VARIABLES:
+        return find_model([Formula('~', formula)]) is None
+    return all_truth_values(formula, variables) == \
+        (1 << (1 << len(variables))) - 1
 
 
 def is_contradiction(formula: Formula) -> bool:
@@ -241,11 +392,10 @@ def is_contradiction(formula: Formula) -> bool:
     Returns:
         ``True`` if the given formula is a contradiction, ``False`` otherwise.
     """
-    models = all_models(list(formula.variables()))
-    for model in models:
-        if evaluate(formula, model) is True:
-            return False
-    return True
+    variables = list(formula.variables())
+    if len(variables) > PACKED_EVALUATION_MAX_VARIABLES:
+        return find_model([formula]) is None
+    return all_truth_values(formula, variables) == 0
 
 
 def is_satisfiable(formula: Formula) -> bool:
@@ -257,11 +407,10 @@ def is_satisfiable(formula: Formula) -> bool:
     Returns:
         ``True`` if the given formula is satisfiable, ``False`` otherwise.
     """
-    models = all_models(list(formula.variables()))
-    for model in models:
-        if evaluate(formula, model) is True:
-            return True
-    return False
+    variables = list(formula.variables())
+    if len(variables) > PACKED_EVALUATION_MAX_VARIABLES:
+        return find_model([formula]) is not None
+    return all_truth_values(formula, variables) != 0
 
 
 def join_formulas(formulas, op):
@@ -300,6 +449,25 @@ def synthesize_for_model(model: Model) -> Formula:
     return join_formulas(formulas, '&')
 
 
+def synthesize_for_row(variables: Sequence[str], row: int) -> Formula:
+    """Synthesizes the clause of `synthesize_for_model` for the model number
+    `row` of `all_models` over the given variables, without building that
+    model.
+
+    Parameters:
+        variables: the variables of the model.
+        row: index of the model in the order returned by `all_models`.
+
+    Returns:
+        The synthesized formula.
+    """
+    number_of_variables = len(variables)
+    formulas = [Formula(var) if (row >> (number_of_variables - 1 - i)) & 1
+                else Formula('~', Formula(var))
+                for i, var in enumerate(variables)]
+    return join_formulas(formulas, '&')
+
+
 def synthesize(variables: List[str], values: Iterable[bool]) -> Formula:
     """Synthesizes a propositional formula in DNF over the given variables, from
     the given specification of which value the formula should have on each
@@ -324,8 +492,8 @@ def synthesize(variables: List[str], values: Iterable[bool]) -> Formula:
         False
     """
     assert len(variables) > 0
-    formulas = [synthesize_for_model(model) for value, model
-                in zip(values, all_models(variables)) if value]
+    formulas = [synthesize_for_row(variables, row)
+                for row, value in enumerate(values) if value]
     if len(formulas) == 0:
         return Formula('&', Formula(variables[0]),
                        Formula('~', Formula(variables[0])))
@@ -362,7 +530,9 @@ def is_sound_inference(rule: InferenceRule) -> bool:
     Returns:
         ``True`` if the given inference rule is sound, ``False`` otherwise.
     """
-    for model in all_models(list(rule.variables())):
-        if not evaluate_inference(rule, model):
-            return False
-    return True
+    variables = list(rule.variables())
+    mask = (1 << (1 << len(variables))) - 1
+    holds = mask
+    for assumption in rule.assumptions:
+        holds &= all_truth_values(assumption, variables)
+    return (holds & ~all_truth_values(rule.conclusion, variables) & mask) == 0
@@ -408,10 +408,31 @@ def test_is_tautology_all_operators(debug=False):
             print('Testing whether', formula, 'is a tautology')
         assert is_tautology(formula) == tautology
 
+def test_all_truth_values(debug=False):
+    for infix, variables in [['~(p&q7)', ['p', 'q7']],
+                             ['(y|~x)', ['x', 'y', 'z']],
+                             ['~~~p', ['p']],
+                             ['T', []],
+                             ['((p->q)<->(~q-|(p+F)))', ['q', 'p', 'r']],
+                             ['((p&q)|~(p&q))', ['p', 'q']]]:
+        formula = Formula.parse(infix)
+        if debug:
+            print('Testing the compiled evaluation of', formula, 'over',
+                  variables)
+        values = all_truth_values(formula, variables)
+        expected = list(truth_values(formula, all_models(variables)))
+        assert [bool((values >> row) & 1) for row in range(len(expected))] \
+               == expected
+        assert values >> len(expected) == 0
+    formula = Formula.parse('((p&q)|~(p&q))')
+    assert len(compile_formula(formula, ['p', 'q'])) == 5, \
+        'Shared sub-formulae should be compiled once'
+
 def test_ex2(debug=False):
     test_evaluate(debug)
     test_all_models(debug)
     test_truth_values(debug)
+    test_all_truth_values(debug)
     test_print_truth_table(debug)
     test_is_tautology(debug)
     test_is_contradiction(debug)
@@ -6,7 +6,9 @@
 """Syntactic handling of propositional formulae."""
 
 from __future__ import annotations
-from typing import Mapping, Optional, Set, Tuple, Union
+from typing import FrozenSet, Mapping, MutableMapping, Optional, Set, \
+    Tuple, Union
+from weakref import WeakValueDictionary
 import re
 from logic_utils import frozen
 
@@ -111,6 +113,11 @@ def find_op(s):
 class Formula:
     """An immutable propositional formula in tree representation.
 
+    Formulae are hash-consed: constructing a formula that is structurally
+    equal to an existing one returns the existing object, so equality is an
+    identity check and the hash, string representation, variables and
+    operators of every node are computed at most once.
+
     Attributes:
         root (`str`): the constant, atomic proposition, or operator at the root
             of the formula tree.
@@ -123,9 +130,18 @@ class Formula:
     first: Optional[Formula]
     second: Optional[Formula]
 
-    def __init__(self, root: str, first: Optional[Formula] = None,
-                 second: Optional[Formula] = None) -> None:
-        """Initializes a `Formula` from its root and root operands.
+    __slots__ = ('root', 'first', 'second', '_hash', '_repr', '_variables',
+                 '_operators', '__weakref__')
+
+    # maps (root, first, second) to the unique live formula with that shape
+    _interned: MutableMapping[Tuple[str, Optional[Formula],
+                                    Optional[Formula]], Formula] = \
+        WeakValueDictionary()
+
+    def __new__(cls, root: str, first: Optional[Formula] = None,
+                second: Optional[Formula] = None) -> Formula:
+        """Returns the interned formula with the given root and root operands,
+        creating it if no such formula exists yet.
 
         Parameters:
             root: the root for the formula tree.
@@ -133,17 +149,59 @@ class Formula:
                 binary operator.
             second: the second operand to the root, if the root is a binary
                 operator.
+
+        Returns:
+            The unique formula with the given root and root operands.
         """
+        key = (root, first, second)
+        formula = cls._interned.get(key)
+        if formula is not None:
+            return formula
         if is_variable(root) or is_constant(root):
             assert first is None and second is None
-            self.root = root
+            node_hash = hash(root)
         elif is_unary(root):
             assert type(first) is Formula and second is None
-            self.root, self.first = root, first
+            node_hash = hash((root, first._hash))
         else:
             assert is_binary(root) and type(first) is Formula and \
                    type(second) is Formula
-            self.root, self.first, self.second = root, first, second
+            node_hash = hash((root, first._hash, second._hash))
+        formula = object.__new__(cls)
+        object.__setattr__(formula, 'root', root)
+        object.__setattr__(formula, 'first', first)
+        object.__setattr__(formula, 'second', second)
+        object.__setattr__(formula, '_hash', node_hash)
+        object.__setattr__(formula, '_repr', None)
+        object.__setattr__(formula, '_variables', None)
+        object.__setattr__(formula, '_operators', None)
+        cls._interned[key] = formula
+        return formula
+
+    def __init__(self, root: str, first: Optional[Formula] = None,
+                 second: Optional[Formula] = None) -> None:
+        """Initializes a `Formula` from its root and root operands.
+
+        All the work is done once by `__new__` when the formula is first
+        interned, so there is nothing left to initialize here.
+
+        Parameters:
+            root: the root for the formula tree.
+            first: the first operand to the root, if the root is a unary or
+                binary operator.
+            second: the second operand to the root, if the root is a binary
+                operator.
+        """
+
+    def __reduce__(self) -> Tuple[type, Tuple[str, Optional[Formula],
+                                              Optional[Formula]]]:
+        """Pickles the current formula by its structure, so that unpickling
+        interns it again in the receiving process.
+
+        Returns:
+            The constructor and its arguments.
+        """
+        return Formula, (self.root, self.first, self.second)
 
     def __eq__(self, other: object) -> bool:
         """Compares the current formula with the given one.
@@ -155,7 +213,7 @@ class Formula:
             ``True`` if the given object is a `Formula` object that equals the
             current formula, ``False`` otherwise.
         """
-        return isinstance(other, Formula) and str(self) == str(other)
+        return self is other
 
     def __ne__(self, other: object) -> bool:
         """Compares the current formula with the given one.
@@ -167,10 +225,10 @@ class Formula:
             ``True`` if the given object is not a `Formula` object or does not
             does not equal the current formula, ``False`` otherwise.
         """
-        return not self == other
+        return self is not other
 
     def __hash__(self) -> int:
-        return hash(str(self))
+        return self._hash
 
     def __repr__(self) -> str:
         """Computes the string representation of the current formula.
@@ -178,11 +236,16 @@ class Formula:
         Returns:
             The standard string representation of the current formula.
         """
-        if is_unary(self.root):
-            return self.root + str(self.first)
-        elif is_binary(self.root):
-            return '(' + str(self.first) + self.root + str(self.second) + ')'
-        return self.root
+        if self._repr is None:
+            if is_unary(self.root):
+                representation = self.root + str(self.first)
+            elif is_binary(self.root):
+                representation = '(' + str(self.first) + self.root + \
+                                 str(self.second) + ')'
+            else:
+                representation = self.root
+            object.__setattr__(self, '_repr', representation)
+        return self._repr
 
     def variables(self) -> Set[str]:
         """Finds all atomic propositions (variables) in the current formula.
@@ -190,7 +253,25 @@ class Formula:
         Returns:
             A set of all atomic propositions used in the current formula.
         """
-        return {s for s in re.findall(VARIABLE_REGEX, str(self))}
+        if self._variables is None:
+            if is_variable(self.root):
+                found = frozenset({self.root})
+            elif is_unary(self.root):
+                found = self.first._variable_set()
+            elif is_binary(self.root):
+                found = self.first._variable_set() | \
+                        self.second._variable_set()
+            else:
+                found = frozenset()
+            object.__setattr__(self, '_variables', found)
+        return set(self._variables)
+
+    def _variable_set(self) -> FrozenSet[str]:
+        """Returns the cached variables of the current formula without
+        copying them."""
+        if self._variables is None:
+            self.variables()
+        return self._variables
 
     def operators(self) -> Set[str]:
         """Finds all operators in the current formula.
@@ -199,7 +280,25 @@ class Formula:
             A set of all operators (including ``'T'`` and ``'F'``) used in the
             current formula.
         """
-        return {s for s in re.findall(OPERATOR_REGEX, str(self))}
+        if self._operators is None:
+            if is_constant(self.root):
+                found = frozenset({self.root})
+            elif is_unary(self.root):
+                found = self.first._operator_set() | {self.root}
+            elif is_binary(self.root):
+                found = self.first._operator_set() | \
+                        self.second._operator_set() | {self.root}
+            else:
+                found = frozenset()
+            object.__setattr__(self, '_operators', found)
+        return set(self._operators)
+
+    def _operator_set(self) -> FrozenSet[str]:
+        """Returns the cached operators of the current formula without
+        copying them."""
+        if self._operators is None:
+            self.operators()
+        return self._operators
 
     @staticmethod
     def parse_prefix(s: str) -> Tuple[Union[Formula, None], str]:
@@ -5,6 +5,8 @@
 
 """Tests for the propositions.syntax module."""
 
+import pickle
+
 from logic_utils import frozendict
 
 from propositions.syntax import *
@@ -312,6 +314,27 @@ def test_substitute_operators(debug=False):
         a = str(f.substitute_operators(frozendict(d)))
         assert a == r, "Incorrect answer:"+a             
                
+def test_interning(debug=False):
+    for s in ['x', 'T', '~(p&q7)', '((p->q)->(~q->~p))', '(x-|~F)']:
+        if debug:
+            print("Testing interning of formula", s)
+        f = Formula.parse(s)
+        g = Formula.parse(s)
+        assert f is g
+        assert hash(f) == hash(g)
+        assert pickle.loads(pickle.dumps(f)) is f
+    f = Formula('&', Formula('p'), Formula('q'))
+    assert f.first is Formula('p') and f.second is Formula('q')
+    assert f != Formula('&', Formula('q'), Formula('p'))
+    variables = f.variables()
+    variables.add('r')
+    assert f.variables() == {'p', 'q'}, "variables() must return a copy"
+    try:
+        f.root = '|'
+        assert False, "Formula must be immutable"
+    except Exception as e:
+        assert "immutable" in str(e)
+
 def test_ex1(debug=False):
     test_repr(debug)
     test_variables(debug)
@@ -319,6 +342,7 @@ def test_ex1(debug=False):
     test_parse_prefix(debug)
     test_is_formula(debug)
     test_parse(debug)
+    test_interning(debug)
     
 def test_ex1_opt(debug=False):
     test_polish(debug)
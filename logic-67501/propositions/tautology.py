@@ -5,7 +5,7 @@
 
 """The Tautology Theorem and its implications."""
 
-from typing import List, Union
+from typing import Dict, List, Tuple, Union
 
 from logic_utils import frozendict
 from typing import Callable
@@ -14,6 +14,7 @@ from propositions.proofs import *
 from propositions.deduction import *
 from propositions.semantics import *
 from propositions.axiomatic_systems import *
+from propositions.sat import find_model
 
 
 def formulae_capturing_model(model: Model) -> List[Formula]:
@@ -150,16 +151,198 @@ def prove_tautology(tautology: Formula, model: Model = frozendict()) -> Proof:
     assert tautology.operators().issubset({'->', '~'})
     assert is_model(model)
     assert sorted(tautology.variables())[:len(model)] == sorted(model.keys())
-    if len(model.keys()) == len(tautology.variables()):
-        return prove_in_model(tautology, model)
+    node = prove_tautology_node(tautology, model, {})
+    return node.to_proof(formulae_capturing_model(model), AXIOMATIC_SYSTEM)
+
+
+def prove_tautology_node(tautology: Formula, model: Model,
+                         cache: Dict[Tuple, ProofNode]) -> ProofNode:
+    """Proves the given tautology from the formulae that capture the given
+    model, as a proof DAG.
+
+    Parameters:
+        tautology: tautology that contains no constants or operators beyond
+            ``'->'`` and ``'~'``, to prove.
+        model: model over a (possibly empty) prefix (with respect to the
+            alphabetical order) of the variables of `tautology`, from whose
+            formulae to prove.
+        cache: memo of the sub-proofs built so far, shared by all the
+            recursive calls.
+
+    Returns:
+        The root of a proof DAG of the given tautology whose assumption nodes
+        are all formulae that capture the given model.
+    """
     variables_sorted = sorted(tautology.variables())
     length = len(model.keys())
-    new_model = {key: model[key] for key in model.keys()}
-    new_model[variables_sorted[length]] = False
-    p1 = prove_tautology(tautology, new_model)
-    new_model[variables_sorted[length]] = True
-    p2 = prove_tautology(tautology, new_model)
-    return reduce_assumption(p2, p1)
+    if length == len(variables_sorted):
+        return prove_in_model_node(tautology, model, cache)
+    variable = Formula(variables_sorted[length])
+    new_model = dict(model)
+    new_model[variable.root] = True
+    affirmation = prove_tautology_node(tautology, new_model, cache)
+    new_model[variable.root] = False
+    negation = prove_tautology_node(tautology, new_model, cache)
+    return reduce_assumption_node(affirmation, negation, variable, cache)
+
+
+def prove_in_model_node(formula: Formula, model: Model,
+                        cache: Dict[Tuple, ProofNode]) -> ProofNode:
+    """Either proves the given formula or proves its negation, from the
+    formulae that capture the given model, as a proof DAG. Sub-proofs are
+    memoized by sub-formula and by the part of the model over its variables,
+    so each is built once and shared by all the models that agree on it.
+
+    Parameters:
+        formula: formula that contains no constants or operators beyond
+            ``'->'`` and ``'~'``, whose affirmation or negation is to prove.
+        model: model from whose formulae to prove.
+        cache: memo of the sub-proofs built so far.
+
+    Returns:
+        The root of a proof DAG of the given formula if it evaluates to
+        ``True`` in the given model, otherwise of ``'~``\ `formula`\ ``'``.
+    """
+    key = ('in_model', formula,
+           frozenset((variable, model[variable])
+                     for variable in formula.variables()))
+    if key in cache:
+        return cache[key]
+    if is_variable(formula.root):
+        node = ProofNode(formula if model[formula.root]
+                         else Formula('~', formula))
+    elif formula.root == '->':
+        first = prove_in_model_node(formula.first, model, cache)
+        second = prove_in_model_node(formula.second, model, cache)
+        if second.formula is formula.second:  # q is true
+            node = corollary_node(second, formula, I1)
+        elif first.formula is not formula.first:  # p is false
+            node = corollary_node(first, formula, I2)
+        else:  # p is true and q is false
+            node = corollary_node(
+                first, Formula('->', second.formula, Formula('~', formula)),
+                NI)
+            node = ProofNode(node.formula.second, MP, [second, node])
+    else:  # this is ~p
+        first = prove_in_model_node(formula.first, model, cache)
+        if first.formula is formula:  # p is false
+            node = first
+        else:  # p is true
+            node = corollary_node(first, Formula('~', formula), NN)
+    cache[key] = node
+    return node
+
+
+def corollary_node(antecedent: ProofNode, consequent: Formula,
+                   conditional: InferenceRule) -> ProofNode:
+    """The DAG counterpart of `~propositions.deduction.prove_corollary`.
+
+    Parameters:
+        antecedent: node of a formula `antecedent`.
+        consequent: formula to prove.
+        conditional: assumptionless inference rule of which
+            ``'(``\ `antecedent`\ ``->``\ `consequent`\ ``)'`` is a
+            specialization.
+
+    Returns:
+        A node of `consequent` from the same assumption nodes.
+    """
+    conditional_node = ProofNode(
+        Formula('->', antecedent.formula, consequent), conditional)
+    return ProofNode(consequent, MP, [antecedent, conditional_node])
+
+
+def depends_on(node: ProofNode, assumption: Formula,
+               cache: Dict[Tuple, ProofNode]) -> bool:
+    """Checks if the given proof DAG uses the given assumption.
+
+    Parameters:
+        node: root of the DAG to check.
+        assumption: the assumption to look for.
+        cache: memo of the answers computed so far.
+
+    Returns:
+        ``True`` if some assumption node reachable from the given node
+        justifies the given assumption, ``False`` otherwise.
+    """
+    key = ('depends', node, assumption)
+    if key not in cache:
+        if node.is_assumption():
+            cache[key] = node.formula is assumption
+        else:
+            cache[key] = any(depends_on(premise, assumption, cache)
+                             for premise in node.premises)
+    return cache[key]
+
+
+def remove_assumption_node(node: ProofNode, assumption: Formula,
+                           cache: Dict[Tuple, ProofNode]) -> ProofNode:
+    """The DAG counterpart of `~propositions.deduction.remove_assumption`:
+    only the nodes that actually depend on the removed assumption are
+    rewritten, and every other sub-proof is reused as is.
+
+    Parameters:
+        node: root of a proof DAG via assumptionless rules and
+            `~propositions.axiomatic_systems.MP`.
+        assumption: the assumption to remove.
+        cache: memo of the rewritten nodes.
+
+    Returns:
+        The root of a proof DAG of ``'(``\ `assumption`\ ``->``\ `formula`\
+        ``)'``, where `formula` is that of the given node, which does not use
+        the given assumption.
+    """
+    key = ('remove', node, assumption)
+    if key in cache:
+        return cache[key]
+    implication = Formula('->', assumption, node.formula)
+    if not depends_on(node, assumption, cache):
+        result = corollary_node(node, implication, I1)
+    elif node.is_assumption():
+        result = ProofNode(implication, I0)
+    else:
+        assert node.rule == MP
+        antecedent, conditional = node.premises
+        removed_antecedent = remove_assumption_node(antecedent, assumption,
+                                                    cache)
+        removed_conditional = remove_assumption_node(conditional, assumption,
+                                                     cache)
+        distribution = ProofNode(
+            Formula('->', removed_conditional.formula,
+                    Formula('->', removed_antecedent.formula, implication)),
+            D)
+        result = ProofNode(distribution.formula.second, MP,
+                           [removed_conditional, distribution])
+        result = ProofNode(implication, MP, [removed_antecedent, result])
+    cache[key] = result
+    return result
+
+
+def reduce_assumption_node(affirmation: ProofNode, negation: ProofNode,
+                           variable: Formula,
+                           cache: Dict[Tuple, ProofNode]) -> ProofNode:
+    """The DAG counterpart of `reduce_assumption`.
+
+    Parameters:
+        affirmation: root of a proof DAG of `conclusion` that may use the
+            given variable as an assumption.
+        negation: root of a proof DAG of `conclusion` that may use
+            ``'~``\ `variable`\ ``'`` as an assumption.
+        variable: the variable whose assumption to remove.
+        cache: memo of the rewritten nodes.
+
+    Returns:
+        The root of a proof DAG of `conclusion` that uses neither of these
+        assumptions.
+    """
+    assert affirmation.formula is negation.formula
+    removed_affirmation = remove_assumption_node(affirmation, variable, cache)
+    removed_negation = remove_assumption_node(
+        negation, Formula('~', variable), cache)
+    node = corollary_node(
+        removed_affirmation,
+        Formula('->', removed_negation.formula, affirmation.formula), R)
+    return ProofNode(affirmation.formula, MP, [removed_negation, node])
 
 
 def proof_or_counterexample(formula: Formula) -> Union[Proof, Model]:
@@ -176,10 +359,9 @@ def proof_or_counterexample(formula: Formula) -> Union[Proof, Model]:
         otherwise a model in which the given formula does not hold.
     """
     assert formula.operators().issubset({'->', '~'})
-    models = all_models(list(formula.variables()))
-    for model in models:
-        if evaluate(formula, model) is False:
-            return model
+    counterexample = find_model([Formula('~', formula)])
+    if counterexample is not None:
+        return counterexample
     return prove_tautology(formula)
 
 
@@ -252,13 +434,9 @@ def model_or_inconsistency(formulae: List[Formula]) -> Union[Model, Proof]:
     """
     for formula in formulae:
         assert formula.operators().issubset({'->', '~'})
-    vars = set()
-    for formula in formulae:
-        vars |= formula.variables()
-    models = all_models(list(vars))
-    for model in models:
-        if all([evaluate(formula, model) for formula in formulae]) is True:
-            return model
+    model = find_model(formulae)
+    if model is not None:
+        return model
     rule = InferenceRule(formulae, Formula.parse('~(p->p)'))
     return prove_sound_inference(rule)
 
@@ -248,11 +248,27 @@ def test_prove_in_model_full(debug=False):
         assert p.rules == AXIOMATIC_SYSTEM_FULL
         assert p.is_valid(), offending_line(p)
            
+def test_prove_tautology_shared_lines(debug=False):
+    for t in ['((p1->p2)->((p2->p3)->((p3->p4)->((p4->p5)->(p1->p5)))))',
+              '((~p->~q)->((~p->q)->p))',
+              '((q->~p)->((~~~p->r)->(q->r)))']:
+        t = Formula.parse(t)
+        if debug:
+            print("Testing that the proof of", t, "has no repeated lines")
+        p = prove_tautology(t)
+        assert p.is_valid(), offending_line(p)
+        keys = [(line.formula, line.rule,
+                 None if line.is_assumption() else line.assumptions)
+                for line in p.lines]
+        assert len(set(keys)) == len(keys)
+        assert len(p.lines) < 1000
+
 def test_ex6(debug=False):
     test_formulae_capturing_model(debug)
     test_prove_in_model(debug)
     test_reduce_assumption(debug)
     test_prove_tautology(debug)
+    test_prove_tautology_shared_lines(debug)
     test_proof_or_counterexample(debug)
     test_encode_as_formula(debug)
     test_prove_sound_inference(debug)